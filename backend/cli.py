@@ -0,0 +1,114 @@
+"""Maintenance commands, e.g. `python cli.py recompute-progress --dry-run`"""
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import List
+
+import typer
+from dotenv import load_dotenv
+
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services.audio_cache import fold_audio_cache_duplicates
+from services.audio_pregeneration import (
+    DEFAULT_PREGENERATION_SPEEDS,
+    DEFAULT_PREGENERATION_TIERS,
+    PregenerationRunning,
+    run_audio_pregeneration,
+)
+from services.badge_engine import backfill_badges
+from services.favorites import reconcile_all_favorites
+from services.progress_recompute import RecomputeRunning, run_progress_recompute
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+app = typer.Typer(help="Somali Learning PWA maintenance commands")
+
+
+async def _with_database(job):
+    await connect_to_mongo()
+    try:
+        return await job(get_database())
+    finally:
+        await close_mongo_connection()
+
+
+def _print(result) -> None:
+    typer.echo(json.dumps(result, indent=2, default=str))
+
+
+@app.command("recompute-progress")
+def recompute_progress(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Report changes without writing them"),
+    resume: bool = typer.Option(True, "--resume/--restart", help="Continue an interrupted run from its checkpoint"),
+    revoke_tiers: bool = typer.Option(False, "--revoke-tiers", help="Also remove tiers users no longer qualify for"),
+    batch_size: int = typer.Option(500, min=1, max=5000)
+):
+    """Re-evaluate level, tiers and badges for all users after rule changes"""
+    try:
+        result = asyncio.run(_with_database(lambda db: run_progress_recompute(
+            db, dry_run=dry_run, batch_size=batch_size, resume=resume, revoke_tiers=revoke_tiers
+        )))
+    except RecomputeRunning as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    _print(result)
+
+
+@app.command("backfill-badges")
+def backfill(
+    badge_id: List[str] = typer.Option(None, "--badge", help="Only these badges (repeatable)"),
+    batch_size: int = typer.Option(500, min=1, max=5000)
+):
+    """Award badges users already qualify for, e.g. after adding a rule"""
+    result = asyncio.run(_with_database(lambda db: backfill_badges(db, badge_id or None, batch_size)))
+    _print(result)
+
+
+@app.command("reconcile-favorites")
+def reconcile_favorites(
+    batch_size: int = typer.Option(500, min=1, max=5000)
+):
+    """Repair favorite order records (user_favorites) that disagree with users' favorites"""
+    result = asyncio.run(_with_database(lambda db: reconcile_all_favorites(db, batch_size)))
+    _print(result)
+
+
+@app.command("pregenerate-audio")
+def pregenerate_audio(
+    tier: List[int] = typer.Option(DEFAULT_PREGENERATION_TIERS, "--tier", help="Tiers to cover (repeatable)"),
+    speed: List[float] = typer.Option(DEFAULT_PREGENERATION_SPEEDS, "--speed", help="Speeds to cover (repeatable)"),
+    include_examples: bool = typer.Option(False, "--include-examples", help="Also cover example sentences"),
+    concurrency: int = typer.Option(4, min=1, max=32),
+    resume: bool = typer.Option(True, "--resume/--restart", help="Continue an interrupted run from its checkpoint")
+):
+    """Synthesize missing audio clips ahead of demand"""
+    try:
+        result = asyncio.run(_with_database(lambda db: run_audio_pregeneration(
+            db, tiers=tier, speeds=speed, include_examples=include_examples,
+            concurrency=concurrency, resume=resume
+        )))
+    except PregenerationRunning as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(code=1)
+    _print(result)
+
+
+@app.command("fold-audio-cache")
+def fold_audio_cache(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Report what would change without writing"),
+    batch_size: int = typer.Option(500, min=1, max=5000)
+):
+    """Move audio_cache entries to canonical cache keys, merging duplicates"""
+    result = asyncio.run(_with_database(lambda db: fold_audio_cache_duplicates(db, dry_run, batch_size)))
+    _print(result)
+
+
+if __name__ == "__main__":
+    app()
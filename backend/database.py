@@ -1,10 +1,21 @@
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 import os
-from typing import Optional
+from typing import Awaitable, Callable, List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+IndexSetup = Callable[[AsyncIOMotorDatabase], Awaitable[None]]
+
+# Collection and index setup registered by the services that own the collections
+index_setups: List[IndexSetup] = []
+
+def register_index_setup(setup: IndexSetup) -> IndexSetup:
+    """Run a service's collection setup in create_indexes (usable as a decorator)"""
+    if setup not in index_setups:
+        index_setups.append(setup)
+    return setup
+
 class Database:
     client: Optional[AsyncIOMotorClient] = None
     database: Optional[AsyncIOMotorDatabase] = None
@@ -33,41 +44,61 @@ async def connect_to_mongo():
         logger.error(f"Failed to connect to MongoDB: {e}")
         raise
 
+async def create_word_indexes(db: AsyncIOMotorDatabase) -> None:
+    await db.somali_words.create_index("tier")
+    await db.somali_words.create_index("category")
+    await db.somali_words.create_index([
+        ("somali", "text"),
+        ("english", "text"),
+        ("tags", "text")
+    ])
+
+async def create_word_id_index(db: AsyncIOMotorDatabase) -> None:
+    # Unique for the favorites $lookup; fails while the catalog holds duplicate ids
+    await db.somali_words.create_index("id", unique=True)
+
+async def create_progress_indexes(db: AsyncIOMotorDatabase) -> None:
+    await db.user_progress.create_index("user_id", unique=True)
+    await db.user_progress.create_index("last_activity")
+    await db.user_progress.create_index([("total_points", -1), ("user_id", 1)])
+
+async def create_weekly_points_indexes(db: AsyncIOMotorDatabase) -> None:
+    # Weekly leaderboard counters
+    await db.weekly_points.create_index([("week", 1), ("user_id", 1)], unique=True)
+    await db.weekly_points.create_index([("week", 1), ("points", -1), ("user_id", 1)])
+
+async def create_quiz_indexes(db: AsyncIOMotorDatabase) -> None:
+    await db.quiz_sessions.create_index("user_id")
+    await db.quiz_sessions.create_index("started_at")
+    await db.quiz_sessions.create_index("completed_at")
+
+CORE_INDEX_SETUPS: List[IndexSetup] = [
+    create_word_indexes,
+    create_word_id_index,
+    create_progress_indexes,
+    create_weekly_points_indexes,
+    create_quiz_indexes,
+]
+
 async def create_indexes():
-    """Create database indexes for better performance"""
-    try:
-        if database.database is None:
-            return
-        
-        # Somali words indexes
-        await database.database.somali_words.create_index("tier")
-        await database.database.somali_words.create_index("category") 
-        await database.database.somali_words.create_index([
-            ("somali", "text"),
-            ("english", "text"),
-            ("tags", "text")
-        ])
-        
-        # User progress indexes
-        await database.database.user_progress.create_index("user_id", unique=True)
-        await database.database.user_progress.create_index("last_activity")
-        
-        # Audio cache indexes
-        await database.database.audio_cache.create_index("cache_key", unique=True)
-        await database.database.audio_cache.create_index(
-            "created_at", 
-            expireAfterSeconds=30 * 24 * 60 * 60  # 30 days TTL
-        )
-        
-        # Quiz sessions indexes
-        await database.database.quiz_sessions.create_index("user_id")
-        await database.database.quiz_sessions.create_index("started_at")
-        await database.database.quiz_sessions.create_index("completed_at")
-        
+    """Create database indexes for better performance.
+
+    Each step is guarded on its own, so one failing (e.g. a unique index
+    over existing duplicates) does not skip the others.
+    """
+    if database.database is None:
+        return
+    
+    failed = 0
+    for setup in CORE_INDEX_SETUPS + index_setups:
+        try:
+            await setup(database.database)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Error in {setup.__name__}: {e}")
+    
+    if not failed:
         logger.info("Database indexes created successfully")
-        
-    except Exception as e:
-        logger.error(f"Error creating database indexes: {e}")
 
 async def close_mongo_connection():
     """Close database connection"""
@@ -43,6 +43,7 @@ class UserProgress(BaseModel):
     total_points: int = 0
     current_streak: int = 0
     longest_streak: int = 0
+    last_streak_day: Optional[datetime] = None  # Last learning activity counted towards the streak
     last_activity: datetime = Field(default_factory=datetime.utcnow)
     unlocked_tiers: List[int] = [1]
     completed_words: List[str] = []  # word IDs
@@ -50,25 +51,61 @@ class UserProgress(BaseModel):
     badges_earned: List[str] = []
     quiz_scores: List[Dict[str, Any]] = []
     cultural_acknowledgments: List[int] = []  # tier numbers acknowledged
+    revision: int = 0  # Incremented on every stored write, exposed as ETag
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class UserProgressWithTiers(UserProgress):
+    tier_status: List[Dict[str, Any]] = []  # Unlock state of every tier
+
 class UserProgressUpdate(BaseModel):
     word_completed: Optional[str] = None
-    points_earned: Optional[int] = None
+    points_earned: Optional[int] = Field(default=None, ge=0, le=1000)  # Words are worth 10 points
     favorite_toggled: Optional[str] = None
     quiz_completed: Optional[Dict[str, Any]] = None
     cultural_tier_acknowledged: Optional[int] = None
 
+class ProgressEvent(UserProgressUpdate):
+    idempotency_key: str = Field(..., min_length=1, max_length=128)  # Client-generated
+    occurred_at: Optional[datetime] = None  # When the event happened on the client
+
+class ProgressEventBatch(BaseModel):
+    events: List[ProgressEvent] = Field(..., max_length=500)  # Applied in order
+
+class ProgressEventBatchResult(BaseModel):
+    applied: int
+    duplicates: int
+    progress: UserProgressWithTiers
+
 # Audio Generation Models
 class AudioRequest(BaseModel):
     text: str
     speed: float = Field(default=1.0, ge=0.25, le=4.0)  # Speed multiplier
+    inline: bool = False  # Also return the clip base64 encoded in the response
 
 class AudioResponse(BaseModel):
-    audio_content: str  # Base64 encoded audio
+    audio_url: str  # Streams the MP3 (cacheable, supports Range)
+    audio_content: Optional[str] = None  # Base64 encoded audio, only if requested inline
     cache_key: str
     duration_seconds: Optional[float] = None
+    fallback_speed: Optional[float] = None  # Set when synthesis failed and another speed is served
+
+class AudioBatchRequest(BaseModel):
+    items: List[AudioRequest] = Field(..., min_length=1, max_length=100)  # Results keep this order
+
+class AudioBatchItem(BaseModel):
+    index: int  # Position in the request
+    cache_key: str
+    audio_url: Optional[str] = None
+    audio_content: Optional[str] = None  # Base64 encoded audio, only if requested inline
+    duration_seconds: Optional[float] = None
+    fallback_speed: Optional[float] = None  # Set when synthesis failed and another speed is served
+    error: Optional[str] = None  # Set instead of audio_url when synthesis failed
+
+class AudioBatchResponse(BaseModel):
+    results: List[AudioBatchItem]
+    cache_hits: int
+    synthesized: int
 
 # Quiz Models
 class QuizQuestion(BaseModel):
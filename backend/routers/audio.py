@@ -1,18 +1,107 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import base64
+import json
 import logging
 
-from models.somali_models import AudioRequest, AudioResponse
-from services.tts_service import get_tts_service
+from models.somali_models import (
+    AudioBatchItem,
+    AudioBatchRequest,
+    AudioBatchResponse,
+    AudioRequest,
+    AudioResponse
+)
+from services.audio_prewarmer import get_audio_prewarmer
+from services.audio_pregeneration import (
+    DEFAULT_PREGENERATION_SPEEDS,
+    DEFAULT_PREGENERATION_TIERS,
+    load_pregeneration_status,
+    pregeneration_running,
+    start_audio_pregeneration,
+)
+from services.tts_service import (
+    TTSError,
+    TTSService,
+    TTSUnavailable,
+    canonical_audio_request,
+    get_tts_service,
+)
+from services.audio_cache import (
+    AUDIO_MEDIA_TYPE,
+    audio_bytes,
+    get_audio_cache_accounting,
+    get_audio_flight,
+    get_audio_memory_cache,
+    load_clip,
+    load_clips,
+    load_fallback_clip,
+    synthesize_and_cache,
+)
 from database import get_database
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.post("/audio/synthesize", response_model=AudioResponse)
+# Clips are content-addressed by cache key, so a URL's bytes never change
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Provider calls in flight per batch request
+BATCH_SYNTHESIS_CONCURRENCY = 4
+
+def audio_response(
+    http_request: Request,
+    cache_key: str,
+    document: Dict[str, Any],
+    inline: bool = False,
+    fallback_speed: Optional[float] = None
+) -> AudioResponse:
+    return AudioResponse(
+        audio_url=http_request.app.url_path_for("stream_audio", cache_key=cache_key),
+        audio_content=base64.b64encode(audio_bytes(document)).decode() if inline else None,
+        cache_key=cache_key,
+        duration_seconds=document.get("duration_seconds"),
+        fallback_speed=fallback_speed
+    )
+
+async def synthesize_or_fallback(
+    db: AsyncIOMotorDatabase,
+    tts_service: TTSService,
+    text: str,
+    speed: float,
+    cache_key: str
+) -> Tuple[str, Dict[str, Any], Optional[float]]:
+    """(cache_key, document, fallback_speed) for a cache miss.
+
+    Concurrent misses for the same clip share one synthesis and cache write.
+    If synthesis fails, the text cached at another speed is served instead
+    (stale-while-error); without one the error is raised.
+    """
+    try:
+        document = await get_audio_flight().do(
+            cache_key,
+            lambda: synthesize_and_cache(db, tts_service, text, speed, cache_key)
+        )
+        return cache_key, document, None
+    except TTSError as e:
+        fallback = await load_fallback_clip(db, text, speed)
+        if fallback is None:
+            raise
+        logger.warning(f"Serving {text[:50]} at speed {fallback[2]} instead of {speed}: {e}")
+        return fallback
+
+def tts_unavailable(e: TTSUnavailable) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=f"Failed to generate audio: {str(e)}",
+        headers={"Retry-After": str(int(e.retry_after or 0) + 1)}
+    )
+
+@router.post("/audio/synthesize", response_model=AudioResponse, response_model_exclude_none=True)
 async def synthesize_audio(
     request: AudioRequest,
+    http_request: Request,
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """Generate Somali audio pronunciation with caching"""
@@ -20,55 +109,28 @@ async def synthesize_audio(
         # Get TTS service instance
         tts_service = get_tts_service()
         
-        # Generate cache key
-        cache_key = tts_service.generate_cache_key(request.text, request.speed)
+        # Equivalent spellings and speeds share one clip
+        text, speed = canonical_audio_request(request.text, request.speed)
+        cache_key = tts_service.generate_cache_key(text, speed)
         
-        # Check cache first
-        cached_audio = await db.audio_cache.find_one({"cache_key": cache_key})
+        # Check cache first (memory, then audio_cache)
+        cached_audio = await load_clip(db, cache_key)
+        get_audio_prewarmer().record_request(text, speed, hit=cached_audio is not None)
         if cached_audio:
             logger.info(f"Serving cached audio for: {request.text[:50]}...")
-            return AudioResponse(
-                audio_content=cached_audio["audio_content"],
-                cache_key=cache_key,
-                duration_seconds=cached_audio.get("duration_seconds")
-            )
+            return audio_response(http_request, cache_key, cached_audio, request.inline)
         
-        # Generate new audio
-        audio_content, _ = await tts_service.synthesize_speech(
-            text=request.text,
-            speed=request.speed
-        )
-        
-        # Estimate duration
-        duration = tts_service.estimate_audio_duration(request.text, request.speed)
-        
-        # Cache the audio
-        cache_document = {
-            "cache_key": cache_key,
-            "text": request.text,
-            "speed": request.speed,
-            "audio_content": audio_content,
-            "duration_seconds": duration,
-            "created_at": datetime.utcnow(),
-            "access_count": 1
-        }
-        
-        await db.audio_cache.insert_one(cache_document)
-        
-        # Create TTL index for automatic cleanup (30 days)
-        await db.audio_cache.create_index(
-            "created_at",
-            expireAfterSeconds=30 * 24 * 60 * 60  # 30 days
+        serving_key, cache_document, fallback_speed = await synthesize_or_fallback(
+            db, tts_service, text, speed, cache_key
         )
         
         logger.info(f"Generated and cached new audio for: {request.text[:50]}...")
         
-        return AudioResponse(
-            audio_content=audio_content,
-            cache_key=cache_key,
-            duration_seconds=duration
-        )
+        return audio_response(http_request, serving_key, cache_document, request.inline, fallback_speed)
     
+    except TTSUnavailable as e:
+        logger.error(f"Error synthesizing audio: {e}")
+        raise tts_unavailable(e)
     except Exception as e:
         logger.error(f"Error synthesizing audio: {e}")
         raise HTTPException(
@@ -76,6 +138,187 @@ async def synthesize_audio(
             detail=f"Failed to generate audio: {str(e)}"
         )
 
+@router.post(
+    "/audio/synthesize/batch",
+    response_model=AudioBatchResponse,
+    response_model_exclude_none=True
+)
+async def synthesize_audio_batch(
+    batch: AudioBatchRequest,
+    http_request: Request,
+    stream: bool = Query(False, description="Emit results as NDJSON lines as soon as each clip is ready"),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Generate audio for many (text, speed) pairs, e.g. a whole flashcard deck.
+    
+    Cache hits are resolved with one lookup; only the misses are synthesized,
+    concurrently. A failed clip is reported in its result instead of failing
+    the batch. With stream=true, cached clips are sent first and the rest as
+    they finish, each line carrying its index in the request.
+    """
+    try:
+        tts_service = get_tts_service()
+        requests = [canonical_audio_request(item.text, item.speed) for item in batch.items]
+        cache_keys = [tts_service.generate_cache_key(text, speed) for text, speed in requests]
+        
+        clips = await load_clips(db, cache_keys)
+        prewarmer = get_audio_prewarmer()
+        for (text, speed), cache_key in zip(requests, cache_keys):
+            prewarmer.record_request(text, speed, hit=cache_key in clips)
+        
+        missing = {
+            cache_key: request for cache_key, request in zip(cache_keys, requests) if cache_key not in clips
+        }
+        semaphore = asyncio.Semaphore(BATCH_SYNTHESIS_CONCURRENCY)
+        
+        async def synthesize(cache_key: str, text: str, speed: float) -> Tuple[str, Any]:
+            try:
+                async with semaphore:
+                    return cache_key, await synthesize_or_fallback(db, tts_service, text, speed, cache_key)
+            except Exception as e:
+                logger.warning(f"Failed to synthesize audio for {text[:50]}: {e}")
+                return cache_key, e
+        
+        def result(index: int, outcome: Any) -> AudioBatchItem:
+            """outcome is (cache_key, document, fallback_speed) or the synthesis error"""
+            if isinstance(outcome, Exception):
+                return AudioBatchItem(
+                    index=index, cache_key=cache_keys[index], error=f"Failed to generate audio: {outcome}"
+                )
+            serving_key, document, fallback_speed = outcome
+            response = audio_response(http_request, serving_key, document, batch.items[index].inline, fallback_speed)
+            return AudioBatchItem(index=index, **response.dict())
+        
+        if stream:
+            async def lines() -> AsyncIterator[str]:
+                # Started here, so they live exactly as long as the response body
+                tasks = [
+                    asyncio.ensure_future(synthesize(cache_key, text, speed))
+                    for cache_key, (text, speed) in missing.items()
+                ]
+                try:
+                    for index, cache_key in enumerate(cache_keys):
+                        if cache_key in clips:
+                            yield result(index, (cache_key, clips[cache_key], None)).json(exclude_none=True) + "\n"
+                    for finished in asyncio.as_completed(tasks):
+                        cache_key, outcome = await finished
+                        for index, key in enumerate(cache_keys):
+                            if key == cache_key:
+                                yield result(index, outcome).json(exclude_none=True) + "\n"
+                except Exception as e:
+                    # The status line is already sent, so the error ends the stream instead
+                    logger.error(f"Error streaming audio batch: {e}")
+                    yield json.dumps({"error": f"Failed to generate audio: {e}"}) + "\n"
+                finally:
+                    # Client went away (or the stream failed): stop the remaining syntheses
+                    for task in tasks:
+                        task.cancel()
+            
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+        
+        synthesized = dict(await asyncio.gather(*(
+            synthesize(cache_key, text, speed) for cache_key, (text, speed) in missing.items()
+        )))
+        outcomes = {**{key: (key, clip, None) for key, clip in clips.items()}, **synthesized}
+        return AudioBatchResponse(
+            results=[result(index, outcomes[cache_key]) for index, cache_key in enumerate(cache_keys)],
+            cache_hits=sum(1 for cache_key in cache_keys if cache_key in clips),
+            synthesized=sum(
+                1 for outcome in synthesized.values()
+                if not isinstance(outcome, Exception) and outcome[2] is None
+            )
+        )
+    
+    except Exception as e:
+        logger.error(f"Error synthesizing audio batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate audio: {str(e)}")
+
+def parse_byte_range(header_value: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single-range Range header.
+
+    Returns None when the header should be ignored (not bytes, multiple
+    ranges, malformed) and raises ValueError when it cannot be satisfied.
+    """
+    unit, _, spec = header_value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = (part.strip() for part in spec.partition("-"))
+    if not (first or last) or any(part and not part.isdigit() for part in (first, last)):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+@router.get("/audio/clips/{cache_key}", name="stream_audio")
+async def stream_audio(
+    cache_key: str,
+    range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Serve a cached clip as audio/mpeg (honors Range and If-None-Match)"""
+    try:
+        headers = {
+            "ETag": f'"{cache_key}"',
+            "Cache-Control": AUDIO_CACHE_CONTROL,
+            "Accept-Ranges": "bytes"
+        }
+        if if_none_match and any(
+            tag.strip().removeprefix("W/") in (headers["ETag"], "*")
+            for tag in if_none_match.split(",")
+        ):
+            return Response(status_code=304, headers=headers)
+        
+        clip = await load_clip(db, cache_key)
+        if not clip:
+            raise HTTPException(status_code=404, detail="Audio clip not found")
+        
+        audio = clip["audio"]
+        if range:
+            try:
+                byte_range = parse_byte_range(range, len(audio))
+            except ValueError:
+                return Response(
+                    status_code=416,
+                    headers={**headers, "Content-Range": f"bytes */{len(audio)}"}
+                )
+            if byte_range:
+                start, end = byte_range
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(audio)}"
+                return Response(
+                    content=audio[start:end + 1],
+                    status_code=206,
+                    media_type=AUDIO_MEDIA_TYPE,
+                    headers=headers
+                )
+        
+        return Response(content=audio, media_type=AUDIO_MEDIA_TYPE, headers=headers)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming audio: {e}")
+        raise HTTPException(status_code=500, detail="Failed to stream audio")
+
+@router.get("/audio/voices")
+async def get_voices():
+    """Somali voices offered by the TTS provider (cached)"""
+    try:
+        voices = await get_tts_service().get_supported_voices()
+        return {"voices": voices}
+    except Exception as e:
+        logger.error(f"Error retrieving voices: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve voices")
+
 @router.get("/audio/cache-stats")
 async def get_cache_stats(db: AsyncIOMotorDatabase = Depends(get_database)):
     """Get audio cache statistics"""
@@ -114,12 +357,19 @@ async def get_cache_stats(db: AsyncIOMotorDatabase = Depends(get_database)):
         
         speed_dist = await db.audio_cache.aggregate(speed_pipeline).to_list(length=None)
         
+        accounting = await get_audio_cache_accounting().get_stats(db)
+        
         return {
             "total_cached_items": total_cached,
             "total_access_count": cache_stats["total_access_count"],
             "average_access_count": round(cache_stats["avg_access_count"], 2),
             "speed_distribution": speed_dist,
-            "cache_hit_rate": "N/A"  # Would need request tracking to calculate
+            "cache_hit_rate": accounting["hit_rate"],
+            "accounting": accounting,
+            "coalescing": get_audio_flight().get_stats(),
+            "memory_cache": get_audio_memory_cache().get_stats(),
+            "prewarmer": get_audio_prewarmer().get_stats(),
+            "provider": get_tts_service().get_stats()
         }
     
     except Exception as e:
@@ -131,6 +381,7 @@ async def clear_audio_cache(db: AsyncIOMotorDatabase = Depends(get_database)):
     """Clear the audio cache (admin function)"""
     try:
         result = await db.audio_cache.delete_many({})
+        get_audio_memory_cache().clear()
         logger.info(f"Cleared {result.deleted_count} items from audio cache")
         
         return {
@@ -142,67 +393,30 @@ async def clear_audio_cache(db: AsyncIOMotorDatabase = Depends(get_database)):
         logger.error(f"Error clearing audio cache: {e}")
         raise HTTPException(status_code=500, detail="Failed to clear audio cache")
 
-@router.post("/audio/pregenerate")
-async def pregenerate_common_audio(db: AsyncIOMotorDatabase = Depends(get_database)):
-    """Pre-generate audio for common words to improve performance"""
+@router.post("/audio/pregenerate", status_code=202)
+async def pregenerate_common_audio(
+    tiers: List[int] = Query(DEFAULT_PREGENERATION_TIERS, description="Tiers whose words to cover"),
+    speeds: List[float] = Query(DEFAULT_PREGENERATION_SPEEDS, description="Speeds to cover"),
+    include_examples: bool = Query(False, description="Also cover example sentences"),
+    concurrency: int = Query(4, ge=1, le=32),
+    resume: bool = Query(True, description="Continue an interrupted run from its checkpoint"),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Start pre-generating audio for common words in the background"""
+    started = await start_audio_pregeneration(
+        db, tiers=tiers, speeds=speeds, include_examples=include_examples,
+        concurrency=concurrency, resume=resume
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="An audio pregeneration job is already running")
+    return {"started": True, "tiers": tiers, "speeds": speeds, "include_examples": include_examples}
+
+@router.get("/audio/pregenerate")
+async def get_pregeneration_status(db: AsyncIOMotorDatabase = Depends(get_database)):
+    """Get progress (done, failed, remaining, throughput) of the last or current pregeneration run"""
     try:
-        # Get TTS service instance
-        tts_service = get_tts_service()
-        
-        # Get most common words (tier 1 and 2)
-        common_words = await db.somali_words.find(
-            {"tier": {"$in": [1, 2]}}
-        ).to_list(length=None)
-        
-        generated_count = 0
-        speeds = [1.0, 0.7, 0.4]  # Normal, Slow, Ultra Slow
-        
-        for word in common_words:
-            for speed in speeds:
-                cache_key = tts_service.generate_cache_key(word["somali"], speed)
-                
-                # Check if already cached
-                existing = await db.audio_cache.find_one({"cache_key": cache_key})
-                if existing:
-                    continue
-                
-                try:
-                    # Generate audio
-                    audio_content, _ = await tts_service.synthesize_speech(
-                        text=word["somali"],
-                        speed=speed
-                    )
-                    
-                    duration = tts_service.estimate_audio_duration(word["somali"], speed)
-                    
-                    # Cache it
-                    cache_document = {
-                        "cache_key": cache_key,
-                        "text": word["somali"],
-                        "speed": speed,
-                        "audio_content": audio_content,
-                        "duration_seconds": duration,
-                        "created_at": datetime.utcnow(),
-                        "access_count": 0,
-                        "pregenerated": True
-                    }
-                    
-                    await db.audio_cache.insert_one(cache_document)
-                    generated_count += 1
-                    
-                    logger.info(f"Pre-generated audio for: {word['somali']} at speed {speed}")
-                
-                except Exception as e:
-                    logger.warning(f"Failed to pre-generate audio for {word['somali']}: {e}")
-                    continue
-        
-        return {
-            "message": f"Pre-generated {generated_count} audio files",
-            "generated_count": generated_count,
-            "total_words_processed": len(common_words),
-            "speeds_generated": speeds
-        }
-    
+        status = await load_pregeneration_status(db)
+        return {"running": pregeneration_running() or bool(status and status["running"]), "status": status}
     except Exception as e:
-        logger.error(f"Error pre-generating audio: {e}")
-        raise HTTPException(status_code=500, detail="Failed to pre-generate audio")
\ No newline at end of file
+        logger.error(f"Error retrieving pregeneration status: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve pregeneration status")
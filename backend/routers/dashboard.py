@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Depends
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import asyncio
+import logging
+
+from database import get_database
+from routers.tiers import load_tiers_with_counts
+from routers.users import load_user_progress
+from routers.words import load_categories
+from services.progress_rules import progress_with_tiers
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/users/{user_id}/bootstrap")
+async def get_dashboard_bootstrap(
+    user_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get everything the dashboard needs on load in a single response"""
+    try:
+        # Independent reads run concurrently
+        progress, tiers, categories = await asyncio.gather(
+            load_user_progress(db, user_id),
+            load_tiers_with_counts(db),
+            load_categories(db)
+        )
+        
+        return {
+            "user_id": user_id,
+            "progress": progress_with_tiers(progress),
+            "tiers": tiers,
+            "total_tiers": len(tiers),
+            "categories": categories
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error loading dashboard bootstrap for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load dashboard")
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Any, Dict, Optional
+import logging
+
+from database import get_database
+from services.leaderboard import ALL_TIME, get_leaderboard, week_key
+from services.progress_store import mongo_now
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+async def load_board(db: AsyncIOMotorDatabase, board_key: str, limit: int) -> Dict[str, Any]:
+    """Top entries of a leaderboard, served from the cached top-K"""
+    leaderboard = get_leaderboard()
+    if limit > leaderboard.top_size:
+        raise HTTPException(status_code=400, detail=f"Limit cannot exceed {leaderboard.top_size}")
+
+    board = await leaderboard.board(db, board_key)
+    return {
+        "entries": board.top(limit),
+        "ranked_users": board.ranked_users
+    }
+
+@router.get("/all-time")
+async def get_all_time_leaderboard(
+    limit: int = Query(10, ge=1, description="Number of entries"),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get the all-time leaderboard by total points"""
+    try:
+        return {"period": ALL_TIME, **await load_board(db, ALL_TIME, limit)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving all-time leaderboard: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve leaderboard")
+
+@router.get("/weekly")
+async def get_weekly_leaderboard(
+    week: Optional[str] = Query(None, pattern=r"^\d{4}-W\d{2}$", description="ISO week, e.g. 2024-W07 (default: current)"),
+    limit: int = Query(10, ge=1, description="Number of entries"),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get the leaderboard of points earned in one week"""
+    try:
+        week = week or week_key(mongo_now())
+        return {"period": "weekly", "week": week, **await load_board(db, week, limit)}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving weekly leaderboard: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve leaderboard")
+
+@router.get("/users/{user_id}/rank")
+async def get_user_rank(
+    user_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get a user's all-time and current-week rank"""
+    try:
+        leaderboard = get_leaderboard()
+        ranks = {"user_id": user_id}
+        for period, board_key in ((ALL_TIME, ALL_TIME), ("weekly", week_key(mongo_now()))):
+            board = await leaderboard.board(db, board_key)
+            points = await leaderboard.user_points(db, board_key, user_id)
+            ranks[period] = {
+                "rank": board.rank(points),
+                "points": points,
+                "ranked_users": board.ranked_users
+            }
+        return ranks
+
+    except Exception as e:
+        logger.error(f"Error retrieving rank for user {user_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve user rank")
+
+@router.get("/stats")
+async def get_leaderboard_stats():
+    """Get leaderboard cache statistics"""
+    return get_leaderboard().get_stats()
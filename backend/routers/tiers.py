@@ -1,30 +1,90 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List
+from pymongo import ReturnDocument
+from typing import Any, Dict, List, Optional
 import logging
 
 from database import get_database
 from data.somali_vocabulary import TIER_DEFINITIONS, CULTURAL_RESPECT_MESSAGES
+from services.audio_prewarmer import get_audio_prewarmer
+from services.catalog_cache import get_catalog_cache
+from services.progress_buffer import get_progress_buffer
+from services.badge_engine import TIER_UNLOCKED, evaluate_badges
+from services.progress_rules import (
+    cultural_acknowledgment_update,
+    missing_tier_requirements,
+    progress_with_tiers
+)
+from services.progress_cache import get_progress_cache
+from services.progress_store import (
+    TIERS_BEFORE_ACKNOWLEDGMENT_FIELD,
+    etag_matches,
+    load_progress_document,
+    mongo_now,
+    progress_etag,
+    progress_from_document,
+    revision_query,
+    word_sets_from_document
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+async def count_words_by_tier(db: AsyncIOMotorDatabase) -> Dict[int, int]:
+    """Word count of every tier in one aggregation"""
+    tier_counts = {tier["id"]: 0 for tier in TIER_DEFINITIONS}
+    async for group in db.somali_words.aggregate([
+        {"$group": {"_id": "$tier", "count": {"$sum": 1}}}
+    ]):
+        tier_counts[group["_id"]] = group["count"]
+    return tier_counts
+
+async def load_tiers_with_counts(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """Tier definitions enhanced with their actual word counts"""
+    # Counts only change with the catalog, so they are cached per catalog version
+    tier_counts = await get_catalog_cache().get(db, "tier_counts", lambda: count_words_by_tier(db))
+    
+    # Enhance tier definitions with actual counts
+    enhanced_tiers = []
+    for tier in TIER_DEFINITIONS:
+        tier_data = tier.copy()
+        tier_data["actual_word_count"] = tier_counts.get(tier["id"], 0)
+        enhanced_tiers.append(tier_data)
+    
+    return enhanced_tiers
+
+# Words shown as a preview on the tier details
+TIER_SAMPLE_SIZE = 3
+
+async def load_tier_summary(db: AsyncIOMotorDatabase, tier_id: int) -> Dict[str, Any]:
+    """Word count, category/difficulty breakdowns and sample words of a tier.
+    
+    Computed server-side in a single $facet so only the summary leaves Mongo,
+    however many words the tier holds.
+    """
+    results = await db.somali_words.aggregate([
+        {"$match": {"tier": tier_id}},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "categories": [{"$group": {"_id": "$category", "count": {"$sum": 1}}}],
+            "difficulties": [{"$group": {"_id": "$difficulty", "count": {"$sum": 1}}}],
+            "samples": [{"$limit": TIER_SAMPLE_SIZE}, {"$project": {"_id": 0}}]
+        }}
+    ]).to_list(length=1)
+    facets = results[0]
+    
+    return {
+        "word_count": facets["total"][0]["count"] if facets["total"] else 0,
+        "category_breakdown": {group["_id"]: group["count"] for group in facets["categories"]},
+        "difficulty_breakdown": {group["_id"]: group["count"] for group in facets["difficulties"]},
+        "sample_words": facets["samples"]
+    }
+
 @router.get("/tiers")
 async def get_all_tiers(db: AsyncIOMotorDatabase = Depends(get_database)):
     """Get all tier definitions with current word counts"""
     try:
-        # Get actual word counts from database
-        tier_counts = {}
-        for tier_id in range(1, 6):  # Tiers 1-5
-            count = await db.somali_words.count_documents({"tier": tier_id})
-            tier_counts[tier_id] = count
-        
-        # Enhance tier definitions with actual counts
-        enhanced_tiers = []
-        for tier in TIER_DEFINITIONS:
-            tier_data = tier.copy()
-            tier_data["actual_word_count"] = tier_counts.get(tier["id"], 0)
-            enhanced_tiers.append(tier_data)
+        enhanced_tiers = await load_tiers_with_counts(db)
         
         return {
             "tiers": enhanced_tiers,
@@ -52,24 +112,10 @@ async def get_tier_details(
         if not tier_def:
             raise HTTPException(status_code=404, detail="Tier not found")
         
-        # Get words for this tier
-        words = await db.somali_words.find({"tier": tier_id}).to_list(length=None)
-        
-        # Get category breakdown
-        categories = {}
-        for word in words:
-            category = word["category"]
-            if category not in categories:
-                categories[category] = 0
-            categories[category] += 1
-        
-        # Get difficulty breakdown
-        difficulties = {}
-        for word in words:
-            difficulty = word["difficulty"]
-            if difficulty not in difficulties:
-                difficulties[difficulty] = 0
-            difficulties[difficulty] += 1
+        # Breakdowns and samples come from one aggregation, cached per catalog version
+        summary = await get_catalog_cache().get(
+            db, ("tier_summary", tier_id), lambda: load_tier_summary(db, tier_id)
+        )
         
         # Check if tier has cultural content
         cultural_info = None
@@ -78,11 +124,11 @@ async def get_tier_details(
         
         return {
             "tier": tier_def,
-            "word_count": len(words),
-            "category_breakdown": categories,
-            "difficulty_breakdown": difficulties,
+            "word_count": summary["word_count"],
+            "category_breakdown": summary["category_breakdown"],
+            "difficulty_breakdown": summary["difficulty_breakdown"],
             "cultural_sensitivity": cultural_info,
-            "sample_words": words[:3] if words else []  # First 3 words as preview
+            "sample_words": summary["sample_words"]
         }
     
     except HTTPException:
@@ -110,7 +156,7 @@ async def check_tier_unlock(
             raise HTTPException(status_code=404, detail="Tier not found")
         
         # Get user progress
-        progress = await db.user_progress.find_one({"user_id": user_id})
+        progress = await load_progress_document(db, user_id)
         if not progress:
             return {
                 "can_unlock": False,
@@ -119,44 +165,8 @@ async def check_tier_unlock(
             }
         
         requirements = tier_def["unlock_requirements"]
-        can_unlock = True
-        missing_requirements = []
-        
-        # Check point requirements
-        required_points = requirements.get("points", 0)
-        user_points = progress.get("total_points", 0)
-        if user_points < required_points:
-            can_unlock = False
-            missing_requirements.append({
-                "type": "points",
-                "required": required_points,
-                "current": user_points,
-                "missing": required_points - user_points
-            })
-        
-        # Check previous tier completion
-        required_prev_tier = requirements.get("completed_tier")
-        if required_prev_tier:
-            unlocked_tiers = progress.get("unlocked_tiers", [])
-            if required_prev_tier not in unlocked_tiers:
-                can_unlock = False
-                missing_requirements.append({
-                    "type": "previous_tier",
-                    "required": required_prev_tier,
-                    "message": f"Must complete Tier {required_prev_tier} first"
-                })
-        
-        # Check cultural acknowledgment
-        requires_cultural = requirements.get("cultural_acknowledgment", False)
-        if requires_cultural:
-            cultural_acks = progress.get("cultural_acknowledgments", [])
-            if tier_id not in cultural_acks:
-                can_unlock = False
-                missing_requirements.append({
-                    "type": "cultural_acknowledgment", 
-                    "required": tier_id,
-                    "message": "Must acknowledge cultural sensitivity guidelines"
-                })
+        missing_requirements = missing_tier_requirements(tier_def, progress)
+        can_unlock = not missing_requirements
         
         return {
             "tier_id": tier_id,
@@ -178,9 +188,11 @@ async def check_tier_unlock(
 async def acknowledge_cultural_guidelines(
     tier_id: int,
     user_id: str,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Acknowledge cultural sensitivity guidelines for a tier"""
+    """Acknowledge cultural sensitivity guidelines for a tier (honors If-Match)"""
     try:
         # Verify tier has cultural content
         if tier_id not in CULTURAL_RESPECT_MESSAGES:
@@ -189,35 +201,65 @@ async def acknowledge_cultural_guidelines(
                 detail="This tier does not require cultural acknowledgment"
             )
         
-        # Get user progress
-        progress = await db.user_progress.find_one({"user_id": user_id})
-        if not progress:
+        # Buffered writes must land first so the update below doesn't race them
+        await get_progress_buffer().flush_user(db, user_id)
+        
+        query: Dict[str, Any] = {"user_id": user_id}
+        if if_match:
+            current_progress = await load_progress_document(db, user_id)
+            if not current_progress:
+                raise HTTPException(status_code=404, detail="User progress not found")
+            revision = current_progress.get("revision", 0)
+            if not etag_matches(if_match, revision):
+                raise HTTPException(status_code=412, detail="Progress has been modified")
+            query.update(revision_query(revision))
+        
+        # Acknowledge and unlock in one atomic write, getting the result back
+        progress = await db.user_progress.find_one_and_update(
+            query,
+            cultural_acknowledgment_update(tier_id, mongo_now()),
+            return_document=ReturnDocument.AFTER
+        )
+        if progress is None:
+            if if_match:
+                get_progress_cache().invalidate(user_id)
+                raise HTTPException(status_code=412, detail="Progress has been modified")
             raise HTTPException(status_code=404, detail="User progress not found")
         
-        # Add cultural acknowledgment
-        cultural_acks = progress.get("cultural_acknowledgments", [])
-        if tier_id not in cultural_acks:
-            cultural_acks.append(tier_id)
-            
-            # Update database
-            await db.user_progress.update_one(
+        newly_unlocked = progress["unlocked_tiers"][progress[TIERS_BEFORE_ACKNOWLEDGMENT_FIELD]:]
+        
+        # Badges for a new unlock are evaluated in memory; awarding one is rare
+        progress_obj = progress_from_document(progress)
+        completed, favorites = word_sets_from_document(progress)
+        awarded = evaluate_badges(progress_obj, completed, favorites, [TIER_UNLOCKED])
+        if awarded:
+            progress = await db.user_progress.find_one_and_update(
                 {"user_id": user_id},
-                {
-                    "$set": {"cultural_acknowledgments": cultural_acks},
-                    "$currentDate": {"updated_at": True}
-                }
+                {"$addToSet": {"badges_earned": {"$each": awarded}}, "$inc": {"revision": 1}},
+                return_document=ReturnDocument.AFTER
             )
+            progress_obj = progress_from_document(progress)
+        get_progress_cache().put(user_id, progress)
         
-        # Check if this unlocks the tier
-        unlock_result = await check_tier_unlock(tier_id, user_id, db)
+        # Check if this unlocks the tier, using the document we just updated
+        progress_state = progress_with_tiers(progress_obj)
+        tier_status = next(
+            status for status in progress_state.tier_status if status["tier_id"] == tier_id
+        )
         
         logger.info(f"User {user_id} acknowledged cultural guidelines for tier {tier_id}")
         
+        if newly_unlocked:
+            get_audio_prewarmer().record_tier_unlocks(newly_unlocked)
+        
+        response.headers["ETag"] = progress_etag(progress_state.revision)
         return {
             "tier_id": tier_id,
             "acknowledged": True,
-            "can_now_unlock": unlock_result["can_unlock"],
-            "cultural_message": CULTURAL_RESPECT_MESSAGES[tier_id]
+            "can_now_unlock": tier_status["can_unlock"],
+            "unlocked": tier_status["already_unlocked"],
+            "cultural_message": CULTURAL_RESPECT_MESSAGES[tier_id],
+            "progress": progress_state
         }
     
     except HTTPException:
@@ -1,12 +1,60 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from typing import List, Optional
-from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
 import logging
 
-from models.somali_models import UserProgress, UserProgressUpdate, UserStats
+from models.somali_models import (
+    UserProgress,
+    UserProgressUpdate,
+    UserProgressWithTiers,
+    UserStats,
+    ProgressEventBatch,
+    ProgressEventBatchResult
+)
 from database import get_database
-from data.somali_vocabulary import TIER_DEFINITIONS
+from services.audio_prewarmer import get_audio_prewarmer
+from services.badge_engine import BADGE_DEFINITIONS, backfill_badges
+from services.favorites import (
+    FAVORITE_WORD_FIELDS,
+    load_favorites_page,
+    reconcile_favorites,
+    sync_favorites
+)
+from services.job_checkpoints import job_lease_held
+from services.leaderboard import get_leaderboard
+from services.learning_activity import (
+    LearningActivity,
+    activity_heatmap,
+    activity_since,
+    activity_snapshot,
+    load_daily_activity,
+    record_learning_activity,
+    total_active_minutes
+)
+from services.progress_buffer import get_progress_buffer
+from services.progress_cache import get_progress_cache
+from services.progress_recompute import (
+    load_recompute_checkpoint,
+    recompute_running,
+    start_progress_recompute
+)
+from services.progress_rules import apply_progress_update, current_day_streak, progress_with_tiers
+from services.progress_store import (
+    PROCESSED_EVENT_KEYS_FIELD,
+    MAX_PROCESSED_EVENT_KEYS,
+    RevisionConflict,
+    client_time,
+    etag_matches,
+    insert_progress,
+    load_progress_document,
+    mongo_now,
+    progress_etag,
+    progress_from_document,
+    save_progress,
+    word_sets_from_document
+)
+from services.recommendations import recommend_words
+from services.word_sets import WordSet
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -19,9 +67,9 @@ async def create_user_progress(
     """Create initial progress for a user"""
     try:
         # Check if user already exists
-        existing_user = await db.user_progress.find_one({"user_id": user_id})
+        existing_user = await load_progress_document(db, user_id)
         if existing_user:
-            return UserProgress(**existing_user)
+            return progress_from_document(existing_user)
         
         # Create new user progress
         user_progress = UserProgress(
@@ -38,7 +86,7 @@ async def create_user_progress(
             cultural_acknowledgments=[]
         )
         
-        await db.user_progress.insert_one(user_progress.dict())
+        await insert_progress(db, user_progress)
         logger.info(f"Created progress for user {user_id}")
         
         return user_progress
@@ -47,129 +95,136 @@ async def create_user_progress(
         logger.error(f"Error creating user progress: {e}")
         raise HTTPException(status_code=500, detail="Failed to create user progress")
 
+async def load_user_progress(db: AsyncIOMotorDatabase, user_id: str) -> UserProgress:
+    """Get a user's progress, creating it on first access"""
+    progress = await load_progress_document(db, user_id)
+    if not progress:
+        # Create new user if doesn't exist
+        return await create_user_progress(user_id, db)
+    
+    return progress_from_document(progress)
+
 @router.get("/users/{user_id}/progress", response_model=UserProgress)
 async def get_user_progress(
     user_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get user progress"""
+    """Get user progress (honors If-None-Match against the progress ETag)"""
     try:
-        progress = await db.user_progress.find_one({"user_id": user_id})
-        if not progress:
-            # Create new user if doesn't exist
-            return await create_user_progress(user_id, db)
+        progress = await load_user_progress(db, user_id)
         
-        return UserProgress(**progress)
+        etag = progress_etag(progress.revision)
+        if if_none_match and etag_matches(if_none_match, progress.revision):
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        response.headers["ETag"] = etag
+        return progress
     
     except Exception as e:
         logger.error(f"Error retrieving user progress: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve user progress")
 
-@router.put("/users/{user_id}/progress", response_model=UserProgress)
+# Attempts before giving up when another writer keeps changing the document
+PROGRESS_WRITE_MAX_ATTEMPTS = 3
+
+async def commit_progress_change(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    change: Callable[[Dict[str, Any], UserProgress, WordSet, WordSet], Optional[Dict[str, Any]]],
+    if_match: Optional[str] = None
+) -> UserProgress:
+    """Read-modify-write a user's progress with optimistic concurrency.
+    
+    change applies the mutation in memory and returns extra storage fields
+    to write, or None if there is nothing to write. The write only lands if
+    the revision is unchanged since the read; otherwise it is retried, or
+    rejected with 412 when the client sent If-Match.
+    """
+    # Buffered writes must land first so the conditional write sees them
+    await get_progress_buffer().flush_user(db, user_id)
+    
+    for attempt in range(PROGRESS_WRITE_MAX_ATTEMPTS):
+        current_progress = await load_progress_document(db, user_id)
+        if not current_progress:
+            raise HTTPException(status_code=404, detail="User progress not found")
+        
+        revision = current_progress.get("revision", 0)
+        if if_match and not etag_matches(if_match, revision):
+            raise HTTPException(status_code=412, detail="Progress has been modified")
+        
+        progress = progress_from_document(current_progress)
+        completed, favorites = word_sets_from_document(current_progress)
+        favorites_before = favorites.copy()
+        
+        extra_fields = change(current_progress, progress, completed, favorites)
+        if extra_fields is None:
+            return progress
+        
+        saved = await save_progress(
+            db, progress, completed, favorites,
+            expected_revision=revision,
+            extra_fields=extra_fields
+        )
+        if saved is not None:
+            await get_leaderboard().record_points_changes(db, {
+                user_id: (current_progress.get("total_points", 0), progress.total_points)
+            })
+            await sync_favorites(db, user_id, favorites_before, favorites, progress.updated_at)
+            get_audio_prewarmer().record_tier_unlocks(
+                set(progress.unlocked_tiers) - set(current_progress.get("unlocked_tiers", []))
+            )
+            return progress
+        
+        if if_match:
+            raise HTTPException(status_code=412, detail="Progress has been modified")
+        logger.info(f"Progress for user {user_id} changed during update, retrying ({attempt + 1})")
+    
+    raise HTTPException(status_code=409, detail="Progress changed concurrently, please retry")
+
+@router.put("/users/{user_id}/progress", response_model=UserProgressWithTiers)
 async def update_user_progress(
     user_id: str,
     update: UserProgressUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Update user progress"""
+    """Update user progress (honors If-Match against the progress ETag)"""
     try:
-        # Get current progress
-        current_progress = await db.user_progress.find_one({"user_id": user_id})
-        if not current_progress:
-            raise HTTPException(status_code=404, detail="User progress not found")
-        
-        progress = UserProgress(**current_progress)
-        
-        # Handle word completion
-        if update.word_completed and update.points_earned:
-            if update.word_completed not in progress.completed_words:
-                progress.completed_words.append(update.word_completed)
-                progress.total_points += update.points_earned
-                
-                # Update streak
-                progress.current_streak += 1
-                if progress.current_streak > progress.longest_streak:
-                    progress.longest_streak = progress.current_streak
-                
-                # Check for level up
-                new_level = (progress.total_points // 100) + 1
-                if new_level > progress.level:
-                    progress.level = new_level
-                    # Award level up badge
-                    level_badge = f"level_{new_level}"
-                    if level_badge not in progress.badges_earned:
-                        progress.badges_earned.append(level_badge)
-                
-                # Check for tier unlocks
-                unlocked_new_tier = False
-                for tier in TIER_DEFINITIONS:
-                    tier_id = tier["id"]
-                    if tier_id not in progress.unlocked_tiers:
-                        requirements = tier["unlock_requirements"]
-                        
-                        # Check point requirements
-                        if progress.total_points >= requirements.get("points", 0):
-                            # Check if previous tier completed (if required)
-                            prev_tier = requirements.get("completed_tier")
-                            if not prev_tier or prev_tier in progress.unlocked_tiers:
-                                # Check cultural acknowledgment (for sensitive tiers)
-                                cultural_req = requirements.get("cultural_acknowledgment", False)
-                                if not cultural_req or tier_id in progress.cultural_acknowledgments:
-                                    progress.unlocked_tiers.append(tier_id)
-                                    unlocked_new_tier = True
-                
-                if unlocked_new_tier:
-                    # Award tier unlock badge
-                    if "tier_master" not in progress.badges_earned:
-                        progress.badges_earned.append("tier_master")
-        
-        # Handle favorite toggle
-        if update.favorite_toggled:
-            word_id = update.favorite_toggled
-            if word_id in progress.favorites:
-                progress.favorites.remove(word_id)
-            else:
-                progress.favorites.append(word_id)
-                # Award first favorite badge
-                if len(progress.favorites) == 1 and "first_favorite" not in progress.badges_earned:
-                    progress.badges_earned.append("first_favorite")
-        
-        # Handle quiz completion
-        if update.quiz_completed:
-            progress.quiz_scores.append(update.quiz_completed)
+        progress_buffer = get_progress_buffer()
+        if progress_buffer.enabled:
+            # Write-behind mode: merge in memory, persisted on the next flush
+            expected_revision = None
+            if if_match:
+                current_progress = await load_progress_document(db, user_id)
+                if current_progress:
+                    expected_revision = current_progress.get("revision", 0)
+                    if not etag_matches(if_match, expected_revision):
+                        raise HTTPException(status_code=412, detail="Progress has been modified")
             
-            # Award quiz badges
-            quiz_count = len(progress.quiz_scores)
-            if quiz_count == 1 and "first_quiz" not in progress.badges_earned:
-                progress.badges_earned.append("first_quiz")
-            elif quiz_count == 10 and "quiz_master" not in progress.badges_earned:
-                progress.badges_earned.append("quiz_master")
-        
-        # Handle cultural acknowledgment
-        if update.cultural_tier_acknowledged:
-            tier_id = update.cultural_tier_acknowledged
-            if tier_id not in progress.cultural_acknowledgments:
-                progress.cultural_acknowledgments.append(tier_id)
-                
-                # Check if this unlocks any tiers
-                for tier in TIER_DEFINITIONS:
-                    if (tier["id"] == tier_id and 
-                        tier["id"] not in progress.unlocked_tiers and
-                        progress.total_points >= tier["unlock_requirements"].get("points", 0)):
-                        progress.unlocked_tiers.append(tier["id"])
-        
-        # Update timestamp
-        progress.updated_at = datetime.utcnow()
-        progress.last_activity = datetime.utcnow()
-        
-        # Save to database
-        await db.user_progress.replace_one(
-            {"user_id": user_id}, 
-            progress.dict()
-        )
+            try:
+                progress = await progress_buffer.record(db, user_id, update, expected_revision)
+            except RevisionConflict:
+                raise HTTPException(status_code=412, detail="Progress has been modified")
+            if progress is None:
+                raise HTTPException(status_code=404, detail="User progress not found")
+        else:
+            activities: List[LearningActivity] = []
+            
+            def apply_update(current_progress, progress, completed, favorites):
+                before = activity_snapshot(progress)
+                apply_progress_update(progress, completed, favorites, update)
+                activities[:] = [activity_since(before, progress, progress.updated_at)]
+                return {}
+            
+            progress = await commit_progress_change(db, user_id, apply_update, if_match)
+            await record_learning_activity(db, user_id, activities)
         
         logger.info(f"Updated progress for user {user_id}")
-        return progress
+        response.headers["ETag"] = progress_etag(progress.revision)
+        return progress_with_tiers(progress)
     
     except HTTPException:
         raise
@@ -177,6 +232,121 @@ async def update_user_progress(
         logger.error(f"Error updating user progress: {e}")
         raise HTTPException(status_code=500, detail="Failed to update user progress")
 
+@router.post("/users/{user_id}/progress/events", response_model=ProgressEventBatchResult)
+async def ingest_progress_events(
+    user_id: str,
+    batch: ProgressEventBatch,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Apply an ordered batch of client progress events in one atomic write.
+    
+    Each event carries a client-generated idempotency key; keys that were
+    already applied (e.g. replayed after a reconnect) are skipped.
+    """
+    try:
+        new_keys: List[str] = []
+        activities: List[LearningActivity] = []
+        
+        def apply_events(current_progress, progress, completed, favorites):
+            processed_keys = current_progress.get(PROCESSED_EVENT_KEYS_FIELD, [])
+            seen_keys = set(processed_keys)
+            new_keys.clear()
+            activities.clear()
+            
+            for event in batch.events:
+                if event.idempotency_key in seen_keys:
+                    continue
+                seen_keys.add(event.idempotency_key)
+                new_keys.append(event.idempotency_key)
+                # Naive UTC and not in the future, like every stored timestamp
+                occurred_at = client_time(event.occurred_at)
+                before = activity_snapshot(progress)
+                apply_progress_update(progress, completed, favorites, event, occurred_at)
+                activities.append(activity_since(before, progress, occurred_at))
+            
+            if not new_keys:
+                return None
+            return {
+                PROCESSED_EVENT_KEYS_FIELD: (processed_keys + new_keys)[-MAX_PROCESSED_EVENT_KEYS:]
+            }
+        
+        progress = await commit_progress_change(db, user_id, apply_events, if_match)
+        await record_learning_activity(db, user_id, activities)
+        
+        duplicates = len(batch.events) - len(new_keys)
+        logger.info(
+            f"Applied {len(new_keys)} progress events for user {user_id} "
+            f"({duplicates} duplicates skipped)"
+        )
+        response.headers["ETag"] = progress_etag(progress.revision)
+        return ProgressEventBatchResult(
+            applied=len(new_keys),
+            duplicates=duplicates,
+            progress=progress_with_tiers(progress)
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error ingesting progress events: {e}")
+        raise HTTPException(status_code=500, detail="Failed to apply progress events")
+
+@router.get("/cache-stats")
+async def get_progress_cache_stats():
+    """Get progress read cache and write-behind buffer statistics"""
+    return {
+        "read_cache": get_progress_cache().get_stats(),
+        "write_behind": get_progress_buffer().get_stats()
+    }
+
+@router.post("/badges/backfill")
+async def backfill_user_badges(
+    badge_id: Optional[List[str]] = Query(None),
+    batch_size: int = Query(500, ge=1, le=5000),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Re-evaluate badge rules for all users and award anything missing"""
+    unknown = [badge for badge in badge_id or [] if badge not in BADGE_DEFINITIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown badges: {', '.join(unknown)}")
+    
+    try:
+        return await backfill_badges(db, badge_id, batch_size)
+    except Exception as e:
+        logger.error(f"Error backfilling badges: {e}")
+        raise HTTPException(status_code=500, detail="Failed to backfill badges")
+
+@router.post("/recompute", status_code=202)
+async def start_recompute(
+    dry_run: bool = Query(False, description="Report changes without writing them"),
+    resume: bool = Query(True, description="Continue an interrupted run from its checkpoint"),
+    revoke_tiers: bool = Query(False, description="Also remove tiers users no longer qualify for"),
+    batch_size: int = Query(500, ge=1, le=5000),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Start re-evaluating level, tiers and badges for all users after rule changes"""
+    started = await start_progress_recompute(
+        db, dry_run=dry_run, resume=resume, revoke_tiers=revoke_tiers, batch_size=batch_size
+    )
+    if not started:
+        raise HTTPException(status_code=409, detail="A recompute job is already running")
+    return {"started": True, "dry_run": dry_run}
+
+@router.get("/recompute")
+async def get_recompute_status(
+    dry_run: bool = Query(False),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get the checkpoint of the last (or current) recompute run"""
+    try:
+        checkpoint = await load_recompute_checkpoint(db, dry_run)
+        return {"running": recompute_running() or job_lease_held(checkpoint), "checkpoint": checkpoint}
+    except Exception as e:
+        logger.error(f"Error retrieving recompute status: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve recompute status")
+
 @router.get("/users/{user_id}/stats", response_model=UserStats)
 async def get_user_stats(
     user_id: str,
@@ -185,11 +355,11 @@ async def get_user_stats(
     """Get detailed user statistics"""
     try:
         # Get user progress
-        progress = await db.user_progress.find_one({"user_id": user_id})
+        progress = await load_progress_document(db, user_id)
         if not progress:
             raise HTTPException(status_code=404, detail="User not found")
         
-        progress_obj = UserProgress(**progress)
+        progress_obj = progress_from_document(progress)
         
         # Get completed words details
         completed_words = []
@@ -215,15 +385,15 @@ async def get_user_stats(
             total_score = sum(quiz.get("score", 0) for quiz in progress_obj.quiz_scores)
             avg_quiz_score = total_score / len(progress_obj.quiz_scores)
         
-        # Estimate time spent (rough calculation based on completed words)
-        estimated_time = len(progress_obj.completed_words) * 2  # 2 minutes per word
+        # Time spent from the daily activity buckets
+        time_spent = await total_active_minutes(db, user_id)
         
         return UserStats(
             total_words_learned=len(progress_obj.completed_words),
             words_by_category=words_by_category,
             words_by_tier=words_by_tier,
             average_quiz_score=round(avg_quiz_score, 2),
-            time_spent_learning=estimated_time,
+            time_spent_learning=time_spent,
             pronunciation_attempts=0  # Would track this separately
         )
     
@@ -233,33 +403,115 @@ async def get_user_stats(
         logger.error(f"Error retrieving user stats: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve user statistics")
 
+@router.get("/users/{user_id}/activity")
+async def get_user_activity(
+    user_id: str,
+    days: int = Query(90, ge=1, le=366, description="Number of days to include"),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get a user's daily learning heatmap and day streaks"""
+    try:
+        buckets = await load_daily_activity(db, user_id, days)
+        today = mongo_now().date()
+        
+        # Streaks are the ones kept on the progress document, not recomputed from buckets
+        document = await load_progress_document(db, user_id)
+        progress = progress_from_document(document) if document else None
+        
+        return {
+            "user_id": user_id,
+            "days": activity_heatmap(buckets, today, days),
+            "current_streak": current_day_streak(progress, today) if progress else 0,
+            "longest_streak": progress.longest_streak if progress else 0,
+            "active_minutes": round(sum(bucket.get("active_seconds", 0) for bucket in buckets) / 60)
+        }
+    
+    except Exception as e:
+        logger.error(f"Error retrieving user activity: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve user activity")
+
+@router.get("/users/{user_id}/recommendations")
+async def get_recommended_words(
+    user_id: str,
+    limit: int = Query(10, ge=1, le=50, description="Number of words"),
+    include_locked: bool = Query(False, description="Also suggest words from locked tiers"),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """Get the next words a user should learn"""
+    try:
+        progress = await load_progress_document(db, user_id)
+        if not progress:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        progress_obj = progress_from_document(progress)
+        completed, favorites = word_sets_from_document(progress)
+        picks = recommend_words(progress_obj, completed, favorites, limit, include_locked)
+        
+        # Only the picked words are read from the catalog
+        words = {}
+        if picks:
+            async for word in db.somali_words.find(
+                {"id": {"$in": [pick["word_id"] for pick in picks]}}, {"_id": 0}
+            ):
+                words[word["id"]] = word
+        
+        recommendations = [
+            {**words[pick["word_id"]], "locked": pick["locked"], "seen": pick["seen"]}
+            for pick in picks if pick["word_id"] in words
+        ]
+        return {
+            "user_id": user_id,
+            "recommendations": recommendations,
+            "count": len(recommendations)
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error retrieving recommendations: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve recommendations")
+
 @router.get("/users/{user_id}/favorites")
 async def get_user_favorites(
     user_id: str,
+    limit: int = Query(20, ge=1, le=100, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated word fields to return"),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
-    """Get user's favorite words"""
+    """Get user's favorite words, most recently favorited first, one page at a time"""
     try:
-        progress = await db.user_progress.find_one({"user_id": user_id})
-        if not progress:
-            return {"favorites": []}
+        field_list = None
+        if fields:
+            field_list = [field.strip() for field in fields.split(",") if field.strip()]
+            unknown = [field for field in field_list if field not in FAVORITE_WORD_FIELDS]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
         
-        progress_obj = UserProgress(**progress)
+        progress = await load_progress_document(db, user_id)
+        if not progress:
+            return {"user_id": user_id, "favorite_count": 0, "favorites": [], "next_cursor": None}
         
-        if not progress_obj.favorites:
-            return {"favorites": []}
+        progress_obj = progress_from_document(progress)
+        _, favorites = word_sets_from_document(progress)
+        if not cursor:
+            # Favorites saved before favorite order was tracked are listed last
+            await reconcile_favorites(db, user_id, favorites, progress_obj.created_at)
         
-        # Get favorite words details
-        favorite_words = await db.somali_words.find(
-            {"id": {"$in": progress_obj.favorites}}
-        ).to_list(length=None)
+        try:
+            favorite_words, next_cursor = await load_favorites_page(db, user_id, limit, cursor, field_list)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
         
         return {
             "user_id": user_id,
-            "favorite_count": len(favorite_words),
-            "favorites": favorite_words
+            "favorite_count": len(favorites),
+            "favorites": favorite_words,
+            "next_cursor": next_cursor
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error retrieving user favorites: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve favorites")
@@ -271,38 +523,24 @@ async def get_user_badges(
 ):
     """Get user's earned badges with descriptions"""
     try:
-        progress = await db.user_progress.find_one({"user_id": user_id})
+        progress = await load_progress_document(db, user_id)
         if not progress:
             return {"badges": []}
         
-        progress_obj = UserProgress(**progress)
-        
-        # Badge definitions
-        badge_definitions = {
-            "newcomer": {"name": "Welcome!", "icon": "🎯", "description": "Started your Somali journey"},
-            "first_favorite": {"name": "First Love", "icon": "💝", "description": "Favorited your first word"},
-            "first_quiz": {"name": "Quiz Starter", "icon": "🧠", "description": "Completed your first quiz"},
-            "level_2": {"name": "Rising Scholar", "icon": "📚", "description": "Reached Level 2"},
-            "level_3": {"name": "Dedicated Learner", "icon": "🌟", "description": "Reached Level 3"},
-            "level_5": {"name": "Somali Speaker", "icon": "🗣️", "description": "Reached Level 5"},
-            "tier_master": {"name": "Tier Climber", "icon": "🏔️", "description": "Unlocked a new tier"},
-            "quiz_master": {"name": "Quiz Champion", "icon": "🏆", "description": "Completed 10 quizzes"},
-            "week_warrior": {"name": "Week Warrior", "icon": "🔥", "description": "7-day learning streak"},
-            "compliment_king": {"name": "Compliment King/Queen", "icon": "👑", "description": "Mastered compliment words"}
-        }
+        progress_obj = progress_from_document(progress)
         
         # Add earned badges with details
         earned_badges = []
         for badge_id in progress_obj.badges_earned:
-            if badge_id in badge_definitions:
-                badge_info = badge_definitions[badge_id].copy()
+            if badge_id in BADGE_DEFINITIONS:
+                badge_info = BADGE_DEFINITIONS[badge_id].copy()
                 badge_info["id"] = badge_id
                 badge_info["earned"] = True
                 earned_badges.append(badge_info)
         
         # Add available badges (not yet earned)
         available_badges = []
-        for badge_id, badge_info in badge_definitions.items():
+        for badge_id, badge_info in BADGE_DEFINITIONS.items():
             if badge_id not in progress_obj.badges_earned:
                 badge_info_copy = badge_info.copy()
                 badge_info_copy["id"] = badge_id
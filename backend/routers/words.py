@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from datetime import datetime
 import logging
@@ -7,6 +7,7 @@ import logging
 from models.somali_models import SomaliWord, SomaliWordCreate
 from database import get_database
 from data.somali_vocabulary import SOMALI_VOCABULARY
+from services.catalog_cache import bump_catalog_version
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -77,6 +78,7 @@ async def seed_vocabulary(db: AsyncIOMotorDatabase = Depends(get_database)):
         
         # Insert into database
         result = await db.somali_words.insert_many(words_to_insert)
+        await bump_catalog_version(db)
         
         logger.info(f"Seeded database with {len(result.inserted_ids)} words")
         return {
@@ -165,46 +167,50 @@ async def search_words(
         logger.error(f"Error searching words with query '{q}': {e}")
         raise HTTPException(status_code=500, detail="Search failed")
 
+# Category icons
+CATEGORY_ICONS = {
+    "basic": "🌟",
+    "greetings": "👋", 
+    "cute_tease": "😊",
+    "compliments": "💝",
+    "deep_talk": "💭"
+}
+
+async def load_categories(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """All word categories with counts, tiers and display info"""
+    pipeline = [
+        {
+            "$group": {
+                "_id": "$category",
+                "count": {"$sum": 1},
+                "tiers": {"$addToSet": "$tier"}
+            }
+        },
+        {
+            "$sort": {"_id": 1}
+        }
+    ]
+    
+    categories = await db.somali_words.aggregate(pipeline).to_list(length=None)
+    
+    result = []
+    for cat in categories:
+        result.append({
+            "id": cat["_id"],
+            "name": cat["_id"].replace("_", " ").title(),
+            "icon": CATEGORY_ICONS.get(cat["_id"], "📝"),
+            "word_count": cat["count"],
+            "tiers": sorted(cat["tiers"])
+        })
+    
+    return result
+
 @router.get("/categories")
 async def get_categories(db: AsyncIOMotorDatabase = Depends(get_database)):
     """Get all available word categories with counts"""
     try:
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$category",
-                    "count": {"$sum": 1},
-                    "tiers": {"$addToSet": "$tier"}
-                }
-            },
-            {
-                "$sort": {"_id": 1}
-            }
-        ]
-        
-        categories = await db.somali_words.aggregate(pipeline).to_list(length=None)
-        
-        # Add category icons
-        category_icons = {
-            "basic": "🌟",
-            "greetings": "👋", 
-            "cute_tease": "😊",
-            "compliments": "💝",
-            "deep_talk": "💭"
-        }
-        
-        result = []
-        for cat in categories:
-            result.append({
-                "id": cat["_id"],
-                "name": cat["_id"].replace("_", " ").title(),
-                "icon": category_icons.get(cat["_id"], "📝"),
-                "word_count": cat["count"],
-                "tiers": sorted(cat["tiers"])
-            })
-        
-        return {"categories": result}
+        return {"categories": await load_categories(db)}
     
     except Exception as e:
         logger.error(f"Error retrieving categories: {e}")
-        raise HTTPException(status_code=500, detail="Failed to retrieve categories")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to retrieve categories")
@@ -7,10 +7,14 @@ from pathlib import Path
 from contextlib import asynccontextmanager
 
 # Import database functions
-from database import connect_to_mongo, close_mongo_connection
+from database import connect_to_mongo, close_mongo_connection, get_database
+from services.audio_cache import get_audio_cache_accounting
+from services.audio_prewarmer import get_audio_prewarmer
+from services.progress_buffer import get_progress_buffer
+from services.tts_service import close_tts_service
 
 # Import routers
-from routers import words, audio, users, quiz, tiers
+from routers import words, audio, users, quiz, tiers, dashboard, leaderboard
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -27,11 +31,18 @@ async def lifespan(app: FastAPI):
     """Manage application lifespan"""
     # Startup
     await connect_to_mongo()
+    get_progress_buffer().start(get_database())
+    get_audio_cache_accounting().start(get_database())
+    get_audio_prewarmer().start(get_database())
     logger.info("Somali Learning PWA backend started")
     
     yield
     
     # Shutdown
+    await get_progress_buffer().stop()
+    await get_audio_prewarmer().stop()
+    await get_audio_cache_accounting().stop()
+    await close_tts_service()
     await close_mongo_connection()
     logger.info("Somali Learning PWA backend stopped")
 
@@ -69,6 +80,8 @@ api_router.include_router(audio.router, prefix="/tts", tags=["Text-to-Speech"])
 api_router.include_router(users.router, prefix="/progress", tags=["User Progress"])
 api_router.include_router(quiz.router, prefix="/quiz", tags=["Quizzes"])
 api_router.include_router(tiers.router, prefix="/tiers", tags=["Learning Tiers"])
+api_router.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboard"])
+api_router.include_router(leaderboard.router, prefix="/leaderboard", tags=["Leaderboard"])
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -0,0 +1,541 @@
+import asyncio
+import base64
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import register_index_setup
+from services.tts_service import TTSService, audio_cache_key, canonical_audio_request, tts_available
+
+logger = logging.getLogger(__name__)
+
+AUDIO_MEDIA_TYPE = "audio/mpeg"
+
+# Fields of an audio_cache document needed to serve a clip
+CLIP_PROJECTION = {"_id": 0, "audio": 1, "audio_content": 1, "duration_seconds": 1}
+
+# Hit/miss totals shared by all workers
+AUDIO_CACHE_STATS_COLLECTION = "audio_cache_stats"
+AUDIO_CACHE_STATS_ID = "totals"
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) starts the work as a task; callers
+    arriving while it runs (followers) await the same task instead of
+    repeating it. The task is shielded, so a leader whose request is
+    cancelled does not cancel the work its followers are waiting on.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Task[Any]"] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark a failure as retrieved even if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        requests = self.executions + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesced_rate": round(self.coalesced / requests, 4) if requests else None
+        }
+
+
+def audio_bytes(document: Dict[str, Any]) -> bytes:
+    """MP3 bytes of an audio_cache document (older documents hold base64 text)"""
+    audio = document.get("audio")
+    if audio is not None:
+        return bytes(audio)
+    return base64.b64decode(document.get("audio_content", ""))
+
+
+def build_cache_document(
+    tts_service: TTSService,
+    text: str,
+    speed: float,
+    cache_key: str,
+    audio_content: str,
+    **fields: Any
+) -> Dict[str, Any]:
+    """audio_cache document for a clip the provider returned as base64.
+
+    The clip is stored as binary (a few KB, far below the document limit),
+    so neither storage nor playback pays for base64.
+    """
+    audio = base64.b64decode(audio_content)
+    text, speed = canonical_audio_request(text, speed)
+    return {
+        "cache_key": cache_key,
+        "text": text,
+        "speed": speed,
+        "audio": audio,
+        "size_bytes": len(audio),
+        "duration_seconds": tts_service.estimate_audio_duration(text, speed),
+        "created_at": datetime.utcnow(),
+        **fields
+    }
+
+
+class AudioMemoryCache:
+    """In-process LRU of audio clips bounded by total bytes, in front of audio_cache.
+
+    Entries are {"audio": bytes, "duration_seconds": float} keyed by cache key.
+    Clips never change for a key, so there is no TTL; only the byte budget
+    evicts. Clips larger than max_entry_bytes are not kept so one long
+    sentence cannot flush many hot words.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else max_bytes // 16
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        clip = self._entries.get(cache_key)
+        if clip is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(cache_key)
+        self.hits += 1
+        return clip
+
+    def put(self, cache_key: str, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep a clip from an audio_cache document; returns it as a cache entry"""
+        clip = {"audio": audio_bytes(document), "duration_seconds": document.get("duration_seconds")}
+        size = len(clip["audio"])
+        if not self.enabled or size > self.max_entry_bytes:
+            return clip
+
+        self.discard(cache_key)
+        self._entries[cache_key] = clip
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted["audio"])
+            self.evictions += 1
+        return clip
+
+    def discard(self, cache_key: str) -> None:
+        clip = self._entries.pop(cache_key, None)
+        if clip is not None:
+            self.size_bytes -= len(clip["audio"])
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions
+        }
+
+
+class AudioCacheAccounting:
+    """Hit/miss accounting and size-budgeted eviction for audio_cache.
+
+    Hits are counted in memory and flushed every flush_interval seconds as
+    one bulk $inc of access_count (plus last_accessed) per clip, and the
+    hit/miss totals as one $inc on a shared stats document, so lookups never
+    write. After a flush, when the stored clips exceed max_bytes the
+    least valuable ones are deleted: value is (access_count + 1) divided by
+    days since last access, so clips that are both rarely and not recently
+    played go first.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 30.0,
+        max_bytes: int = 512 * 1024 * 1024,
+        evict_interval: float = 300.0
+    ):
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.evict_interval = evict_interval
+        self._accesses: Dict[str, Tuple[int, datetime]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._task: Optional[asyncio.Task] = None
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._evicted_at = 0.0
+        self.flush_count = 0
+        self.evicted_count = 0
+
+    def record_hit(self, cache_key: str) -> None:
+        count, _ = self._accesses.get(cache_key, (0, None))
+        self._accesses[cache_key] = (count + 1, datetime.utcnow())
+        self._hits += 1
+
+    def record_miss(self) -> None:
+        self._misses += 1
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start the periodic flush (and eviction) loop"""
+        self._db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the loop and write out pending counts"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._db is not None:
+            await self.flush(self._db)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(self._db)
+                # Keep everything while clips cannot be re-synthesized
+                if tts_available() and time.monotonic() - self._evicted_at >= self.evict_interval:
+                    self._evicted_at = time.monotonic()
+                    await self.evict(self._db)
+            except Exception as e:
+                logger.error(f"Error maintaining audio cache: {e}")
+
+    async def flush(self, db: AsyncIOMotorDatabase) -> None:
+        """Write buffered access counts and hit/miss totals"""
+        accesses, hits, misses = self._accesses, self._hits, self._misses
+        if not accesses and not hits and not misses:
+            return
+        self._accesses, self._hits, self._misses = {}, 0, 0
+
+        # Counts whose write failed are kept for the next flush; a write
+        # that went through must not be requeued, or it would count twice
+        if accesses:
+            try:
+                await db.audio_cache.bulk_write([
+                    UpdateOne(
+                        {"cache_key": cache_key},
+                        {"$inc": {"access_count": count}, "$max": {"last_accessed": last_accessed}}
+                    )
+                    for cache_key, (count, last_accessed) in accesses.items()
+                ], ordered=False)
+            except Exception:
+                self._requeue(accesses, hits, misses)
+                raise
+        try:
+            await db[AUDIO_CACHE_STATS_COLLECTION].update_one(
+                {"_id": AUDIO_CACHE_STATS_ID},
+                {"$inc": {"hits": hits, "misses": misses}},
+                upsert=True
+            )
+        except Exception:
+            self._requeue({}, hits, misses)
+            raise
+        self.flush_count += 1
+
+    def _requeue(self, accesses: Dict[str, Tuple[int, datetime]], hits: int, misses: int) -> None:
+        for cache_key, (count, last_accessed) in accesses.items():
+            pending, latest = self._accesses.get(cache_key, (0, last_accessed))
+            self._accesses[cache_key] = (pending + count, max(latest, last_accessed))
+        self._hits += hits
+        self._misses += misses
+
+    async def evict(self, db: AsyncIOMotorDatabase) -> int:
+        """Delete the least valuable clips until the cache fits max_bytes; returns the count"""
+        size = {"$ifNull": ["$size_bytes", {"$strLenBytes": {"$ifNull": ["$audio_content", ""]}}]}
+        totals = await db.audio_cache.aggregate([
+            {"$group": {"_id": None, "size_bytes": {"$sum": size}}}
+        ]).to_list(length=1)
+        excess = (totals[0]["size_bytes"] if totals else 0) - self.max_bytes
+        if excess <= 0:
+            return 0
+
+        now = datetime.utcnow()
+        idle_days = {"$divide": [
+            {"$subtract": [now, {"$ifNull": ["$last_accessed", "$created_at"]}]}, DAY_MS
+        ]}
+        candidates = db.audio_cache.aggregate([
+            {"$project": {
+                "_id": 0,
+                "cache_key": 1,
+                "size_bytes": size,
+                "score": {"$divide": [
+                    {"$add": [{"$ifNull": ["$access_count", 0]}, 1]},
+                    {"$add": [idle_days, 1]}
+                ]}
+            }},
+            {"$sort": {"score": 1}}
+        ])
+        evicted: List[str] = []
+        async for candidate in candidates:
+            evicted.append(candidate["cache_key"])
+            excess -= candidate["size_bytes"]
+            if excess <= 0:
+                break
+
+        for start in range(0, len(evicted), 1000):
+            await db.audio_cache.delete_many({"cache_key": {"$in": evicted[start:start + 1000]}})
+        memory = get_audio_memory_cache()
+        for cache_key in evicted:
+            memory.discard(cache_key)
+
+        self.evicted_count += len(evicted)
+        logger.info(f"Evicted {len(evicted)} audio clips to stay within {self.max_bytes} bytes")
+        return len(evicted)
+
+    async def get_stats(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Hit/miss totals across workers, including this worker's unflushed counts"""
+        totals = await db[AUDIO_CACHE_STATS_COLLECTION].find_one({"_id": AUDIO_CACHE_STATS_ID}) or {}
+        hits = totals.get("hits", 0) + self._hits
+        misses = totals.get("misses", 0) + self._misses
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted_count
+        }
+
+
+async def load_clip(db: AsyncIOMotorDatabase, cache_key: str) -> Optional[Dict[str, Any]]:
+    """Cached clip for a key from memory, else from audio_cache (then kept in memory)"""
+    accounting = get_audio_cache_accounting()
+    memory = get_audio_memory_cache()
+    clip = memory.get(cache_key)
+    if clip is None:
+        document = await db.audio_cache.find_one({"cache_key": cache_key}, CLIP_PROJECTION)
+        if document is None:
+            accounting.record_miss()
+            return None
+        clip = memory.put(cache_key, document)
+
+    accounting.record_hit(cache_key)
+    return clip
+
+
+async def load_fallback_clip(
+    db: AsyncIOMotorDatabase,
+    text: str,
+    speed: float
+) -> Optional[Tuple[str, Dict[str, Any], float]]:
+    """The same (canonical) text cached at the nearest other speed, as (cache_key, clip, speed).
+
+    Served while synthesis is failing: a clip at the wrong speed beats none.
+    """
+    documents = await db.audio_cache.find(
+        {"text": text}, {"_id": 0, "cache_key": 1, "speed": 1}
+    ).to_list(length=None)
+    for document in sorted(documents, key=lambda document: abs(document["speed"] - speed)):
+        clip = await load_clip(db, document["cache_key"])
+        if clip is not None:
+            return document["cache_key"], clip, document["speed"]
+    return None
+
+
+async def load_clips(db: AsyncIOMotorDatabase, cache_keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Cached clips for many keys: memory first, then one $in query for the rest"""
+    accounting = get_audio_cache_accounting()
+    memory = get_audio_memory_cache()
+    clips: Dict[str, Dict[str, Any]] = {}
+    for cache_key in dict.fromkeys(cache_keys):
+        clip = memory.get(cache_key)
+        if clip is not None:
+            clips[cache_key] = clip
+
+    remaining = [cache_key for cache_key in dict.fromkeys(cache_keys) if cache_key not in clips]
+    if remaining:
+        async for document in db.audio_cache.find(
+            {"cache_key": {"$in": remaining}}, {**CLIP_PROJECTION, "cache_key": 1}
+        ):
+            clips[document["cache_key"]] = memory.put(document["cache_key"], document)
+
+    for cache_key in cache_keys:
+        if cache_key in clips:
+            accounting.record_hit(cache_key)
+        else:
+            accounting.record_miss()
+    return clips
+
+
+async def synthesize_and_cache(
+    db: AsyncIOMotorDatabase,
+    tts_service: TTSService,
+    text: str,
+    speed: float,
+    cache_key: str,
+    **fields: Any
+) -> Dict[str, Any]:
+    """Synthesize one clip and store it in audio_cache; returns the cache document.
+
+    fields override the access bookkeeping of the new document (by default
+    it counts as accessed once, now). Another worker may store the same key
+    first, in which case its document is returned instead.
+    """
+    audio_content, _ = await tts_service.synthesize_speech(text=text, speed=speed)
+    cache_document = build_cache_document(
+        tts_service, text, speed, cache_key, audio_content,
+        **{"access_count": 1, "last_accessed": datetime.utcnow(), **fields}
+    )
+    try:
+        await db.audio_cache.insert_one(cache_document)
+    except DuplicateKeyError:
+        existing = await db.audio_cache.find_one({"cache_key": cache_key})
+        if existing:
+            cache_document = existing
+    cache_document.pop("_id", None)
+    get_audio_memory_cache().put(cache_key, cache_document)
+    return cache_document
+
+
+# Global in-process audio cache - configured lazily from the environment
+audio_memory_cache = None
+
+def get_audio_memory_cache() -> AudioMemoryCache:
+    """Get the per-worker in-memory audio clip cache"""
+    global audio_memory_cache
+    if audio_memory_cache is None:
+        audio_memory_cache = AudioMemoryCache(
+            max_bytes=int(float(os.getenv("AUDIO_MEMORY_CACHE_MB", "64")) * 1024 * 1024)
+        )
+    return audio_memory_cache
+
+
+# Global single-flight group for audio synthesis
+audio_flight = None
+
+def get_audio_flight() -> SingleFlight:
+    """Get the per-worker single-flight group keyed by audio cache key"""
+    global audio_flight
+    if audio_flight is None:
+        audio_flight = SingleFlight()
+    return audio_flight
+
+
+async def fold_audio_cache_duplicates(
+    db: AsyncIOMotorDatabase,
+    dry_run: bool = False,
+    batch_size: int = 500
+) -> Dict[str, Any]:
+    """Re-key audio_cache to canonical cache keys, folding entries that collapse together.
+
+    Entries stored before canonicalization ("Iska warran?" and "iska warran"
+    at 0.7 and 0.70000001) map to one canonical key. Per key one entry is
+    kept, preferring one already under the canonical key, else the most
+    played; it gets the others' access counts and the rest are deleted.
+    Only metadata is read, never the clips.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    scanned = 0
+    async for document in db.audio_cache.find(
+        {}, {"_id": 1, "cache_key": 1, "text": 1, "speed": 1, "access_count": 1, "last_accessed": 1}
+    ):
+        scanned += 1
+        groups.setdefault(audio_cache_key(document["text"], document["speed"]), []).append(document)
+
+    changes = []
+    for cache_key, documents in groups.items():
+        if len(documents) == 1 and documents[0]["cache_key"] == cache_key:
+            continue
+        keeper = max(documents, key=lambda document: (
+            document["cache_key"] == cache_key, document.get("access_count", 0)
+        ))
+        changes.append((cache_key, keeper, [document for document in documents if document is not keeper]))
+
+    result = {
+        "scanned": scanned,
+        "rekeyed": len(changes),
+        "folded": sum(len(duplicates) for _, _, duplicates in changes),
+        "dry_run": dry_run
+    }
+    if dry_run:
+        return result
+
+    for start in range(0, len(changes), batch_size):
+        batch = changes[start:start + batch_size]
+        removed = [document["_id"] for _, _, duplicates in batch for document in duplicates]
+        operations: List[Any] = [DeleteMany({"_id": {"$in": removed}})] if removed else []
+        for cache_key, keeper, duplicates in batch:
+            text, speed = canonical_audio_request(keeper["text"], keeper["speed"])
+            update: Dict[str, Any] = {
+                "$set": {"cache_key": cache_key, "text": text, "speed": speed},
+                "$inc": {"access_count": sum(document.get("access_count", 0) for document in duplicates)}
+            }
+            last_accessed = [document["last_accessed"] for document in duplicates if document.get("last_accessed")]
+            if last_accessed:
+                update["$max"] = {"last_accessed": max(last_accessed)}
+            operations.append(UpdateOne({"_id": keeper["_id"]}, update))
+        # Deletes go first so re-keyed entries never collide on the unique index
+        await db.audio_cache.bulk_write(operations, ordered=True)
+
+    get_audio_memory_cache().clear()
+    logger.info(f"Re-keyed {result['rekeyed']} audio clips, folded {result['folded']} duplicates")
+    return result
+
+
+# Global audio cache accounting - configured lazily from the environment
+audio_cache_accounting = None
+
+def get_audio_cache_accounting() -> AudioCacheAccounting:
+    """Get the audio cache hit accounting and eviction loop"""
+    global audio_cache_accounting
+    if audio_cache_accounting is None:
+        audio_cache_accounting = AudioCacheAccounting(
+            flush_interval=float(os.getenv("AUDIO_CACHE_FLUSH_SECONDS", "30")),
+            max_bytes=int(float(os.getenv("AUDIO_CACHE_MAX_MB", "512")) * 1024 * 1024),
+            evict_interval=float(os.getenv("AUDIO_CACHE_EVICT_SECONDS", "300"))
+        )
+    return audio_cache_accounting
+
+
+@register_index_setup
+async def create_audio_cache_indexes(db: AsyncIOMotorDatabase) -> None:
+    collection = db.audio_cache
+    await collection.create_index("cache_key", unique=True)
+    # Other speeds of a text, served while synthesis fails
+    await collection.create_index("text")
+    # Eviction is size-budgeted by popularity now; drop the old blind 30-day TTL
+    if "created_at_1" in await collection.index_information():
+        await collection.drop_index("created_at_1")
@@ -0,0 +1,251 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
+
+from services.audio_cache import build_cache_document
+from services.job_checkpoints import (
+    CHECKPOINTS_COLLECTION,
+    JobRunning,
+    acquire_job_lease,
+    job_lease_held,
+    release_job_lease,
+    save_job_checkpoint
+)
+from services.progress_store import mongo_now
+from services.tts_service import canonical_audio_request, get_tts_service
+
+logger = logging.getLogger(__name__)
+
+PREGENERATION_JOB_ID = "audio_pregeneration"
+DEFAULT_PREGENERATION_TIERS = [1, 2]
+DEFAULT_PREGENERATION_SPEEDS = [1.0, 0.7, 0.4]  # Normal, Slow, Ultra Slow
+# Failed clips kept in the checkpoint for inspection
+MAX_FAILED_SAMPLE = 50
+# How long a run holds the job across workers without renewing (renewed every batch)
+PREGENERATION_LEASE_SECONDS = 600
+DUPLICATE_KEY_ERROR = 11000
+
+
+class PregenerationRunning(JobRunning):
+    """Another run (in this or another worker) holds the pregeneration lease"""
+
+
+# Background run started from the admin endpoint (one at a time per worker)
+pregeneration_task: Optional[asyncio.Task] = None
+
+
+async def pregeneration_targets(
+    db: AsyncIOMotorDatabase,
+    tiers: List[int],
+    speeds: List[float],
+    include_examples: bool = False
+) -> List[Tuple[str, float]]:
+    """Canonical (text, speed) pairs to cover, in a stable order so runs can resume by position"""
+    projection = {"_id": 0, "id": 1, "somali": 1, "example_somali": 1}
+    words = await db.somali_words.find({"tier": {"$in": tiers}}, projection).sort("id", 1).to_list(length=None)
+
+    # Keyed by canonical pair, so spellings that canonicalize alike count once
+    targets: Dict[Tuple[str, float], None] = {}
+    for word in words:
+        texts = [word.get("somali")]
+        if include_examples:
+            texts.append(word.get("example_somali"))
+        for text in filter(None, texts):
+            for speed in speeds:
+                targets[canonical_audio_request(text, speed)] = None
+    return list(targets)
+
+
+async def load_pregeneration_status(db: AsyncIOMotorDatabase) -> Optional[Dict[str, Any]]:
+    """Checkpoint of the last (or current) run with remaining work and throughput"""
+    checkpoint = await db[CHECKPOINTS_COLLECTION].find_one({"_id": PREGENERATION_JOB_ID})
+    if checkpoint is None:
+        return None
+    # A run that has only taken the lease has not written its totals yet
+    if "total" in checkpoint:
+        checkpoint["remaining"] = checkpoint["total"] - checkpoint["position"]
+        elapsed = checkpoint.get("elapsed_seconds") or 0
+        checkpoint["clips_per_second"] = round(checkpoint["generated"] / elapsed, 2) if elapsed else None
+    checkpoint["running"] = job_lease_held(checkpoint)
+    return checkpoint
+
+
+async def run_audio_pregeneration(
+    db: AsyncIOMotorDatabase,
+    tiers: Optional[List[int]] = None,
+    speeds: Optional[List[float]] = None,
+    include_examples: bool = False,
+    concurrency: int = 4,
+    batch_size: int = 100,
+    resume: bool = True,
+    lease_owner: Optional[str] = None
+) -> Dict[str, Any]:
+    """Make sure audio_cache holds clips for the chosen words at the chosen speeds.
+
+    Targets are processed in batches: one $in query per batch finds the
+    cache keys that are missing, those are synthesized with at most
+    concurrency provider calls in flight, and the results are stored with a
+    single insert_many. After each batch the position is checkpointed in
+    job_checkpoints; an interrupted run with the same options continues
+    from there when resumed. Clips that fail are counted and sampled, and
+    are retried by the next run since they are still missing.
+
+    Raises PregenerationRunning if another run holds the job's lease, or
+    takes it over after this run stopped renewing it.
+    """
+    tiers = tiers or DEFAULT_PREGENERATION_TIERS
+    speeds = speeds or DEFAULT_PREGENERATION_SPEEDS
+    options = {"tiers": tiers, "speeds": speeds, "include_examples": include_examples}
+    lease_owner = lease_owner or uuid.uuid4().hex
+    if not await acquire_job_lease(db, PREGENERATION_JOB_ID, lease_owner, PREGENERATION_LEASE_SECONDS):
+        raise PregenerationRunning("An audio pregeneration job is already running")
+
+    try:
+        return await _run_with_lease(db, options, lease_owner, concurrency, batch_size, resume)
+    except BaseException:
+        await release_job_lease(db, PREGENERATION_JOB_ID, lease_owner)
+        raise
+
+
+async def _run_with_lease(
+    db: AsyncIOMotorDatabase,
+    options: Dict[str, Any],
+    lease_owner: str,
+    concurrency: int,
+    batch_size: int,
+    resume: bool
+) -> Dict[str, Any]:
+    """Body of run_audio_pregeneration, run while holding the lease"""
+    tts_service = get_tts_service()
+    checkpoints = db[CHECKPOINTS_COLLECTION]
+    targets = await pregeneration_targets(db, options["tiers"], options["speeds"], options["include_examples"])
+
+    checkpoint = await checkpoints.find_one({"_id": PREGENERATION_JOB_ID})
+    if not (
+        resume and checkpoint and checkpoint.get("completed_at") is None
+        and checkpoint.get("options") == options and checkpoint.get("total") == len(targets)
+    ):
+        checkpoint = {
+            "_id": PREGENERATION_JOB_ID,
+            "options": options,
+            "total": len(targets),
+            "position": 0,
+            "already_cached": 0,
+            "generated": 0,
+            "failed": 0,
+            "failed_sample": [],
+            "elapsed_seconds": 0.0,
+            "started_at": mongo_now(),
+            "completed_at": None
+        }
+        logger.info(f"Starting {PREGENERATION_JOB_ID} over {len(targets)} clips")
+    else:
+        logger.info(f"Resuming {PREGENERATION_JOB_ID} at {checkpoint['position']}/{len(targets)}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def synthesize(text: str, speed: float, cache_key: str) -> Dict[str, Any]:
+        async with semaphore:
+            audio_content, _ = await tts_service.synthesize_speech(text=text, speed=speed)
+        return build_cache_document(
+            tts_service, text, speed, cache_key, audio_content,
+            access_count=0, pregenerated=True
+        )
+
+    while checkpoint["position"] < len(targets):
+        batch_started = time.monotonic()
+        batch = targets[checkpoint["position"]:checkpoint["position"] + batch_size]
+        keyed = {tts_service.generate_cache_key(text, speed): (text, speed) for text, speed in batch}
+
+        cached = {
+            document["cache_key"]
+            async for document in db.audio_cache.find(
+                {"cache_key": {"$in": list(keyed)}}, {"_id": 0, "cache_key": 1}
+            )
+        }
+        missing = [(cache_key, text, speed) for cache_key, (text, speed) in keyed.items() if cache_key not in cached]
+        results = await asyncio.gather(
+            *(synthesize(text, speed, cache_key) for cache_key, text, speed in missing),
+            return_exceptions=True
+        )
+
+        documents = []
+        for (cache_key, text, speed), result in zip(missing, results):
+            if isinstance(result, Exception):
+                checkpoint["failed"] += 1
+                if len(checkpoint["failed_sample"]) < MAX_FAILED_SAMPLE:
+                    checkpoint["failed_sample"].append({"text": text, "speed": speed, "error": str(result)})
+            else:
+                documents.append(result)
+
+        if documents:
+            try:
+                await db.audio_cache.insert_many(documents, ordered=False)
+                checkpoint["generated"] += len(documents)
+            except BulkWriteError as e:
+                checkpoint["generated"] += e.details.get("nInserted", 0)
+                for error in e.details.get("writeErrors", []):
+                    # Clips cached meanwhile by live requests are fine
+                    if error.get("code") == DUPLICATE_KEY_ERROR:
+                        continue
+                    checkpoint["failed"] += 1
+                    if len(checkpoint["failed_sample"]) < MAX_FAILED_SAMPLE:
+                        document = documents[error["index"]]
+                        checkpoint["failed_sample"].append({
+                            "text": document["text"], "speed": document["speed"], "error": error.get("errmsg")
+                        })
+
+        checkpoint["already_cached"] += len(cached)
+        checkpoint["position"] += len(batch)
+        checkpoint["elapsed_seconds"] += time.monotonic() - batch_started
+        checkpoint["updated_at"] = mongo_now()
+        await _save_checkpoint(db, checkpoint, lease_owner, PREGENERATION_LEASE_SECONDS)
+
+    checkpoint["completed_at"] = mongo_now()
+    await _save_checkpoint(db, checkpoint, lease_owner, None)
+    logger.info(
+        f"Finished {PREGENERATION_JOB_ID}: {checkpoint['generated']} generated, "
+        f"{checkpoint['already_cached']} already cached, {checkpoint['failed']} failed"
+    )
+    return checkpoint
+
+
+async def _save_checkpoint(
+    db: AsyncIOMotorDatabase,
+    checkpoint: Dict[str, Any],
+    lease_owner: str,
+    lease_seconds: Optional[float]
+) -> None:
+    """Store the checkpoint (renewing or releasing the lease), unless another run took the lease over"""
+    if not await save_job_checkpoint(db, checkpoint, lease_owner, lease_seconds):
+        raise PregenerationRunning("The audio pregeneration lease was taken over by another run")
+
+
+def pregeneration_running() -> bool:
+    return pregeneration_task is not None and not pregeneration_task.done()
+
+
+async def start_audio_pregeneration(db: AsyncIOMotorDatabase, **options: Any) -> bool:
+    """Run the pregeneration job in the background; False if one is already running.
+
+    The lease is taken before returning, so a run in any worker is reported.
+    """
+    global pregeneration_task
+    lease_owner = uuid.uuid4().hex
+    if pregeneration_running() or not await acquire_job_lease(
+        db, PREGENERATION_JOB_ID, lease_owner, PREGENERATION_LEASE_SECONDS
+    ):
+        return False
+
+    def log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Audio pregeneration failed: {task.exception()}")
+
+    pregeneration_task = asyncio.create_task(run_audio_pregeneration(db, lease_owner=lease_owner, **options))
+    pregeneration_task.add_done_callback(log_failure)
+    return True
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from services.audio_cache import get_audio_flight, synthesize_and_cache
+from services.tts_service import get_tts_service
+
+logger = logging.getLogger(__name__)
+
+# A speed is warmed once it makes up this share of observed requests
+POPULAR_SPEED_SHARE = 0.1
+DEFAULT_PREWARM_SPEEDS = [1.0]
+# Cache keys checked per $in query
+PREWARM_SCAN_BATCH = 100
+
+
+class AudioPrewarmer:
+    """Synthesizes clips ahead of demand from what users are doing.
+
+    Two signals feed it: tiers users have just unlocked (all words of the
+    tier are about to be played) and texts that missed the cache (learners
+    replay a word at the other speeds). Requested speeds are tallied so
+    only speeds people actually use get warmed. In idle time, i.e. when no
+    live synthesis is in flight, it checks the predicted clips against
+    audio_cache and synthesizes the missing ones, spending at most
+    calls_per_hour provider calls (a token bucket that starts full).
+    """
+
+    def __init__(
+        self,
+        calls_per_hour: int = 200,
+        interval: float = 15.0,
+        concurrency: int = 2,
+        max_tracked_texts: int = 1000
+    ):
+        self.calls_per_hour = calls_per_hour
+        self.interval = interval
+        self.concurrency = concurrency
+        self.max_tracked_texts = max_tracked_texts
+        self._tokens = float(calls_per_hour)
+        self._refilled_at = time.monotonic()
+        self._tiers: Counter = Counter()
+        self._texts: Counter = Counter()
+        self._speeds: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self.runs = 0
+        self.skipped_busy = 0
+        self.prewarmed = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.calls_per_hour > 0
+
+    def record_request(self, text: str, speed: float, hit: bool) -> None:
+        """Tally a synthesize request; misses queue the text for its other speeds"""
+        self._speeds[speed] += 1
+        if hit or not self.enabled:
+            return
+        self._texts[text] += 1
+        if len(self._texts) > self.max_tracked_texts:
+            # Forget the least requested half rather than growing without bound
+            self._texts = Counter(dict(self._texts.most_common(self.max_tracked_texts // 2)))
+
+    def record_tier_unlocks(self, tiers: Iterable[int]) -> None:
+        """Queue newly unlocked tiers so their words are warm when users get there"""
+        if self.enabled:
+            self._tiers.update(tiers)
+
+    def popular_speeds(self) -> List[float]:
+        total = sum(self._speeds.values())
+        speeds = [speed for speed, count in self._speeds.most_common() if count >= total * POPULAR_SPEED_SHARE]
+        return speeds or DEFAULT_PREWARM_SPEEDS
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.calls_per_hour),
+            self._tokens + (now - self._refilled_at) * self.calls_per_hour / 3600
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start the idle-time prewarm loop"""
+        self._db = db
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Audio prewarming enabled ({self.calls_per_hour} provider calls per hour)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once(self._db)
+            except Exception as e:
+                logger.error(f"Error prewarming audio: {e}")
+
+    async def _predicted_clips(self, db: AsyncIOMotorDatabase) -> List[Tuple[Tuple[str, Any], str, float]]:
+        """(source, text, speed) to have cached, most wanted first"""
+        speeds = self.popular_speeds()
+        clips = []
+        for tier, _ in self._tiers.most_common():
+            words = await db.somali_words.find(
+                {"tier": tier}, {"_id": 0, "somali": 1}
+            ).sort("id", 1).to_list(length=None)
+            clips += [(("tier", tier), word["somali"], speed) for word in words for speed in speeds]
+        for text, _ in self._texts.most_common():
+            clips += [(("text", text), text, speed) for speed in speeds]
+        return clips
+
+    async def run_once(self, db: AsyncIOMotorDatabase) -> int:
+        """One prewarm pass; returns the number of clips synthesized"""
+        if not (self._tiers or self._texts):
+            return 0
+        tts_service = get_tts_service()
+        if tts_service.in_flight or not tts_service.available:
+            # Live requests come first, and a failing provider gets no extra load
+            self.skipped_busy += 1
+            return 0
+
+        self.runs += 1
+        clips = await self._predicted_clips(db)
+        unfinished = set()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def prewarm(text: str, speed: float, cache_key: str) -> None:
+            async with semaphore:
+                await get_audio_flight().do(cache_key, lambda: synthesize_and_cache(
+                    db, tts_service, text, speed, cache_key,
+                    access_count=0, last_accessed=None, prewarmed=True
+                ))
+
+        synthesized = 0
+        for start in range(0, len(clips), PREWARM_SCAN_BATCH):
+            batch = {}
+            for source, text, speed in clips[start:start + PREWARM_SCAN_BATCH]:
+                batch[tts_service.generate_cache_key(text, speed)] = (source, text, speed)
+            cached = {
+                document["cache_key"]
+                async for document in db.audio_cache.find(
+                    {"cache_key": {"$in": list(batch)}}, {"_id": 0, "cache_key": 1}
+                )
+            }
+
+            calls = []
+            for cache_key, (source, text, speed) in batch.items():
+                if cache_key in cached:
+                    continue
+                if self._take_token():
+                    calls.append((source, prewarm(text, speed, cache_key)))
+                else:
+                    unfinished.add(source)
+            results = await asyncio.gather(*(call for _, call in calls), return_exceptions=True)
+            for (source, _), result in zip(calls, results):
+                if isinstance(result, Exception):
+                    self.failed += 1
+                    unfinished.add(source)
+                else:
+                    synthesized += 1
+
+        # Fully covered predictions are done; the rest wait for budget
+        for kind, value in {source for source, _, _ in clips} - unfinished:
+            (self._tiers if kind == "tier" else self._texts).pop(value, None)
+
+        self.prewarmed += synthesized
+        if synthesized:
+            logger.info(f"Prewarmed {synthesized} audio clips")
+        return synthesized
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "calls_per_hour": self.calls_per_hour,
+            "budget_remaining": int(self._tokens),
+            "queued_tiers": sorted(self._tiers),
+            "queued_texts": len(self._texts),
+            "popular_speeds": self.popular_speeds(),
+            "runs": self.runs,
+            "skipped_busy": self.skipped_busy,
+            "prewarmed": self.prewarmed,
+            "failed": self.failed
+        }
+
+
+# Global audio prewarmer - configured lazily from the environment
+audio_prewarmer = None
+
+def get_audio_prewarmer() -> AudioPrewarmer:
+    """Get the demand-driven audio prewarmer (disabled with a zero budget)"""
+    global audio_prewarmer
+    if audio_prewarmer is None:
+        audio_prewarmer = AudioPrewarmer(
+            calls_per_hour=int(os.getenv("AUDIO_PREWARM_CALLS_PER_HOUR", "200")),
+            interval=float(os.getenv("AUDIO_PREWARM_INTERVAL_SECONDS", "15"))
+        )
+    return audio_prewarmer
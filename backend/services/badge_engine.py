@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from models.somali_models import UserProgress
+from services.progress_cache import get_progress_cache
+from services.progress_store import progress_from_document, word_sets_from_document
+from services.word_sets import WordSet, category_word_set
+
+logger = logging.getLogger(__name__)
+
+# Progress events that badge rules can depend on
+ACTIVITY = "activity"  # any learning activity (word or quiz), updates the day streak
+WORD_COMPLETED = "word_completed"
+FAVORITE_ADDED = "favorite_added"
+QUIZ_COMPLETED = "quiz_completed"
+LEVEL_CHANGED = "level_changed"
+TIER_UNLOCKED = "tier_unlocked"
+
+
+@dataclass(frozen=True)
+class BadgeContext:
+    progress: UserProgress
+    completed: WordSet
+    favorites: WordSet
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    id: str
+    name: str
+    icon: str
+    description: str
+    events: FrozenSet[str]  # only re-evaluated when one of these happens
+    condition: Callable[[BadgeContext], bool]
+
+
+def _completed_category(category: str) -> Callable[[BadgeContext], bool]:
+    category_words = category_word_set(category)
+    return lambda ctx: bool(category_words) and not (category_words - ctx.completed)
+
+
+BADGE_RULES: List[BadgeRule] = [
+    BadgeRule("newcomer", "Welcome!", "🎯", "Started your Somali journey",
+              frozenset({ACTIVITY}), lambda ctx: True),
+    BadgeRule("first_favorite", "First Love", "💝", "Favorited your first word",
+              frozenset({FAVORITE_ADDED}), lambda ctx: len(ctx.favorites) >= 1),
+    BadgeRule("first_quiz", "Quiz Starter", "🧠", "Completed your first quiz",
+              frozenset({QUIZ_COMPLETED}), lambda ctx: len(ctx.progress.quiz_scores) >= 1),
+    BadgeRule("level_2", "Rising Scholar", "📚", "Reached Level 2",
+              frozenset({LEVEL_CHANGED}), lambda ctx: ctx.progress.level >= 2),
+    BadgeRule("level_3", "Dedicated Learner", "🌟", "Reached Level 3",
+              frozenset({LEVEL_CHANGED}), lambda ctx: ctx.progress.level >= 3),
+    BadgeRule("level_5", "Somali Speaker", "🗣️", "Reached Level 5",
+              frozenset({LEVEL_CHANGED}), lambda ctx: ctx.progress.level >= 5),
+    BadgeRule("tier_master", "Tier Climber", "🏔️", "Unlocked a new tier",
+              frozenset({TIER_UNLOCKED}), lambda ctx: len(ctx.progress.unlocked_tiers) > 1),
+    BadgeRule("quiz_master", "Quiz Champion", "🏆", "Completed 10 quizzes",
+              frozenset({QUIZ_COMPLETED}), lambda ctx: len(ctx.progress.quiz_scores) >= 10),
+    BadgeRule("week_warrior", "Week Warrior", "🔥", "7-day learning streak",
+              frozenset({ACTIVITY}), lambda ctx: ctx.progress.longest_streak >= 7),
+    BadgeRule("compliment_king", "Compliment King/Queen", "👑", "Mastered compliment words",
+              frozenset({WORD_COMPLETED}), _completed_category("compliments")),
+]
+
+# Compiled once at import
+BADGE_RULES_BY_ID: Dict[str, BadgeRule] = {rule.id: rule for rule in BADGE_RULES}
+BADGE_DEFINITIONS: Dict[str, Dict[str, str]] = {
+    rule.id: {"name": rule.name, "icon": rule.icon, "description": rule.description}
+    for rule in BADGE_RULES
+}
+RULES_BY_EVENT: Dict[str, List[BadgeRule]] = {}
+for _rule in BADGE_RULES:
+    for _event in _rule.events:
+        RULES_BY_EVENT.setdefault(_event, []).append(_rule)
+
+
+def _award(rules: Iterable[BadgeRule], context: BadgeContext) -> List[str]:
+    earned = set(context.progress.badges_earned)
+    awarded = []
+    for rule in rules:
+        if rule.id not in earned and rule.condition(context):
+            earned.add(rule.id)
+            awarded.append(rule.id)
+    context.progress.badges_earned.extend(awarded)
+    return awarded
+
+
+def evaluate_badges(
+    progress: UserProgress,
+    completed: WordSet,
+    favorites: WordSet,
+    events: Iterable[str]
+) -> List[str]:
+    """Award badges whose rules depend on the given events; returns new badge ids"""
+    seen = set()
+    rules = []
+    for event in events:
+        for rule in RULES_BY_EVENT.get(event, ()):
+            if rule.id not in seen:
+                seen.add(rule.id)
+                rules.append(rule)
+    return _award(rules, BadgeContext(progress, completed, favorites))
+
+
+def evaluate_all_badges(
+    progress: UserProgress,
+    completed: WordSet,
+    favorites: WordSet,
+    badge_ids: Optional[Iterable[str]] = None
+) -> List[str]:
+    """Award every (or the given) badge a user qualifies for; returns new badge ids"""
+    rules = BADGE_RULES if badge_ids is None else [BADGE_RULES_BY_ID[badge_id] for badge_id in badge_ids]
+    return _award(rules, BadgeContext(progress, completed, favorites))
+
+
+async def backfill_badges(
+    db: AsyncIOMotorDatabase,
+    badge_ids: Optional[List[str]] = None,
+    batch_size: int = 500
+) -> Dict[str, Any]:
+    """Re-evaluate badges for all users, e.g. after adding a new badge rule.
+
+    Streams user_progress in batches and only writes users that gained a
+    badge, using $addToSet so concurrent progress updates are not clobbered.
+    """
+    scanned = 0
+    updated = 0
+    awarded_counts: Dict[str, int] = {}
+    operations = []
+    user_ids = []
+
+    async def write_batch():
+        nonlocal updated
+        if operations:
+            result = await db.user_progress.bulk_write(operations, ordered=False)
+            updated += result.modified_count
+            for user_id in user_ids:
+                get_progress_cache().invalidate(user_id)
+            operations.clear()
+            user_ids.clear()
+
+    cursor = db.user_progress.find({}).batch_size(batch_size)
+    async for document in cursor:
+        scanned += 1
+        progress = progress_from_document(document)
+        completed, favorites = word_sets_from_document(document)
+        awarded = evaluate_all_badges(progress, completed, favorites, badge_ids)
+        if not awarded:
+            continue
+
+        for badge_id in awarded:
+            awarded_counts[badge_id] = awarded_counts.get(badge_id, 0) + 1
+        operations.append(UpdateOne(
+            {"user_id": progress.user_id},
+            {"$addToSet": {"badges_earned": {"$each": awarded}}, "$inc": {"revision": 1}}
+        ))
+        user_ids.append(progress.user_id)
+        if len(operations) >= batch_size:
+            await write_batch()
+
+    await write_batch()
+    logger.info(f"Badge backfill scanned {scanned} users, updated {updated}")
+    return {
+        "users_scanned": scanned,
+        "users_updated": updated,
+        "badges_awarded": awarded_counts
+    }
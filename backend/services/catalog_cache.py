@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from services.progress_store import mongo_now
+
+logger = logging.getLogger(__name__)
+
+CATALOG_META_COLLECTION = "catalog_meta"
+CATALOG_META_ID = "somali_words"
+
+
+async def bump_catalog_version(db: AsyncIOMotorDatabase) -> int:
+    """Mark the vocabulary as changed; call after any write to somali_words"""
+    meta = await db[CATALOG_META_COLLECTION].find_one_and_update(
+        {"_id": CATALOG_META_ID},
+        {"$inc": {"version": 1}, "$set": {"updated_at": mongo_now()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    get_catalog_cache().clear()
+    return meta["version"]
+
+
+class CatalogCache:
+    """Derived vocabulary data (tier counts, breakdowns, ...) cached per catalog version.
+
+    The catalog version lives in catalog_meta and is bumped by vocabulary
+    writes. It is re-read at most every version_ttl_seconds, so between
+    checks cached values cost no queries; another worker's seed becomes
+    visible within that window.
+    """
+
+    def __init__(self, version_ttl_seconds: float = 30):
+        self.version_ttl_seconds = version_ttl_seconds
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+        self._values: Dict[Hashable, Any] = {}
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def version(self, db: AsyncIOMotorDatabase) -> int:
+        if self._version is None or time.monotonic() - self._version_checked_at > self.version_ttl_seconds:
+            meta = await db[CATALOG_META_COLLECTION].find_one({"_id": CATALOG_META_ID})
+            version = meta["version"] if meta else 0
+            if version != self._version:
+                self._values.clear()
+                self._version = version
+            self._version_checked_at = time.monotonic()
+        return self._version
+
+    async def get(
+        self,
+        db: AsyncIOMotorDatabase,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Cached value for key at the current catalog version, loading it on a miss"""
+        await self.version(db)
+        if key in self._values:
+            self.hits += 1
+            return self._values[key]
+
+        async with self._lock:
+            if key not in self._values:
+                self.misses += 1
+                self._values[key] = await loader()
+            else:
+                self.hits += 1
+            return self._values[key]
+
+    def clear(self) -> None:
+        self._values.clear()
+        self._version = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "version": self._version,
+            "entries": len(self._values),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+# Global catalog cache - configured lazily from the environment
+catalog_cache = None
+
+def get_catalog_cache() -> CatalogCache:
+    """Get the per-worker catalog-derived data cache"""
+    global catalog_cache
+    if catalog_cache is None:
+        catalog_cache = CatalogCache(
+            version_ttl_seconds=float(os.getenv("CATALOG_VERSION_TTL_SECONDS", "30"))
+        )
+    return catalog_cache
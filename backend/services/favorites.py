@@ -0,0 +1,169 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteMany, UpdateOne
+
+from database import register_index_setup
+from models.somali_models import SomaliWord
+from services.progress_store import WORD_SET_FIELDS, word_sets_from_document
+from services.word_sets import WordSet
+
+logger = logging.getLogger(__name__)
+
+# One document per (user, favorite word) recording when it was favorited.
+# The progress document's favorite bitset stays the source of truth for
+# membership; this collection adds the ordering the bitset cannot keep.
+FAVORITES_COLLECTION = "user_favorites"
+
+FAVORITE_WORD_FIELDS = set(SomaliWord.__fields__)
+DEFAULT_FAVORITE_FIELDS = ["id", "somali", "english", "phonetic", "category", "tier", "points"]
+
+
+async def sync_favorites(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    before: WordSet,
+    after: WordSet,
+    favorited_at: datetime
+) -> None:
+    """Mirror a stored change of a user's favorite set into user_favorites"""
+    added = (after - before).ids()
+    removed = (before - after).ids()
+    operations = [
+        UpdateOne(
+            {"user_id": user_id, "word_id": word_id},
+            {"$setOnInsert": {"favorited_at": favorited_at}},
+            upsert=True
+        )
+        for word_id in added
+    ]
+    if removed:
+        operations.append(DeleteMany({"user_id": user_id, "word_id": {"$in": removed}}))
+    if operations:
+        await db[FAVORITES_COLLECTION].bulk_write(operations, ordered=False)
+
+
+async def reconcile_favorites(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    favorites: WordSet,
+    favorited_at: datetime,
+    compare_ids: bool = False
+) -> bool:
+    """Bring user_favorites in line with the favorite set; returns whether anything changed.
+
+    Covers favorites stored before user_favorites existed (given favorited_at)
+    and mirror writes that were lost. By default only a differing count
+    (one count on the (user_id, word_id) index) triggers reading the stored
+    ids, so page loads stay cheap; compare_ids always compares the ids, for
+    reconcile_all_favorites.
+    """
+    collection = db[FAVORITES_COLLECTION]
+    if not compare_ids and await collection.count_documents({"user_id": user_id}) == len(favorites):
+        return False
+    stored = WordSet.from_ids([
+        document["word_id"]
+        async for document in collection.find({"user_id": user_id}, {"_id": 0, "word_id": 1})
+    ])
+    if stored == favorites:
+        return False
+
+    await sync_favorites(db, user_id, stored, favorites, favorited_at)
+    logger.info(f"Reconciled favorites for user {user_id}")
+    return True
+
+
+async def reconcile_all_favorites(db: AsyncIOMotorDatabase, batch_size: int = 500) -> Dict[str, Any]:
+    """Compare every user's user_favorites ids with their favorite set, fixing differences.
+
+    The offline counterpart of the count check on the read path: it also
+    catches sets of the same size holding different words.
+    """
+    scanned = 0
+    reconciled = 0
+    projection = {"_id": 0, "user_id": 1, "created_at": 1, "favorites": 1, **{
+        field: 1 for field in WORD_SET_FIELDS["favorites"]
+    }}
+    async for document in db.user_progress.find({}, projection).batch_size(batch_size):
+        scanned += 1
+        _, favorites = word_sets_from_document(document)
+        favorited_at = document.get("created_at") or datetime.utcnow()
+        if await reconcile_favorites(db, document["user_id"], favorites, favorited_at, compare_ids=True):
+            reconciled += 1
+
+    logger.info(f"Favorites reconcile scanned {scanned} users, reconciled {reconciled}")
+    return {"users_scanned": scanned, "users_reconciled": reconciled}
+
+
+def encode_favorites_cursor(favorited_at: datetime, word_id: str) -> str:
+    raw = f"{favorited_at.isoformat()}|{word_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_favorites_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Raises ValueError for malformed cursors"""
+    try:
+        favorited_at, word_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(favorited_at), word_id
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def load_favorites_page(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of favorite words, most recently favorited first.
+
+    Keyset pagination on (favorited_at, word_id) over an index, joined with
+    the vocabulary via $lookup, so every page costs the same regardless of
+    how many favorites a user has. Returns (words, next_cursor).
+    """
+    query: Dict[str, Any] = {"user_id": user_id}
+    if cursor:
+        after_time, after_word = decode_favorites_cursor(cursor)
+        query["$or"] = [
+            {"favorited_at": {"$lt": after_time}},
+            {"favorited_at": after_time, "word_id": {"$gt": after_word}}
+        ]
+
+    projection = {field: f"$word.{field}" for field in (fields or DEFAULT_FAVORITE_FIELDS)}
+    projection.update({"_id": 0, "id": "$word_id", "favorited_at": 1, "catalog_id": "$word.id"})
+
+    documents = await db[FAVORITES_COLLECTION].aggregate([
+        {"$match": query},
+        {"$sort": {"favorited_at": -1, "word_id": 1}},
+        # One extra row tells whether another page exists
+        {"$limit": limit + 1},
+        {"$lookup": {
+            "from": "somali_words",
+            "localField": "word_id",
+            "foreignField": "id",
+            "as": "word"
+        }},
+        {"$unwind": {"path": "$word", "preserveNullAndEmptyArrays": True}},
+        {"$project": projection}
+    ]).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        next_cursor = encode_favorites_cursor(last["favorited_at"], last["id"])
+    
+    # Favorites of words no longer in the catalog are skipped (the page may come up short)
+    words = [document for document in documents if document.pop("catalog_id", None) is not None]
+    return words, next_cursor
+
+
+@register_index_setup
+async def create_favorites_indexes(db: AsyncIOMotorDatabase) -> None:
+    collection = db[FAVORITES_COLLECTION]
+    await collection.create_index([("user_id", 1), ("word_id", 1)], unique=True)
+    await collection.create_index([("user_id", 1), ("favorited_at", -1), ("word_id", 1)])
@@ -0,0 +1,68 @@
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from services.progress_store import mongo_now
+
+# Checkpoints (and leases) of long-running maintenance jobs, one document per job
+CHECKPOINTS_COLLECTION = "job_checkpoints"
+
+
+class JobRunning(Exception):
+    """Another run (in this or another worker) holds the job's lease"""
+
+
+async def acquire_job_lease(db: AsyncIOMotorDatabase, job_id: str, owner: str, lease_seconds: float) -> bool:
+    """Take (or renew) the lease on a job's checkpoint; False if another run holds it.
+
+    The lease is a running_until deadline on the checkpoint document, set
+    with a conditional update, so only one worker runs the job at a time.
+    An expired lease (its worker died) can be taken over.
+    """
+    now = mongo_now()
+    try:
+        await db[CHECKPOINTS_COLLECTION].update_one(
+            {
+                "_id": job_id,
+                "$or": [{"running_until": None}, {"running_until": {"$lt": now}}, {"lease_owner": owner}]
+            },
+            {"$set": {"running_until": now + timedelta(seconds=lease_seconds), "lease_owner": owner}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The checkpoint exists but did not match: the lease is held
+        return False
+    return True
+
+
+async def save_job_checkpoint(
+    db: AsyncIOMotorDatabase,
+    checkpoint: Dict[str, Any],
+    owner: str,
+    lease_seconds: Optional[float]
+) -> bool:
+    """Store a checkpoint, renewing the lease for lease_seconds (None releases it).
+
+    Returns False without writing if another run took the lease over.
+    """
+    checkpoint["lease_owner"] = owner
+    checkpoint["running_until"] = mongo_now() + timedelta(seconds=lease_seconds) if lease_seconds else None
+    result = await db[CHECKPOINTS_COLLECTION].replace_one(
+        {"_id": checkpoint["_id"], "lease_owner": owner}, checkpoint
+    )
+    return result.matched_count > 0
+
+
+async def release_job_lease(db: AsyncIOMotorDatabase, job_id: str, owner: str) -> None:
+    """Give up the lease early (e.g. the run failed), if this run still holds it"""
+    await db[CHECKPOINTS_COLLECTION].update_one(
+        {"_id": job_id, "lease_owner": owner}, {"$set": {"running_until": None}}
+    )
+
+
+def job_lease_held(checkpoint: Optional[Dict[str, Any]]) -> bool:
+    """Whether a run holds the lease on this checkpoint right now"""
+    running_until = checkpoint.get("running_until") if checkpoint else None
+    return running_until is not None and running_until > mongo_now()
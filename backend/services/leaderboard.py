@@ -0,0 +1,277 @@
+import asyncio
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from services.progress_store import load_progress_document, mongo_now
+
+logger = logging.getLogger(__name__)
+
+ALL_TIME = "all_time"
+
+
+def week_key(at: datetime) -> str:
+    """ISO week bucket for weekly points, e.g. "2024-W07" """
+    year, week, _ = at.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class FenwickTree:
+    """Counts of users per points value, with O(log n) prefix sums.
+
+    Indexed by rank among the distinct point values seen (coordinate
+    compression), so its size follows the number of distinct totals, not
+    how large they are. A value not seen before rebuilds it in O(n).
+    """
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        counts = counts or {}
+        self._values = sorted(counts)
+        self._counts = [counts[points] for points in self._values]
+        self.total = sum(self._counts)
+        self._build()
+
+    @classmethod
+    def from_counts(cls, counts: Dict[int, int]) -> "FenwickTree":
+        return cls(counts)
+
+    def _build(self) -> None:
+        # O(n) construction from the plain counts
+        size = len(self._counts)
+        self._tree = [0] + list(self._counts)
+        for index in range(1, size + 1):
+            parent = index + (index & -index)
+            if parent <= size:
+                self._tree[parent] += self._tree[index]
+
+    def add(self, points: int, delta: int) -> None:
+        index = bisect_left(self._values, points)
+        if index == len(self._values) or self._values[index] != points:
+            # Values nobody holds any more are dropped while rebuilding anyway
+            kept = [(value, count) for value, count in zip(self._values, self._counts) if count]
+            insort(kept, (points, 0))
+            self._values = [value for value, _ in kept]
+            self._counts = [count for _, count in kept]
+            self._build()
+            index = bisect_left(self._values, points)
+        self._counts[index] += delta
+        self.total += delta
+        index += 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    def count_at_most(self, points: int) -> int:
+        index = bisect_right(self._values, points)
+        result = 0
+        while index > 0:
+            result += self._tree[index]
+            index -= index & -index
+        return result
+
+    def count_above(self, points: int) -> int:
+        return self.total - self.count_at_most(points)
+
+
+class RankedBoard:
+    """In-memory view of one leaderboard: a points histogram for rank
+    lookups plus the cached top-K entries.
+
+    Users with 0 points are not on the board; they all share the last rank.
+    """
+
+    def __init__(self, histogram: Dict[int, int], top: List[Tuple[int, str]], size: int):
+        self.fenwick = FenwickTree.from_counts(histogram)
+        self.size = size
+        # Sorted by (-points, user_id)
+        self._top = [(-points, user_id) for points, user_id in top]
+        self._top.sort()
+        self.loaded_at = time.monotonic()
+        self.stale = False
+
+    def update(self, user_id: str, old_points: int, new_points: int) -> None:
+        old_points, new_points = max(old_points, 0), max(new_points, 0)
+        if old_points == new_points:
+            return
+        if old_points:
+            self.fenwick.add(old_points, -1)
+        if new_points:
+            self.fenwick.add(new_points, 1)
+
+        # Everyone outside a full top-K ranks after its last entry
+        boundary = self._top[-1] if len(self._top) >= self.size else None
+        old_key = (-old_points, user_id)
+        index = bisect_left(self._top, old_key)
+        in_top = index < len(self._top) and self._top[index] == old_key
+        if in_top:
+            del self._top[index]
+
+        new_key = (-new_points, user_id)
+        if new_points and (boundary is None or new_key < boundary):
+            insort(self._top, new_key)
+            del self._top[self.size:]
+        elif in_top and boundary is not None:
+            # Dropped out of a full top-K; whoever replaces it is unknown here
+            self.stale = True
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        entries = []
+        for negative_points, user_id in self._top[:limit]:
+            points = -negative_points
+            entries.append({
+                "rank": self.fenwick.count_above(points) + 1,
+                "user_id": user_id,
+                "points": points
+            })
+        return entries
+
+    def rank(self, points: int) -> int:
+        return self.fenwick.count_above(max(points, 0)) + 1
+
+    @property
+    def ranked_users(self) -> int:
+        return self.fenwick.total
+
+    @property
+    def cached_top(self) -> int:
+        return len(self._top)
+
+
+class Leaderboard:
+    """All-time and weekly leaderboards by points.
+
+    All-time ranks come from user_progress.total_points; weekly ranks from
+    the weekly_points collection, a per-(week, user) counter incremented
+    whenever a user's points change. Boards are built from indexed queries
+    and a $group histogram, kept current by the write paths in this worker,
+    and rebuilt every refresh_seconds to pick up other workers' writes.
+    """
+
+    def __init__(self, top_size: int = 100, refresh_seconds: float = 60, max_weeks: int = 4):
+        self.top_size = top_size
+        self.refresh_seconds = refresh_seconds
+        self.max_weeks = max_weeks
+        self._boards: "OrderedDict[str, RankedBoard]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.loads = 0
+
+    async def _load(self, db: AsyncIOMotorDatabase, board_key: str) -> RankedBoard:
+        if board_key == ALL_TIME:
+            collection, query, points_field = db.user_progress, {}, "total_points"
+        else:
+            collection, query, points_field = db.weekly_points, {"week": board_key}, "points"
+        query = {**query, points_field: {"$gt": 0}}
+
+        histogram = {}
+        async for group in collection.aggregate([
+            {"$match": query},
+            {"$group": {"_id": f"${points_field}", "count": {"$sum": 1}}}
+        ]):
+            histogram[int(group["_id"])] = group["count"]
+
+        top = []
+        cursor = collection.find(query, {"_id": 0, "user_id": 1, points_field: 1}).sort(
+            [(points_field, -1), ("user_id", 1)]
+        ).limit(self.top_size)
+        async for document in cursor:
+            top.append((int(document[points_field]), document["user_id"]))
+
+        self.loads += 1
+        return RankedBoard(histogram, top, self.top_size)
+
+    async def board(self, db: AsyncIOMotorDatabase, board_key: str) -> RankedBoard:
+        """Loaded board for ALL_TIME or a week key, rebuilt when stale"""
+        board = self._boards.get(board_key)
+        if board is not None and not self._needs_reload(board):
+            return board
+
+        lock = self._locks.setdefault(board_key, asyncio.Lock())
+        async with lock:
+            board = self._boards.get(board_key)
+            if board is None or self._needs_reload(board):
+                board = await self._load(db, board_key)
+                self._boards[board_key] = board
+                self._boards.move_to_end(board_key)
+                self._evict()
+        return board
+
+    def _needs_reload(self, board: RankedBoard) -> bool:
+        return board.stale or time.monotonic() - board.loaded_at > self.refresh_seconds
+
+    def _evict(self) -> None:
+        weeks = [key for key in self._boards if key != ALL_TIME]
+        for key in weeks[:max(len(weeks) - self.max_weeks, 0)]:
+            del self._boards[key]
+            self._locks.pop(key, None)
+
+    async def record_points_changes(
+        self,
+        db: AsyncIOMotorDatabase,
+        changes: Dict[str, Tuple[int, int]],
+        at: Optional[datetime] = None
+    ) -> None:
+        """Apply stored total_points changes (user_id -> (old, new)) to the boards"""
+        changes = {user_id: change for user_id, change in changes.items() if change[0] != change[1]}
+        if not changes:
+            return
+
+        all_time = self._boards.get(ALL_TIME)
+        if all_time is not None:
+            for user_id, (old_points, new_points) in changes.items():
+                all_time.update(user_id, old_points, new_points)
+
+        week = week_key(at or mongo_now())
+        stored = await asyncio.gather(*(
+            db.weekly_points.find_one_and_update(
+                {"week": week, "user_id": user_id},
+                {"$inc": {"points": new_points - old_points}, "$set": {"updated_at": mongo_now()}},
+                upsert=True,
+                projection={"points": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            for user_id, (old_points, new_points) in changes.items()
+        ))
+
+        weekly = self._boards.get(week)
+        if weekly is not None:
+            for (user_id, (old_points, new_points)), document in zip(changes.items(), stored):
+                weekly.update(user_id, document["points"] - (new_points - old_points), document["points"])
+
+    async def user_points(self, db: AsyncIOMotorDatabase, board_key: str, user_id: str) -> int:
+        if board_key == ALL_TIME:
+            document = await load_progress_document(db, user_id)
+            return document.get("total_points", 0) if document else 0
+        document = await db.weekly_points.find_one({"week": board_key, "user_id": user_id}, {"points": 1})
+        return document["points"] if document else 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "top_size": self.top_size,
+            "refresh_seconds": self.refresh_seconds,
+            "boards": {
+                key: {"ranked_users": board.ranked_users, "cached_top": board.cached_top}
+                for key, board in self._boards.items()
+            },
+            "loads": self.loads
+        }
+
+
+# Global leaderboard - configured lazily from the environment
+leaderboard = None
+
+def get_leaderboard() -> Leaderboard:
+    """Get the leaderboard service"""
+    global leaderboard
+    if leaderboard is None:
+        leaderboard = Leaderboard(
+            top_size=int(os.getenv("LEADERBOARD_TOP_SIZE", "100")),
+            refresh_seconds=float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "60"))
+        )
+    return leaderboard
@@ -0,0 +1,200 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import CollectionInvalid
+
+from database import register_index_setup
+from models.somali_models import UserProgress
+from services.progress_store import mongo_now
+
+logger = logging.getLogger(__name__)
+
+# Raw learning events (time-series) and their per-user, per-day rollups
+EVENTS_COLLECTION = "learning_events"
+DAILY_COLLECTION = "daily_activity"
+EVENT_RETENTION_SECONDS = 90 * 24 * 60 * 60
+
+# Events closer together than this are one continuous session
+SESSION_GAP_SECONDS = 5 * 60
+# Time credited for an event that starts a session
+SESSION_START_SECONDS = 30
+
+
+@dataclass
+class LearningActivity:
+    """What one progress update changed, and when"""
+    occurred_at: datetime
+    words_completed: int = 0
+    quizzes_completed: int = 0
+    favorites_added: int = 0
+    points: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.words_completed or self.quizzes_completed or self.favorites_added or self.points)
+
+
+def activity_snapshot(progress: UserProgress) -> Tuple[int, int, int, int]:
+    """Counters to diff before/after applying an update"""
+    return (len(progress.completed_words), len(progress.quiz_scores), len(progress.favorites), progress.total_points)
+
+
+def activity_since(
+    snapshot: Tuple[int, int, int, int],
+    progress: UserProgress,
+    occurred_at: datetime
+) -> LearningActivity:
+    words, quizzes, favorites, points = snapshot
+    return LearningActivity(
+        occurred_at=occurred_at,
+        words_completed=max(len(progress.completed_words) - words, 0),
+        quizzes_completed=max(len(progress.quiz_scores) - quizzes, 0),
+        favorites_added=max(len(progress.favorites) - favorites, 0),
+        points=progress.total_points - points
+    )
+
+
+def day_key(at: datetime) -> str:
+    """UTC day bucket, e.g. "2024-02-14" """
+    return at.date().isoformat()
+
+
+def _session_seconds(times: List[datetime]) -> float:
+    """Active seconds covered by sorted event times, continuing sessions across small gaps"""
+    seconds = 0.0
+    for previous, current in zip(times, times[1:]):
+        gap = (current - previous).total_seconds()
+        seconds += gap if gap <= SESSION_GAP_SECONDS else SESSION_START_SECONDS
+    return seconds
+
+
+def _daily_bucket_update(user_id: str, day: str, activities: List[LearningActivity]) -> List[Dict[str, Any]]:
+    """Pipeline update folding one day's activities into its bucket document.
+
+    A pipeline (rather than $inc) lets the active-time increment depend on
+    the bucket's stored last_activity.
+    """
+    times = sorted(activity.occurred_at for activity in activities)
+    first, last = times[0], times[-1]
+    gap_ms = {"$subtract": [first, "$last_activity"]}
+
+    def add(field: str, amount: float) -> Dict[str, Any]:
+        return {"$add": [{"$ifNull": [f"${field}", 0]}, amount]}
+
+    return [{"$set": {
+        "user_id": user_id,
+        "day": day,
+        "events": add("events", len(activities)),
+        "words_completed": add("words_completed", sum(a.words_completed for a in activities)),
+        "quizzes_completed": add("quizzes_completed", sum(a.quizzes_completed for a in activities)),
+        "favorites_added": add("favorites_added", sum(a.favorites_added for a in activities)),
+        "points": add("points", sum(a.points for a in activities)),
+        "active_seconds": add("active_seconds", {"$add": [
+            _session_seconds(times),
+            {"$cond": [
+                {"$and": [
+                    {"$gt": [{"$ifNull": ["$last_activity", None]}, None]},
+                    {"$gte": [gap_ms, 0]},
+                    {"$lte": [gap_ms, SESSION_GAP_SECONDS * 1000]}
+                ]},
+                {"$divide": [gap_ms, 1000]},
+                SESSION_START_SECONDS
+            ]}
+        ]}),
+        "first_activity": {"$min": [{"$ifNull": ["$first_activity", first]}, first]},
+        "last_activity": {"$max": [{"$ifNull": ["$last_activity", last]}, last]},
+        "updated_at": mongo_now()
+    }}]
+
+
+async def record_learning_activity(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    activities: List[LearningActivity]
+) -> None:
+    """Store raw events and fold them into the user's daily buckets.
+
+    Best effort: activity tracking failing must not fail the progress write
+    that already happened.
+    """
+    activities = [activity for activity in activities if activity]
+    if not activities:
+        return
+
+    try:
+        await db[EVENTS_COLLECTION].insert_many([
+            {
+                "timestamp": activity.occurred_at,
+                "meta": {"user_id": user_id},
+                "words_completed": activity.words_completed,
+                "quizzes_completed": activity.quizzes_completed,
+                "favorites_added": activity.favorites_added,
+                "points": activity.points
+            }
+            for activity in activities
+        ], ordered=False)
+
+        by_day: Dict[str, List[LearningActivity]] = defaultdict(list)
+        for activity in activities:
+            by_day[day_key(activity.occurred_at)].append(activity)
+        for day, day_activities in by_day.items():
+            await db[DAILY_COLLECTION].update_one(
+                {"user_id": user_id, "day": day},
+                _daily_bucket_update(user_id, day, day_activities),
+                upsert=True
+            )
+    except Exception as e:
+        logger.error(f"Error recording learning activity for user {user_id}: {e}")
+
+
+async def load_daily_activity(db: AsyncIOMotorDatabase, user_id: str, days: int) -> List[Dict[str, Any]]:
+    """Daily buckets for the last `days` days (oldest first)"""
+    since = day_key(mongo_now() - timedelta(days=days - 1))
+    return await db[DAILY_COLLECTION].find(
+        {"user_id": user_id, "day": {"$gte": since}},
+        {"_id": 0, "user_id": 0}
+    ).sort("day", 1).to_list(length=days)
+
+
+async def total_active_minutes(db: AsyncIOMotorDatabase, user_id: str) -> int:
+    """Learning time across all of a user's daily buckets"""
+    async for total in db[DAILY_COLLECTION].aggregate([
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "seconds": {"$sum": "$active_seconds"}}}
+    ]):
+        return round(total["seconds"] / 60)
+    return 0
+
+
+def activity_heatmap(buckets: List[Dict[str, Any]], today: date, days: int) -> List[Dict[str, Any]]:
+    """One entry per day (including empty days) for the last `days` days"""
+    by_day = {bucket["day"]: bucket for bucket in buckets}
+    heatmap = []
+    for offset in range(days - 1, -1, -1):
+        day = (today - timedelta(days=offset)).isoformat()
+        bucket = by_day.get(day, {})
+        heatmap.append({
+            "day": day,
+            "words_completed": bucket.get("words_completed", 0),
+            "quizzes_completed": bucket.get("quizzes_completed", 0),
+            "points": bucket.get("points", 0),
+            "active_minutes": round(bucket.get("active_seconds", 0) / 60, 1)
+        })
+    return heatmap
+
+
+@register_index_setup
+async def create_activity_collections(db: AsyncIOMotorDatabase) -> None:
+    """Create the raw-events time-series collection and bucket indexes"""
+    try:
+        await db.create_collection(
+            EVENTS_COLLECTION,
+            timeseries={"timeField": "timestamp", "metaField": "meta", "granularity": "minutes"},
+            expireAfterSeconds=EVENT_RETENTION_SECONDS
+        )
+    except CollectionInvalid:
+        pass  # already exists
+    await db[DAILY_COLLECTION].create_index([("user_id", 1), ("day", 1)], unique=True)
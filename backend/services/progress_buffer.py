@@ -0,0 +1,436 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from models.somali_models import UserProgress, UserProgressUpdate
+from services.audio_prewarmer import get_audio_prewarmer
+from services.favorites import sync_favorites
+from services.leaderboard import get_leaderboard
+from services.learning_activity import (
+    LearningActivity,
+    activity_since,
+    activity_snapshot,
+    record_learning_activity
+)
+from services.progress_cache import get_progress_cache
+from services.progress_rules import apply_progress_update
+from services.progress_store import (
+    LAST_FLUSH_TOKEN_FIELD,
+    RevisionConflict,
+    cache_write_through,
+    mongo_now,
+    progress_from_document,
+    progress_to_document,
+    progress_update_operation,
+    revision_query,
+    word_sets_from_document
+)
+from services.word_sets import WordSet
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressDelta:
+    """Pending progress changes for one user, merged across many updates.
+
+    Besides the merged changes it keeps the progress they produce on top
+    of base (progress, completed, favorites), updated one event at a time,
+    so buffering and reading stay O(1) per event.
+    """
+
+    def __init__(self, base: Dict[str, Any]):
+        self.completed: Dict[str, int] = {}  # word id -> points, first completion wins
+        self.favorite_toggles: Dict[str, int] = {}  # word id -> toggle count
+        self.quiz_scores: List[Dict[str, Any]] = []
+        self.acknowledgments: List[int] = []
+        self.last_activity: Optional[datetime] = None
+        self.event_count = 0
+        self.activities: List[LearningActivity] = []  # recorded once the delta is stored
+        self.rebase(base)
+
+    def rebase(self, base: Dict[str, Any]) -> None:
+        """Recompute the resulting progress on top of another stored document"""
+        self.base = base
+        self.progress, self.completed_set, self.favorite_set = apply_delta(base, self)
+
+    def add(self, update: UserProgressUpdate, activity_at: datetime) -> LearningActivity:
+        """Fold a single update into the delta; returns what it changed"""
+        if update.word_completed and update.points_earned:
+            self.completed.setdefault(update.word_completed, update.points_earned)
+        if update.favorite_toggled:
+            word_id = update.favorite_toggled
+            self.favorite_toggles[word_id] = self.favorite_toggles.get(word_id, 0) + 1
+        if update.quiz_completed:
+            self.quiz_scores.append(update.quiz_completed)
+        if update.cultural_tier_acknowledged and update.cultural_tier_acknowledged not in self.acknowledgments:
+            self.acknowledgments.append(update.cultural_tier_acknowledged)
+        self._touch(activity_at)
+        self.event_count += 1
+
+        before = activity_snapshot(self.progress)
+        apply_progress_update(self.progress, self.completed_set, self.favorite_set, update, activity_at)
+        self.progress.revision += 1
+        activity = activity_since(before, self.progress, activity_at)
+        self.activities.append(activity)
+        return activity
+
+    def merged(self, newer: "ProgressDelta") -> "ProgressDelta":
+        """This delta followed by a newer one for the same user"""
+        delta = ProgressDelta(self.base)
+        for word_id, points in list(self.completed.items()) + list(newer.completed.items()):
+            delta.completed.setdefault(word_id, points)
+        for toggles in (self.favorite_toggles, newer.favorite_toggles):
+            for word_id, count in toggles.items():
+                delta.favorite_toggles[word_id] = delta.favorite_toggles.get(word_id, 0) + count
+        delta.quiz_scores = self.quiz_scores + newer.quiz_scores
+        delta.acknowledgments = self.acknowledgments + [
+            tier_id for tier_id in newer.acknowledgments if tier_id not in self.acknowledgments
+        ]
+        for activity_at in (self.last_activity, newer.last_activity):
+            if activity_at is not None:
+                delta._touch(activity_at)
+        delta.event_count = self.event_count + newer.event_count
+        delta.activities = self.activities + newer.activities
+        delta.rebase(self.base)
+        return delta
+
+    def _touch(self, activity_at: datetime) -> None:
+        if self.last_activity is None or activity_at > self.last_activity:
+            self.last_activity = activity_at
+
+    def document(self) -> Dict[str, Any]:
+        """Base document with the delta applied"""
+        return {**self.base, **progress_to_document(self.progress, self.completed_set, self.favorite_set)}
+
+    def updates(self) -> Iterator[UserProgressUpdate]:
+        """Replay the delta as the equivalent sequence of single updates"""
+        for tier_id in self.acknowledgments:
+            yield UserProgressUpdate(cultural_tier_acknowledged=tier_id)
+        for word_id, points in self.completed.items():
+            yield UserProgressUpdate(word_completed=word_id, points_earned=points)
+        for word_id, count in self.favorite_toggles.items():
+            # An even number of toggles cancels out
+            if count % 2:
+                yield UserProgressUpdate(favorite_toggled=word_id)
+        for quiz in self.quiz_scores:
+            yield UserProgressUpdate(quiz_completed=quiz)
+
+
+def apply_delta(
+    document: Dict[str, Any],
+    delta: ProgressDelta
+) -> Tuple[UserProgress, WordSet, WordSet]:
+    """Replay a delta on top of a stored progress document (once per flush or rebase)"""
+    progress = progress_from_document(document)
+    completed, favorites = word_sets_from_document(document)
+    for update in delta.updates():
+        apply_progress_update(progress, completed, favorites, update, delta.last_activity)
+    # Each buffered event counts as one revision, matching what the flush stores
+    progress.revision += delta.event_count
+    return progress, completed, favorites
+
+
+class ProgressWriteBuffer:
+    """Write-behind buffer for user progress updates.
+
+    Updates are merged per user in memory and flushed with a single
+    bulk_write every flush_interval seconds (or when too many users are
+    pending). Reads through load_progress_document see buffered changes,
+    including deltas whose write is still in flight, so read-your-writes
+    holds within this worker.
+
+    No lock is held across Mongo I/O: bases are loaded under per-user
+    locks, and a flush takes the pending deltas out before writing them.
+    Updates arriving meanwhile start a new delta on top of the in-flight
+    one.
+    """
+
+    def __init__(self, flush_interval: float = 0, max_pending_users: int = 1000):
+        self.flush_interval = flush_interval
+        self.max_pending_users = max_pending_users
+        self._pending: Dict[str, ProgressDelta] = {}
+        # Deltas being written: user id -> (delta, set once the write is settled)
+        self._in_flight: Dict[str, Tuple[ProgressDelta, asyncio.Event]] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self.flush_count = 0
+        self.events_buffered = 0
+        self.documents_written = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.flush_interval > 0
+
+    def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start the periodic flush loop"""
+        self._db = db
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Progress write-behind enabled (flush every {self.flush_interval}s)")
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write out everything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._db is not None:
+            for user_id in list(self._pending) + list(self._in_flight):
+                await self.flush_user(self._db, user_id)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(self._db)
+            except Exception as e:
+                logger.error(f"Error flushing buffered progress: {e}")
+
+    def _flush_soon(self, db: AsyncIOMotorDatabase) -> None:
+        """Flush in the background (once too many users are pending)"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+
+        def log_failure(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Error flushing buffered progress: {task.exception()}")
+
+        self._flush_task = asyncio.create_task(self.flush(db))
+        self._flush_task.add_done_callback(log_failure)
+
+    def _current_delta(self, user_id: str) -> Optional[ProgressDelta]:
+        """The user's pending delta, if its base is known without I/O"""
+        delta = self._pending.get(user_id)
+        if delta is None and user_id in self._in_flight:
+            # The in-flight write will be part of the stored document
+            delta = self._pending[user_id] = ProgressDelta(self.read_document(user_id))
+        return delta
+
+    async def _load_delta(self, db: AsyncIOMotorDatabase, user_id: str) -> Optional[ProgressDelta]:
+        lock = self._load_locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            # Another update for the user may have loaded it meanwhile
+            if self._current_delta(user_id) is None:
+                document = await db.user_progress.find_one({"user_id": user_id})
+                if document is not None and self._current_delta(user_id) is None:
+                    self._pending[user_id] = ProgressDelta(document)
+            self._load_locks.pop(user_id, None)
+        return self._current_delta(user_id)
+
+    async def record(
+        self,
+        db: AsyncIOMotorDatabase,
+        user_id: str,
+        update: UserProgressUpdate,
+        expected_revision: Optional[int] = None
+    ) -> Optional[UserProgress]:
+        """Buffer an update and return the resulting progress (None if the user is unknown).
+
+        Raises RevisionConflict if expected_revision is given and the current
+        (buffered) revision differs.
+        """
+        delta = self._current_delta(user_id) or await self._load_delta(db, user_id)
+        if delta is None:
+            return None
+
+        # Nothing below awaits, so no flush can take the delta meanwhile
+        if expected_revision is not None and delta.progress.revision != expected_revision:
+            raise RevisionConflict(f"Expected revision {expected_revision}, found {delta.progress.revision}")
+
+        delta.add(update, mongo_now())
+        self.events_buffered += 1
+
+        if len(self._pending) >= self.max_pending_users:
+            self._flush_soon(db)
+        return delta.progress.copy(deep=True)
+
+    def read_document(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Stored document with buffered changes applied, or None if nothing is buffered"""
+        if user_id in self._pending:
+            return self._pending[user_id].document()
+        if user_id in self._in_flight:
+            return self._in_flight[user_id][0].document()
+        return None
+
+    async def flush_user(self, db: AsyncIOMotorDatabase, user_id: str) -> None:
+        """Write out a single user's buffered changes before a direct write"""
+        while user_id in self._in_flight or user_id in self._pending:
+            if user_id in self._in_flight:
+                await self._in_flight[user_id][1].wait()
+            else:
+                await self.flush(db, [user_id])
+
+    async def flush(self, db: AsyncIOMotorDatabase, user_ids: Optional[List[str]] = None) -> int:
+        """Write buffered deltas with one bulk_write; returns documents written"""
+        if user_ids is None:
+            user_ids = list(self._pending)
+        # A user with a write in flight waits for the next flush, so that
+        # user's writes land in order
+        pending = {
+            user_id: self._pending.pop(user_id)
+            for user_id in user_ids
+            if user_id in self._pending and user_id not in self._in_flight
+        }
+        # Deltas of updates that were rejected (revision conflicts) hold nothing
+        pending = {user_id: delta for user_id, delta in pending.items() if delta.event_count}
+        if not pending:
+            return 0
+
+        settled = asyncio.Event()
+        for user_id, delta in pending.items():
+            self._in_flight[user_id] = (delta, settled)
+        try:
+            written = await self._write(db, pending)
+        except Exception:
+            self._requeue(pending)
+            raise
+        finally:
+            for user_id in pending:
+                self._in_flight.pop(user_id, None)
+            settled.set()
+
+        self.flush_count += 1
+        self.documents_written += written
+        return written
+
+    async def _write(self, db: AsyncIOMotorDatabase, pending: Dict[str, ProgressDelta]) -> int:
+        # Re-read current documents so changes made elsewhere are kept
+        documents = await db.user_progress.find(
+            {"user_id": {"$in": list(pending)}}
+        ).to_list(length=None)
+
+        # Tag every write so conflicted users can be told apart afterwards.
+        # Kept out of processed_event_keys, where it would evict client
+        # idempotency keys from the bounded window.
+        flush_token = uuid.uuid4().hex
+        operations = []
+        updates = {}
+        for document in documents:
+            delta = pending[document["user_id"]]
+            progress, completed, favorites = apply_delta(document, delta)
+            update = progress_update_operation(
+                progress, completed, favorites,
+                extra_fields={LAST_FLUSH_TOKEN_FIELD: flush_token},
+                revision_increment=delta.event_count
+            )
+            updates[progress.user_id] = (document, update, progress, favorites)
+            operations.append(UpdateOne(
+                {"user_id": progress.user_id, **revision_query(document.get("revision", 0))},
+                update
+            ))
+
+        if not operations:
+            return 0
+
+        result = await db.user_progress.bulk_write(operations, ordered=False)
+        for user_id, (_, update, progress, _) in updates.items():
+            cache_write_through(user_id, update, progress.revision)
+        conflicted = []
+        if result.matched_count < len(operations):
+            # Another writer got in between our read and write; retry those next flush
+            conflicted = await db.user_progress.find(
+                {"user_id": {"$in": list(pending)}, LAST_FLUSH_TOKEN_FIELD: {"$ne": flush_token}}
+            ).to_list(length=None)
+            self._requeue(
+                {doc["user_id"]: pending[doc["user_id"]] for doc in conflicted},
+                {doc["user_id"]: doc for doc in conflicted}
+            )
+            logger.info(f"Re-queued buffered progress for {len(conflicted)} users after write conflicts")
+        
+        conflicted_ids = {doc["user_id"] for doc in conflicted}
+        stored_ids = [user_id for user_id in updates if user_id not in conflicted_ids]
+        try:
+            await self._after_write(db, pending, updates, stored_ids)
+        except Exception as e:
+            # The progress itself is stored; re-queueing would apply it twice
+            logger.error(f"Error updating derived data after flushing progress: {e}")
+
+        logger.info(
+            f"Flushed buffered progress: {result.matched_count} users, "
+            f"{sum(delta.event_count for delta in pending.values())} events"
+        )
+        return result.matched_count
+
+    async def _after_write(
+        self,
+        db: AsyncIOMotorDatabase,
+        pending: Dict[str, ProgressDelta],
+        updates: Dict[str, Tuple[Dict[str, Any], Dict[str, Any], UserProgress, WordSet]],
+        stored_ids: List[str]
+    ) -> None:
+        """Leaderboard, prewarming, activity and favorites for the stored users"""
+        await get_leaderboard().record_points_changes(db, {
+            user_id: (updates[user_id][0].get("total_points", 0), updates[user_id][2].total_points)
+            for user_id in stored_ids
+        })
+        for user_id in stored_ids:
+            get_audio_prewarmer().record_tier_unlocks(
+                set(updates[user_id][2].unlocked_tiers) - set(updates[user_id][0].get("unlocked_tiers", []))
+            )
+        await asyncio.gather(*(
+            record_learning_activity(db, user_id, pending[user_id].activities)
+            for user_id in stored_ids
+        ), *(
+            sync_favorites(
+                db, user_id,
+                word_sets_from_document(updates[user_id][0])[1],
+                updates[user_id][3],
+                updates[user_id][2].updated_at
+            )
+            for user_id in stored_ids
+        ))
+
+    def _requeue(
+        self,
+        pending: Dict[str, ProgressDelta],
+        documents: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> None:
+        """Put unwritten deltas back, ahead of anything buffered since they were taken.
+
+        documents are newer stored versions (after a write conflict) to
+        rebase the deltas on.
+        """
+        for user_id, delta in pending.items():
+            newer = self._pending.pop(user_id, None)
+            if newer is not None:
+                delta = delta.merged(newer)
+            if documents and user_id in documents:
+                delta.rebase(documents[user_id])
+            self._pending[user_id] = delta
+            get_progress_cache().invalidate(user_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "flush_interval_seconds": self.flush_interval,
+            "pending_users": len(self._pending),
+            "in_flight_users": len(self._in_flight),
+            "events_buffered": self.events_buffered,
+            "flush_count": self.flush_count,
+            "documents_written": self.documents_written
+        }
+
+
+# Global progress buffer - configured lazily from the environment
+progress_buffer = None
+
+def get_progress_buffer() -> ProgressWriteBuffer:
+    """Get the progress write-behind buffer (disabled unless configured)"""
+    global progress_buffer
+    if progress_buffer is None:
+        progress_buffer = ProgressWriteBuffer(
+            flush_interval=float(os.getenv("PROGRESS_WRITE_BEHIND_SECONDS", "0")),
+            max_pending_users=int(os.getenv("PROGRESS_WRITE_BEHIND_MAX_USERS", "1000"))
+        )
+    return progress_buffer
@@ -0,0 +1,104 @@
+import copy
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressCache:
+    """Bounded in-process LRU cache of user_progress documents with a short TTL.
+
+    Mutation paths write through with put/update so this worker never serves
+    its own stale writes; the TTL bounds staleness from other workers.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 5.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Cached document (a private copy) or None on miss/expiry"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, document = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        # Callers may mutate what they get back
+        return copy.deepcopy(document)
+
+    def put(self, user_id: str, document: Dict[str, Any]) -> None:
+        """Store a full progress document"""
+        if not self.enabled:
+            return
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(document))
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, user_id: str, fields: Dict[str, Any], removed_fields: Iterable[str] = ()) -> None:
+        """Write-through a partial update to a cached document, if present"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return
+        document = entry[1]
+        document.update(copy.deepcopy(fields))
+        for field in removed_fields:
+            document.pop(field, None)
+        self._entries[user_id] = (time.monotonic() + self.ttl_seconds, document)
+        self._entries.move_to_end(user_id)
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
+# Global progress cache - configured lazily from the environment
+progress_cache = None
+
+def get_progress_cache() -> ProgressCache:
+    """Get the per-user progress read cache"""
+    global progress_cache
+    if progress_cache is None:
+        progress_cache = ProgressCache(
+            max_entries=int(os.getenv("PROGRESS_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("PROGRESS_CACHE_TTL_SECONDS", "5"))
+        )
+    return progress_cache
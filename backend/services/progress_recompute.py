@@ -0,0 +1,224 @@
+import asyncio
+import uuid
+from typing import Any, Dict, List, Optional
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from services.job_checkpoints import (
+    CHECKPOINTS_COLLECTION,
+    JobRunning,
+    acquire_job_lease,
+    release_job_lease,
+    save_job_checkpoint
+)
+from services.progress_cache import get_progress_cache
+from services.progress_rules import recompute_progress
+from services.progress_store import (
+    mongo_now,
+    progress_from_document,
+    revision_query,
+    word_sets_from_document
+)
+
+logger = logging.getLogger(__name__)
+
+RECOMPUTE_JOB_ID = "progress_recompute"
+# Changed users kept as a sample in the checkpoint (dry runs report these)
+MAX_DIFF_SAMPLE = 100
+# How long a run holds the job across workers without renewing (renewed every batch)
+RECOMPUTE_LEASE_SECONDS = 600
+
+
+class RecomputeRunning(JobRunning):
+    """Another run (in this or another worker) holds the recompute lease"""
+
+
+# Background run started from the admin endpoint (one at a time per worker)
+recompute_task: Optional[asyncio.Task] = None
+
+
+def recompute_job_id(dry_run: bool) -> str:
+    return f"{RECOMPUTE_JOB_ID}:dry_run" if dry_run else RECOMPUTE_JOB_ID
+
+
+async def load_recompute_checkpoint(db: AsyncIOMotorDatabase, dry_run: bool = False) -> Optional[Dict[str, Any]]:
+    return await db[CHECKPOINTS_COLLECTION].find_one({"_id": recompute_job_id(dry_run)})
+
+
+async def run_progress_recompute(
+    db: AsyncIOMotorDatabase,
+    dry_run: bool = False,
+    batch_size: int = 500,
+    resume: bool = True,
+    revoke_tiers: bool = False,
+    lease_owner: Optional[str] = None
+) -> Dict[str, Any]:
+    """Re-evaluate level, tiers and badges for every user.
+
+    Streams user_progress in user_id order with a batched cursor, so memory
+    stays bounded by batch_size. Changed documents are written with one
+    bulk_write per batch, guarded by the stored revision so concurrent
+    progress writes win (the user is counted as a conflict and picked up by
+    the next run). After each batch the last user_id is checkpointed in
+    job_checkpoints; an interrupted run with the same revoke_tiers continues
+    from there when resumed, otherwise it starts over.
+    With dry_run nothing but the checkpoint is written and a sample of the
+    changes is reported instead.
+
+    Raises RecomputeRunning if another run holds the job's lease, or takes
+    it over after this run stopped renewing it. Dry runs have their own.
+    """
+    job_id = recompute_job_id(dry_run)
+    lease_owner = lease_owner or uuid.uuid4().hex
+    if not await acquire_job_lease(db, job_id, lease_owner, RECOMPUTE_LEASE_SECONDS):
+        raise RecomputeRunning("A recompute job is already running")
+
+    try:
+        return await _run_with_lease(db, job_id, lease_owner, dry_run, batch_size, resume, revoke_tiers)
+    except BaseException:
+        await release_job_lease(db, job_id, lease_owner)
+        raise
+
+
+async def _run_with_lease(
+    db: AsyncIOMotorDatabase,
+    job_id: str,
+    lease_owner: str,
+    dry_run: bool,
+    batch_size: int,
+    resume: bool,
+    revoke_tiers: bool
+) -> Dict[str, Any]:
+    """Body of run_progress_recompute, run while holding the lease"""
+    checkpoint = await db[CHECKPOINTS_COLLECTION].find_one({"_id": job_id})
+    # Only a run with the same options may continue where another stopped;
+    # a document holding just the lease has nothing to resume
+    if not (
+        resume and checkpoint and "started_at" in checkpoint and checkpoint.get("completed_at") is None
+        and checkpoint.get("revoke_tiers", False) == revoke_tiers
+    ):
+        checkpoint = {
+            "_id": job_id,
+            "dry_run": dry_run,
+            "revoke_tiers": revoke_tiers,
+            "last_user_id": None,
+            "users_scanned": 0,
+            "users_changed": 0,
+            "users_updated": 0,
+            "conflicts": 0,
+            "field_changes": {},
+            "diff_sample": [],
+            "started_at": mongo_now(),
+            "completed_at": None
+        }
+        logger.info(f"Starting {job_id}")
+    else:
+        logger.info(f"Resuming {job_id} after user {checkpoint['last_user_id']}")
+
+    query = {}
+    if checkpoint["last_user_id"] is not None:
+        query["user_id"] = {"$gt": checkpoint["last_user_id"]}
+    cursor = db.user_progress.find(query).sort("user_id", 1).batch_size(batch_size)
+
+    batch: List[Dict[str, Any]] = []
+    async for document in cursor:
+        batch.append(document)
+        if len(batch) >= batch_size:
+            await _recompute_batch(db, batch, checkpoint, lease_owner, dry_run, revoke_tiers)
+            batch = []
+    if batch:
+        await _recompute_batch(db, batch, checkpoint, lease_owner, dry_run, revoke_tiers)
+
+    checkpoint["completed_at"] = mongo_now()
+    await _save_checkpoint(db, checkpoint, lease_owner, None)
+    logger.info(
+        f"Finished {job_id}: {checkpoint['users_scanned']} scanned, "
+        f"{checkpoint['users_changed']} changed, {checkpoint['users_updated']} updated, "
+        f"{checkpoint['conflicts']} conflicts"
+    )
+    return checkpoint
+
+
+async def _recompute_batch(
+    db: AsyncIOMotorDatabase,
+    documents: List[Dict[str, Any]],
+    checkpoint: Dict[str, Any],
+    lease_owner: str,
+    dry_run: bool,
+    revoke_tiers: bool
+) -> None:
+    operations = []
+    user_ids = []
+    for document in documents:
+        progress = progress_from_document(document)
+        completed, favorites = word_sets_from_document(document)
+        changes = recompute_progress(progress, completed, favorites, revoke_tiers)
+        if not changes:
+            continue
+
+        checkpoint["users_changed"] += 1
+        for field in changes:
+            checkpoint["field_changes"][field] = checkpoint["field_changes"].get(field, 0) + 1
+        if len(checkpoint["diff_sample"]) < MAX_DIFF_SAMPLE:
+            checkpoint["diff_sample"].append({"user_id": progress.user_id, "changes": changes})
+
+        operations.append(UpdateOne(
+            {"user_id": progress.user_id, **revision_query(document.get("revision", 0))},
+            {
+                "$set": {field: change["new"] for field, change in changes.items()},
+                "$inc": {"revision": 1}
+            }
+        ))
+        user_ids.append(progress.user_id)
+
+    if operations and not dry_run:
+        result = await db.user_progress.bulk_write(operations, ordered=False)
+        checkpoint["users_updated"] += result.modified_count
+        checkpoint["conflicts"] += len(operations) - result.matched_count
+        for user_id in user_ids:
+            get_progress_cache().invalidate(user_id)
+
+    checkpoint["users_scanned"] += len(documents)
+    checkpoint["last_user_id"] = documents[-1]["user_id"]
+    checkpoint["updated_at"] = mongo_now()
+    await _save_checkpoint(db, checkpoint, lease_owner, RECOMPUTE_LEASE_SECONDS)
+
+
+async def _save_checkpoint(
+    db: AsyncIOMotorDatabase,
+    checkpoint: Dict[str, Any],
+    lease_owner: str,
+    lease_seconds: Optional[float]
+) -> None:
+    """Store the checkpoint (renewing or releasing the lease), unless another run took the lease over"""
+    if not await save_job_checkpoint(db, checkpoint, lease_owner, lease_seconds):
+        raise RecomputeRunning("The recompute lease was taken over by another run")
+
+
+def recompute_running() -> bool:
+    return recompute_task is not None and not recompute_task.done()
+
+
+async def start_progress_recompute(db: AsyncIOMotorDatabase, dry_run: bool = False, **options: Any) -> bool:
+    """Run the recompute job in the background; False if one is already running.
+
+    The lease is taken before returning, so a run in any worker is reported.
+    """
+    global recompute_task
+    lease_owner = uuid.uuid4().hex
+    if recompute_running() or not await acquire_job_lease(
+        db, recompute_job_id(dry_run), lease_owner, RECOMPUTE_LEASE_SECONDS
+    ):
+        return False
+
+    def log_failure(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Progress recompute failed: {task.exception()}")
+
+    recompute_task = asyncio.create_task(
+        run_progress_recompute(db, dry_run=dry_run, lease_owner=lease_owner, **options)
+    )
+    recompute_task.add_done_callback(log_failure)
+    return True
@@ -0,0 +1,298 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+import logging
+
+from models.somali_models import UserProgress, UserProgressUpdate, UserProgressWithTiers
+from data.somali_vocabulary import TIER_DEFINITIONS
+from services.badge_engine import (
+    ACTIVITY,
+    FAVORITE_ADDED,
+    LEVEL_CHANGED,
+    QUIZ_COMPLETED,
+    TIER_UNLOCKED,
+    WORD_COMPLETED,
+    evaluate_all_badges,
+    evaluate_badges
+)
+from services.progress_store import TIERS_BEFORE_ACKNOWLEDGMENT_FIELD, mongo_now
+from services.word_sets import WordSet
+
+logger = logging.getLogger(__name__)
+
+
+def compute_level(total_points: int) -> int:
+    """Level reached for a point total (100 points per level)"""
+    return (total_points // 100) + 1
+
+
+def missing_tier_requirements(tier: Dict[str, Any], progress: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """List the unlock requirements of a tier that a progress document does not meet"""
+    tier_id = tier["id"]
+    requirements = tier["unlock_requirements"]
+    missing_requirements = []
+    
+    # Check point requirements
+    required_points = requirements.get("points", 0)
+    user_points = progress.get("total_points", 0)
+    if user_points < required_points:
+        missing_requirements.append({
+            "type": "points",
+            "required": required_points,
+            "current": user_points,
+            "missing": required_points - user_points
+        })
+    
+    # Check previous tier completion
+    required_prev_tier = requirements.get("completed_tier")
+    if required_prev_tier:
+        unlocked_tiers = progress.get("unlocked_tiers", [])
+        if required_prev_tier not in unlocked_tiers:
+            missing_requirements.append({
+                "type": "previous_tier",
+                "required": required_prev_tier,
+                "message": f"Must complete Tier {required_prev_tier} first"
+            })
+    
+    # Check cultural acknowledgment
+    requires_cultural = requirements.get("cultural_acknowledgment", False)
+    if requires_cultural:
+        cultural_acks = progress.get("cultural_acknowledgments", [])
+        if tier_id not in cultural_acks:
+            missing_requirements.append({
+                "type": "cultural_acknowledgment", 
+                "required": tier_id,
+                "message": "Must acknowledge cultural sensitivity guidelines"
+            })
+    
+    return missing_requirements
+
+
+def tier_unlock_status(progress: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Unlock state of every tier for a progress document"""
+    unlocked_tiers = progress.get("unlocked_tiers", [])
+    status = []
+    for tier in TIER_DEFINITIONS:
+        missing_requirements = missing_tier_requirements(tier, progress)
+        status.append({
+            "tier_id": tier["id"],
+            "already_unlocked": tier["id"] in unlocked_tiers,
+            "can_unlock": not missing_requirements,
+            "missing_requirements": missing_requirements
+        })
+    return status
+
+
+def progress_with_tiers(progress: UserProgress) -> UserProgressWithTiers:
+    """Progress plus every tier's unlock state, so clients need no follow-up reads"""
+    progress_data = progress.dict()
+    return UserProgressWithTiers(**progress_data, tier_status=tier_unlock_status(progress_data))
+
+
+def unlock_eligible_tiers(progress: UserProgress) -> List[int]:
+    """Unlock every tier whose requirements are now met; returns the new tier ids"""
+    newly_unlocked = []
+    for tier in TIER_DEFINITIONS:
+        tier_id = tier["id"]
+        if tier_id not in progress.unlocked_tiers:
+            requirements = tier["unlock_requirements"]
+                
+            # Check point requirements
+            if progress.total_points >= requirements.get("points", 0):
+                # Check if previous tier completed (if required)
+                prev_tier = requirements.get("completed_tier")
+                if not prev_tier or prev_tier in progress.unlocked_tiers:
+                    # Check cultural acknowledgment (for sensitive tiers)
+                    cultural_req = requirements.get("cultural_acknowledgment", False)
+                    if not cultural_req or tier_id in progress.cultural_acknowledgments:
+                        progress.unlocked_tiers.append(tier_id)
+                        newly_unlocked.append(tier_id)
+    return newly_unlocked
+
+
+def cultural_acknowledgment_update(tier_id: int, now: datetime) -> List[Dict[str, Any]]:
+    """Pipeline update acknowledging a tier and unlocking whatever then qualifies.
+
+    Mirrors unlock_eligible_tiers in MQL so acknowledgment and unlock happen
+    in one atomic write; revision and updated_at only change if something did.
+    """
+    def has(value: Any, array_field: str) -> Dict[str, Any]:
+        return {"$in": [value, {"$ifNull": [f"${array_field}", []]}]}
+
+    def appended(array_field: str, value: Any) -> Dict[str, Any]:
+        return {"$concatArrays": [{"$ifNull": [f"${array_field}", []]}, [value]]}
+
+    pipeline: List[Dict[str, Any]] = [
+        {"$set": {
+            "_previous_ack_count": {"$size": {"$ifNull": ["$cultural_acknowledgments", []]}},
+            "_previous_tier_count": {"$size": {"$ifNull": ["$unlocked_tiers", []]}}
+        }},
+        # $addToSet semantics, keeping acknowledgment order
+        {"$set": {"cultural_acknowledgments": {"$cond": [
+            has(tier_id, "cultural_acknowledgments"),
+            "$cultural_acknowledgments",
+            appended("cultural_acknowledgments", tier_id)
+        ]}}}
+    ]
+    
+    for tier in TIER_DEFINITIONS:
+        requirements = tier["unlock_requirements"]
+        conditions = [
+            {"$eq": [has(tier["id"], "unlocked_tiers"), False]},
+            {"$gte": [{"$ifNull": ["$total_points", 0]}, requirements.get("points", 0)]}
+        ]
+        if requirements.get("completed_tier"):
+            conditions.append(has(requirements["completed_tier"], "unlocked_tiers"))
+        if requirements.get("cultural_acknowledgment", False):
+            conditions.append(has(tier["id"], "cultural_acknowledgments"))
+        pipeline.append({"$set": {"unlocked_tiers": {"$cond": [
+            {"$and": conditions},
+            appended("unlocked_tiers", tier["id"]),
+            {"$ifNull": ["$unlocked_tiers", []]}
+        ]}}})
+    
+    changed = {"$or": [
+        {"$ne": [{"$size": "$cultural_acknowledgments"}, "$_previous_ack_count"]},
+        {"$ne": [{"$size": "$unlocked_tiers"}, "$_previous_tier_count"]}
+    ]}
+    pipeline.append({"$set": {
+        "revision": {"$add": [{"$ifNull": ["$revision", 0]}, {"$cond": [changed, 1, 0]}]},
+        "updated_at": {"$cond": [changed, now, "$updated_at"]}
+    }})
+    # Tiers are only ever appended, so the caller can tell which ones this unlocked
+    pipeline.append({"$set": {TIERS_BEFORE_ACKNOWLEDGMENT_FIELD: "$_previous_tier_count"}})
+    pipeline.append({"$project": {"_previous_ack_count": 0, "_previous_tier_count": 0}})
+    return pipeline
+
+
+def recompute_progress(
+    progress: UserProgress,
+    completed: WordSet,
+    favorites: WordSet,
+    revoke_tiers: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    """Re-derive level, unlocked tiers and badges under the current rules.
+
+    Used after TIER_DEFINITIONS or the level formula change. Mutates progress
+    and returns {field: {"old": ..., "new": ...}} for every changed field.
+    Tiers are only taken away with revoke_tiers; badges are never revoked.
+    """
+    before = {
+        "level": progress.level,
+        "unlocked_tiers": list(progress.unlocked_tiers),
+        "badges_earned": list(progress.badges_earned)
+    }
+    
+    progress.level = compute_level(progress.total_points)
+    if revoke_tiers:
+        progress.unlocked_tiers = []
+    unlock_eligible_tiers(progress)
+    progress.unlocked_tiers.sort()
+    evaluate_all_badges(progress, completed, favorites)
+    
+    changes = {}
+    for field, old_value in before.items():
+        new_value = getattr(progress, field)
+        if field == "unlocked_tiers" and sorted(old_value) == new_value:
+            progress.unlocked_tiers = old_value
+            continue
+        if new_value != old_value:
+            changes[field] = {"old": old_value, "new": new_value}
+    return changes
+
+
+def update_day_streak(progress: UserProgress, activity_at: datetime) -> None:
+    """Extend or restart the consecutive-day learning streak.
+
+    This is the one definition of a streak: current_streak / longest_streak
+    count consecutive UTC days with a completed word or quiz (needed by the
+    week_warrior badge), and everything reporting streaks reads them.
+    """
+    last_day = progress.last_streak_day or progress.last_activity
+    days_since_last = (activity_at.date() - last_day.date()).days
+    if progress.current_streak == 0 or days_since_last > 1:
+        progress.current_streak = 1
+    elif days_since_last == 1:
+        progress.current_streak += 1
+    # Same day (or an older offline event) keeps the streak as is
+    if days_since_last >= 0:
+        progress.last_streak_day = activity_at
+    progress.longest_streak = max(progress.longest_streak, progress.current_streak)
+
+
+def current_day_streak(progress: UserProgress, today: date) -> int:
+    """current_streak as of today; it lapses once a whole day passes without learning"""
+    last_day = progress.last_streak_day
+    if last_day is None or (today - last_day.date()).days > 1:
+        return 0
+    return progress.current_streak
+
+
+def apply_progress_update(
+    progress: UserProgress,
+    completed: WordSet,
+    favorites: WordSet,
+    update: UserProgressUpdate,
+    activity_at: Optional[datetime] = None
+) -> None:
+    """Apply a single progress update in memory.
+
+    Mutates progress and the word sets in place; persisting the result is
+    left to the caller so several updates can share one write.
+    """
+    events = set()
+    activity_time = activity_at or mongo_now()
+    
+    # Handle word completion
+    if update.word_completed and update.points_earned:
+        if completed.add(update.word_completed):
+            progress.total_points += update.points_earned
+            events.update((WORD_COMPLETED, ACTIVITY))
+            update_day_streak(progress, activity_time)
+                
+            # Check for level up
+            new_level = compute_level(progress.total_points)
+            if new_level > progress.level:
+                progress.level = new_level
+                events.add(LEVEL_CHANGED)
+                
+            # Check for tier unlocks
+            if unlock_eligible_tiers(progress):
+                events.add(TIER_UNLOCKED)
+        
+    # Handle favorite toggle
+    if update.favorite_toggled:
+        word_id = update.favorite_toggled
+        if not favorites.discard(word_id):
+            favorites.add(word_id)
+            events.add(FAVORITE_ADDED)
+        
+    # Handle quiz completion
+    if update.quiz_completed:
+        progress.quiz_scores.append(update.quiz_completed)
+        events.update((QUIZ_COMPLETED, ACTIVITY))
+        update_day_streak(progress, activity_time)
+        
+    # Handle cultural acknowledgment
+    if update.cultural_tier_acknowledged:
+        tier_id = update.cultural_tier_acknowledged
+        if tier_id not in progress.cultural_acknowledgments:
+            progress.cultural_acknowledgments.append(tier_id)
+                
+            # Check if this unlocks any tiers
+            for tier in TIER_DEFINITIONS:
+                if (tier["id"] == tier_id and 
+                    tier["id"] not in progress.unlocked_tiers and
+                    progress.total_points >= tier["unlock_requirements"].get("points", 0)):
+                    progress.unlocked_tiers.append(tier["id"])
+                    events.add(TIER_UNLOCKED)
+    
+    # Award badges that depend on what just happened
+    evaluate_badges(progress, completed, favorites, events)
+        
+    # Sync API-facing id lists with the stored bitsets
+    progress.completed_words = completed.ids()
+    progress.favorites = favorites.ids()
+    
+    # Update timestamps
+    progress.updated_at = mongo_now()
+    progress.last_activity = max(progress.last_activity, activity_time)
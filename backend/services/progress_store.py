@@ -0,0 +1,228 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+from models.somali_models import UserProgress
+from services.progress_cache import get_progress_cache
+from services.word_sets import WordSet
+
+logger = logging.getLogger(__name__)
+
+# Storage-only fields replacing the completed_words / favorites id lists
+WORD_SET_FIELDS = {
+    "completed_words": ("completed_bits", "completed_extra"),
+    "favorites": ("favorite_bits", "favorite_extra"),
+}
+
+# Idempotency keys of recently applied client events, bounded per user
+PROCESSED_EVENT_KEYS_FIELD = "processed_event_keys"
+MAX_PROCESSED_EVENT_KEYS = 1000
+
+# Token of the write-behind flush that last stored the document
+LAST_FLUSH_TOKEN_FIELD = "last_flush_token"
+
+# How many tiers were unlocked before the last cultural acknowledgment write
+TIERS_BEFORE_ACKNOWLEDGMENT_FIELD = "tiers_before_acknowledgment"
+
+STORAGE_ONLY_FIELDS = {
+    "_id", PROCESSED_EVENT_KEYS_FIELD, LAST_FLUSH_TOKEN_FIELD, TIERS_BEFORE_ACKNOWLEDGMENT_FIELD
+} | {
+    field for fields in WORD_SET_FIELDS.values() for field in fields
+}
+
+
+class RevisionConflict(Exception):
+    """The stored progress revision differs from the one the caller expected"""
+
+
+def progress_etag(revision: int) -> str:
+    """ETag for a progress revision"""
+    return f'"{revision}"'
+
+
+def etag_matches(header_value: str, revision: int) -> bool:
+    """Whether an If-Match / If-None-Match header value matches a revision"""
+    etag = progress_etag(revision)
+    for tag in header_value.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+def revision_query(revision: int) -> Dict[str, Any]:
+    """Filter matching a stored revision (documents from before revisions count as 0)"""
+    if revision == 0:
+        return {"revision": {"$in": [0, None]}}
+    return {"revision": revision}
+
+
+def mongo_now() -> datetime:
+    """Current UTC time truncated to BSON's millisecond precision.
+
+    Timestamps used in conditional writes must round-trip through Mongo (and
+    the read cache) unchanged.
+    """
+    now = datetime.utcnow()
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def client_time(value: Optional[datetime]) -> datetime:
+    """A client-reported timestamp as naive UTC, never later than now.
+
+    Clients send ISO timestamps with or without an offset; stored times are
+    naive UTC, and a fast client clock must not move activity forward.
+    """
+    now = mongo_now()
+    if value is None:
+        return now
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(value.replace(microsecond=value.microsecond // 1000 * 1000), now)
+
+
+def word_sets_from_document(document: Dict[str, Any]) -> Tuple[WordSet, WordSet]:
+    """Decode the (completed, favorites) word sets of a stored progress document.
+
+    Documents written before the bitset encoding still carry plain id lists;
+    those are read as-is and re-encoded on their next write.
+    """
+    word_sets = []
+    for list_field, (bits_field, extra_field) in WORD_SET_FIELDS.items():
+        if bits_field in document:
+            word_sets.append(WordSet.from_bytes(document[bits_field], document.get(extra_field)))
+        else:
+            word_sets.append(WordSet.from_ids(document.get(list_field, [])))
+    return word_sets[0], word_sets[1]
+
+
+def progress_from_document(document: Dict[str, Any]) -> UserProgress:
+    """Build the API-facing UserProgress from a stored document"""
+    completed, favorites = word_sets_from_document(document)
+    fields = {
+        key: value for key, value in document.items()
+        if key not in STORAGE_ONLY_FIELDS
+    }
+    fields["completed_words"] = completed.ids()
+    fields["favorites"] = favorites.ids()
+    return UserProgress(**fields)
+
+
+def progress_to_document(
+    progress: UserProgress,
+    completed: Optional[WordSet] = None,
+    favorites: Optional[WordSet] = None
+) -> Dict[str, Any]:
+    """Encode UserProgress for storage, replacing id lists with bitsets"""
+    if completed is None:
+        completed = WordSet.from_ids(progress.completed_words)
+    if favorites is None:
+        favorites = WordSet.from_ids(progress.favorites)
+
+    document = progress.dict(exclude=set(WORD_SET_FIELDS))
+    for (bits_field, extra_field), word_set in zip(WORD_SET_FIELDS.values(), (completed, favorites)):
+        document[bits_field] = word_set.to_bytes()
+        document[extra_field] = sorted(word_set.extras)
+    return document
+
+
+def progress_update_operation(
+    progress: UserProgress,
+    completed: WordSet,
+    favorites: WordSet,
+    extra_fields: Optional[Dict[str, Any]] = None,
+    revision_increment: int = 1
+) -> Dict[str, Any]:
+    """Build the update document that persists progress.
+
+    Uses $set rather than a full replace so storage-only fields that are not
+    passed in (e.g. processed event keys) are left untouched, and bumps the
+    stored revision.
+    """
+    document = progress_to_document(progress, completed, favorites)
+    document.pop("revision")
+    if extra_fields:
+        document.update(extra_fields)
+    
+    return {
+        "$set": document,
+        "$inc": {"revision": revision_increment},
+        # Drop pre-bitset id lists once the document is re-encoded
+        "$unset": {list_field: "" for list_field in WORD_SET_FIELDS}
+    }
+
+
+def cache_write_through(user_id: str, operation: Dict[str, Any], revision: int) -> None:
+    """Mirror a successful progress update operation into the read cache"""
+    get_progress_cache().update(
+        user_id,
+        {**operation.get("$set", {}), "revision": revision},
+        operation.get("$unset", {}).keys()
+    )
+
+
+async def load_progress_document(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Dict[str, Any]]:
+    """Read a stored progress document.
+
+    Includes this worker's buffered writes and is served from the read cache
+    when possible, so repeated reads within a page load skip Mongo.
+    """
+    from services.progress_buffer import get_progress_buffer
+    
+    buffered = get_progress_buffer().read_document(user_id)
+    if buffered is not None:
+        return buffered
+    
+    progress_cache = get_progress_cache()
+    document = progress_cache.get(user_id)
+    if document is None:
+        document = await db.user_progress.find_one({"user_id": user_id})
+        if document is not None:
+            progress_cache.put(user_id, document)
+    return document
+
+
+async def insert_progress(db: AsyncIOMotorDatabase, progress: UserProgress) -> None:
+    """Store a new progress document"""
+    document = progress_to_document(progress)
+    await db.user_progress.insert_one(document)
+    get_progress_cache().put(progress.user_id, document)
+
+
+async def save_progress(
+    db: AsyncIOMotorDatabase,
+    progress: UserProgress,
+    completed: WordSet,
+    favorites: WordSet,
+    expected_revision: Optional[int] = None,
+    extra_fields: Optional[Dict[str, Any]] = None
+) -> Optional[int]:
+    """Persist progress immediately and return the new revision.
+
+    With expected_revision the write only applies if the stored revision is
+    still the one that was read; returns None when that check fails.
+    """
+    query: Dict[str, Any] = {"user_id": progress.user_id}
+    if expected_revision is not None:
+        query.update(revision_query(expected_revision))
+    
+    operation = progress_update_operation(progress, completed, favorites, extra_fields)
+    stored = await db.user_progress.find_one_and_update(
+        query,
+        operation,
+        projection={"revision": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if stored is None:
+        # Our view was stale; make sure the retry reads from Mongo
+        get_progress_cache().invalidate(progress.user_id)
+        return None
+    
+    progress.revision = stored["revision"]
+    cache_write_through(progress.user_id, operation, progress.revision)
+    return progress.revision
@@ -0,0 +1,100 @@
+from typing import Any, Dict, Iterator, List
+import logging
+
+from data.somali_vocabulary import SOMALI_VOCABULARY
+from models.somali_models import UserProgress
+from services.word_sets import CATEGORY_WORD_SETS, TIER_WORD_SETS, WordSet, word_id_for
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTY_ORDER = {"beginner": 0, "intermediate": 1, "advanced": 2}
+
+
+def _build_tier_orderings() -> Dict[int, Dict[str, List[int]]]:
+    """Per tier and category, catalog ordinals in learning order (easiest, cheapest first)"""
+    orderings: Dict[int, Dict[str, List[int]]] = {}
+    ranked = sorted(
+        enumerate(SOMALI_VOCABULARY, start=1),
+        key=lambda item: (DIFFICULTY_ORDER.get(item[1]["difficulty"], len(DIFFICULTY_ORDER)), item[1]["points"], item[0])
+    )
+    for ordinal, vocab_data in ranked:
+        tier_orderings = orderings.setdefault(vocab_data["tier"], {})
+        tier_orderings.setdefault(vocab_data["category"], []).append(ordinal)
+    return orderings
+
+
+# Precomputed once at import, like the catalog word sets (the seeded catalog
+# is SOMALI_VOCABULARY, so this is once per catalog version)
+TIER_WORD_ORDERINGS: Dict[int, Dict[str, List[int]]] = _build_tier_orderings()
+TIER_CATEGORY_MASKS: Dict[int, Dict[str, int]] = {
+    tier: {
+        category: WordSet.from_ids(word_id_for(ordinal) for ordinal in ordinals).bits
+        for category, ordinals in tier_orderings.items()
+    }
+    for tier, tier_orderings in TIER_WORD_ORDERINGS.items()
+}
+
+
+def _learning_queue(ordinals: List[int], remaining: int, favorite_bits: int) -> Iterator[int]:
+    """Remaining ordinals in learning order, unseen before seen, produced only as far as consumed"""
+    unseen = remaining & ~favorite_bits
+    yield from (ordinal for ordinal in ordinals if unseen >> ordinal & 1)
+    seen = remaining & favorite_bits
+    yield from (ordinal for ordinal in ordinals if seen >> ordinal & 1)
+
+
+def recommend_words(
+    progress: UserProgress,
+    completed: WordSet,
+    favorites: WordSet,
+    limit: int,
+    include_locked: bool = False
+) -> List[Dict[str, Any]]:
+    """Next words to learn, as {word_id, tier, category, locked, seen} in priority order.
+
+    Unlocked tiers come first (lowest tier first), then locked ones if asked
+    for. Within a tier, picks rotate to whichever category the user has
+    completed the fewest words in, and words the user has not come across
+    yet (favorited counts as seen) go before ones they have.
+    Works purely on the precomputed masks and orderings and the user's
+    bitsets: finished tiers and categories are skipped with one mask
+    operation, and orderings are only walked as far as words are picked.
+    """
+    category_completed = {
+        category: len(completed & word_set) for category, word_set in CATEGORY_WORD_SETS.items()
+    }
+    unlocked = set(progress.unlocked_tiers)
+    tiers = sorted(tier for tier in TIER_WORD_ORDERINGS if tier in unlocked)
+    if include_locked:
+        tiers += sorted(tier for tier in TIER_WORD_ORDERINGS if tier not in unlocked)
+
+    picks: List[Dict[str, Any]] = []
+    for tier in tiers:
+        remaining = TIER_WORD_SETS[tier].bits & ~completed.bits
+        if not remaining:
+            continue
+        queues = {
+            category: _learning_queue(ordinals, remaining, favorites.bits)
+            for category, ordinals in TIER_WORD_ORDERINGS[tier].items()
+            if remaining & TIER_CATEGORY_MASKS[tier][category]
+        }
+
+        while queues and len(picks) < limit:
+            category = min(queues, key=lambda name: (category_completed.get(name, 0), name))
+            ordinal = next(queues[category], None)
+            if ordinal is None:
+                del queues[category]
+                continue
+            category_completed[category] = category_completed.get(category, 0) + 1
+            picks.append({
+                "word_id": word_id_for(ordinal),
+                "tier": tier,
+                "category": category,
+                "locked": tier not in unlocked,
+                "seen": bool(favorites.bits >> ordinal & 1)
+            })
+
+        if len(picks) >= limit:
+            break
+
+    return picks
@@ -0,0 +1,204 @@
+import abc
+import asyncio
+import base64
+import math
+import random
+from typing import Any, Dict, List, Optional
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Silent MPEG-2 Layer III frame: 24 kHz mono at 32 kbps, no CRC, no padding.
+# 72 * 32000 / 24000 = 96 bytes holding 576 samples (24 ms); an all-zero
+# side info and body decodes as silence.
+MP3_FRAME_HEADER = bytes([0xFF, 0xF3, 0x44, 0xC0])
+MP3_FRAME_BYTES = 96
+MP3_FRAME_SECONDS = 576 / 24000
+
+
+class TTSError(Exception):
+    """Speech synthesis failed.
+
+    retryable marks failures that may succeed on another attempt (timeouts,
+    rate limiting, server errors); retry_after is the provider's hint in
+    seconds, if it gave one.
+    """
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def estimate_speech_seconds(text: str, speed: float) -> float:
+    """Estimate audio duration in seconds"""
+    # Average speaking rate: ~150 words per minute for normal speech
+    words = len(text.split())
+    base_duration = (words / 150) * 60  # Convert to seconds
+    adjusted_duration = base_duration / speed
+    return max(0.5, adjusted_duration)  # Minimum 0.5 seconds
+
+
+class TTSProvider(abc.ABC):
+    """A speech synthesis backend.
+
+    Each call is a single attempt that returns or raises TTSError;
+    retries, hedging, deadlines and circuit breaking live in TTSService.
+    """
+
+    name = "provider"
+
+    @abc.abstractmethod
+    async def synthesize(self, text: str, speed: float) -> str:
+        """Base64 encoded MP3 for already canonical text and speed"""
+
+    @abc.abstractmethod
+    async def list_voices(self) -> List[Dict[str, Any]]:
+        """Voices the provider offers"""
+
+    async def aclose(self) -> None:
+        """Release connections"""
+
+
+class GoogleTTSProvider(TTSProvider):
+    """Google Cloud Text-to-Speech over REST with a pooled async HTTP client.
+
+    base_url (or a transport) can point at a local fake server.
+    """
+
+    name = "google"
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://texttospeech.googleapis.com/v1",
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        max_connections: int = 20,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        if not api_key:
+            raise ValueError("GOOGLE_TTS_API_KEY environment variable is required")
+
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self.transport = transport  # e.g. httpx.ASGITransport around a fake TTS app
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Somali voice configuration
+        self.voice_config = {
+            "languageCode": "so-SO",  # Somali (Somalia)
+            "name": "so-SO-Standard-B",  # Male voice
+            "ssmlGender": "MALE"
+        }
+
+        # Audio configuration
+        self.audio_config = {
+            "audioEncoding": "MP3",
+            "sampleRateHertz": 24000,
+            "effectsProfileId": ["telephony-class-application"]
+        }
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=self.limits,
+                params={"key": self.api_key},
+                transport=self.transport
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        try:
+            response = await self.client.request(method, path, **kwargs)
+        except httpx.TransportError as e:
+            raise TTSError(f"TTS API unreachable: {e!r}", retryable=True) from e
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            retry_after = response.headers.get("Retry-After")
+            raise TTSError(
+                f"TTS API returned {response.status_code}",
+                retryable=True,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        if response.is_error:
+            # Client errors (bad request, auth) will not get better
+            raise TTSError(f"TTS API rejected the request: {response.status_code}")
+        return response.json()
+
+    async def synthesize(self, text: str, speed: float) -> str:
+        payload = {
+            "input": {"text": text},
+            "voice": self.voice_config,
+            "audioConfig": {**self.audio_config, "speakingRate": speed}
+        }
+        result = await self._request("POST", "/text:synthesize", json=payload)
+        return result.get("audioContent", "")
+
+    async def list_voices(self) -> List[Dict[str, Any]]:
+        data = await self._request("GET", "/voices")
+        return data.get("voices", [])
+
+
+def fake_mp3(text: str, speed: float) -> bytes:
+    """Silent but valid MP3 as long as the estimated speech for text"""
+    frames = math.ceil(estimate_speech_seconds(text, speed) / MP3_FRAME_SECONDS)
+    return (MP3_FRAME_HEADER + bytes(MP3_FRAME_BYTES - len(MP3_FRAME_HEADER))) * frames
+
+
+class FakeTTSProvider(TTSProvider):
+    """Deterministic local provider for development, tests and benchmarks.
+
+    Answers after latency_seconds (plus up to latency_jitter_seconds) with
+    silent MP3 frames sized to the text; failure_rate of calls fail with a
+    retryable error instead. Latencies and failures come from a seeded
+    generator, so a run repeats exactly.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_seconds: float = 0.05,
+        latency_jitter_seconds: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0
+    ):
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    async def _respond(self) -> None:
+        self.calls += 1
+        delay = self.latency_seconds + self._random.uniform(0, self.latency_jitter_seconds)
+        failed = self._random.random() < self.failure_rate
+        await asyncio.sleep(delay)
+        if failed:
+            raise TTSError("Fake TTS provider failure", retryable=True)
+
+    async def synthesize(self, text: str, speed: float) -> str:
+        await self._respond()
+        return base64.b64encode(fake_mp3(text, speed)).decode()
+
+    async def list_voices(self) -> List[Dict[str, Any]]:
+        await self._respond()
+        return [{"languageCodes": ["so-SO"], "name": "so-SO-Fake-A", "ssmlGender": "NEUTRAL"}]
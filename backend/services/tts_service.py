@@ -1,126 +1,345 @@
 import os
-import base64
+import asyncio
 import hashlib
-from typing import Optional, Tuple
-from google.cloud import texttospeech
-from google.api_core import exceptions as google_exceptions
+import random
+import re
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 import logging
 
+from services.tts_providers import (
+    FakeTTSProvider,
+    GoogleTTSProvider,
+    TTSError,
+    TTSProvider,
+    estimate_speech_seconds
+)
+
 logger = logging.getLogger(__name__)
 
+# Speeds are synthesized in these steps (within the API's 0.25-4.0 range)
+SPEED_STEP = 0.05
+MIN_SPEED, MAX_SPEED = 0.25, 4.0
+TRAILING_PUNCTUATION = ".,;:!?…؟،"
+
+
+def canonical_audio_request(text: str, speed: float) -> Tuple[str, float]:
+    """Canonical (text, speed) so equivalent requests share one cache entry.
+
+    Text is NFC-normalized, whitespace-collapsed, lowercased and stripped of
+    trailing punctuation; speed is rounded to the nearest SPEED_STEP.
+    "Iska warran?" and " iska  warran" at 0.70000001 both become
+    ("iska warran", 0.7).
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = re.sub(r"\s+", " ", text).strip().lower().rstrip(TRAILING_PUNCTUATION).rstrip()
+    speed = min(max(round(round(speed / SPEED_STEP) * SPEED_STEP, 2), MIN_SPEED), MAX_SPEED)
+    return text, speed
+
+
+def audio_cache_key(text: str, speed: float) -> str:
+    """Cache key of the canonical form of an audio request"""
+    text, speed = canonical_audio_request(text, speed)
+    content = f"{text}-{speed}-so-SO"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class TTSUnavailable(TTSError):
+    """The provider is failing; calls are refused until the circuit breaker resets"""
+
+
+class CircuitBreaker:
+    """Stops calling a provider that keeps failing.
+
+    Opens after failure_threshold consecutive failed calls; while open, calls
+    fail fast. After reset_seconds a single trial call is let through (half
+    open): success closes the breaker, failure opens it again.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self._opened_at = 0.0
+        self._trial_started_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self._opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._trial_started_at = None
+        if self.state == self.HALF_OPEN:
+            # One trial at a time; a trial that never reported back expires
+            if self._trial_started_at is not None and now - self._trial_started_at < self.reset_seconds:
+                return False
+            self._trial_started_at = now
+        return self.state != self.OPEN
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"TTS circuit breaker opened after {self.consecutive_failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def retry_after(self) -> float:
+        """Seconds until a trial call will be allowed"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+
 class TTSService:
-    def __init__(self):
-        # Use API key authentication
-        api_key = os.getenv('GOOGLE_TTS_API_KEY')
-        if not api_key:
-            raise ValueError("GOOGLE_TTS_API_KEY environment variable is required")
-        
-        # Initialize client with API key
-        self.client = texttospeech.TextToSpeechClient.from_service_account_json = None
-        # For API key authentication, we'll use REST API directly
-        self.api_key = api_key
-        self.base_url = "https://texttospeech.googleapis.com/v1/text:synthesize"
-        
-        # Somali voice configuration
-        self.voice_config = {
-            "language_code": "so-SO",  # Somali (Somalia)
-            "name": "so-SO-Standard-B",  # Male voice
-            "ssml_gender": texttospeech.SsmlVoiceGender.MALE
-        }
-        
-        # Audio configuration
-        self.audio_config = {
-            "audio_encoding": texttospeech.AudioEncoding.MP3,
-            "sample_rate_hertz": 24000,
-            "effects_profile_id": ["telephony-class-application"]
-        }
+    """Somali speech synthesis on top of a pluggable TTSProvider.
+
+    Every provider call gets an overall deadline, bounded concurrency and
+    retries with jittered backoff. An attempt that has not answered after
+    hedge_after_seconds is hedged with a parallel one, and the first
+    success wins. A circuit breaker fails calls fast while the provider
+    keeps failing. The voice list is cached for voices_ttl_seconds and
+    served stale if refreshing it fails.
+    """
+
+    def __init__(
+        self,
+        provider: TTSProvider,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        deadline_seconds: float = 15.0,
+        hedge_after_seconds: float = 2.0,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        breaker: Optional[CircuitBreaker] = None,
+        voices_ttl_seconds: float = 3600.0
+    ):
+        self.provider = provider
+        self.max_attempts = max_retries + 1
+        self.deadline_seconds = deadline_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.voices_ttl_seconds = voices_ttl_seconds
+        self._voices: Optional[List[Dict[str, Any]]] = None
+        self._voices_fetched_at = 0.0
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.requests_sent = 0
+        self.retries = 0
+        self.hedges = 0
+        self.failures = 0
+        self.deadline_exceeded = 0
+        self.short_circuited = 0
+
+    @property
+    def available(self) -> bool:
+        """False while the circuit breaker is refusing calls"""
+        return self.breaker.state != CircuitBreaker.OPEN
+
+    async def aclose(self) -> None:
+        """Close provider connections"""
+        await self.provider.aclose()
 
     def generate_cache_key(self, text: str, speed: float) -> str:
-        """Generate a unique cache key for the audio request"""
-        content = f"{text}-{speed}-so-SO"
-        return hashlib.sha256(content.encode()).hexdigest()
+        """Generate a unique cache key for the audio request (after canonicalization)"""
+        return audio_cache_key(text, speed)
+
+    def _backoff_delay(self, attempt: int, error: Optional[TTSError] = None) -> float:
+        # Honor the provider's Retry-After hint, otherwise full jitter
+        if error is not None and error.retry_after is not None:
+            return min(error.retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _attempt(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests_sent += 1
+            try:
+                return await call()
+            finally:
+                self.in_flight -= 1
+
+    async def _hedged(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """First successful result among up to max_attempts attempts"""
+        attempts: Set[asyncio.Task] = set()
+        started = 0
+        error: Optional[TTSError] = None
+
+        def launch() -> None:
+            nonlocal started
+            started += 1
+            attempts.add(asyncio.ensure_future(self._attempt(call)))
+
+        launch()
+        try:
+            while attempts:
+                can_hedge = started < self.max_attempts
+                done, _ = await asyncio.wait(
+                    attempts,
+                    timeout=self.hedge_after_seconds if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Slow answer: race it with another attempt, unless that
+                    # would only queue behind calls already in flight
+                    if not self._semaphore.locked():
+                        self.hedges += 1
+                        launch()
+                    continue
+
+                for task in done:
+                    attempts.discard(task)
+                    try:
+                        return task.result()
+                    except TTSError as e:
+                        if not e.retryable:
+                            raise
+                        error = e
+
+                if not attempts and started < self.max_attempts:
+                    self.retries += 1
+                    delay = self._backoff_delay(started - 1, error)
+                    logger.warning(f"TTS request failed ({error}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+                    launch()
+
+            raise TTSError(f"TTS request failed after {started} attempts: {error}", retryable=True) from error
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    async def _call(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a provider call under the circuit breaker and the deadline"""
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise TTSUnavailable(
+                f"TTS provider unavailable, retry in {self.breaker.retry_after():.0f}s",
+                retry_after=self.breaker.retry_after()
+            )
+
+        try:
+            result = await asyncio.wait_for(self._hedged(call), self.deadline_seconds)
+        except asyncio.TimeoutError:
+            self.deadline_exceeded += 1
+            self.failures += 1
+            self.breaker.record_failure()
+            raise TTSError(f"TTS request exceeded its {self.deadline_seconds}s deadline", retryable=True)
+        except TTSError as e:
+            self.failures += 1
+            if e.retryable:
+                self.breaker.record_failure()
+            else:
+                # The provider answered; the request itself was bad
+                self.breaker.record_success()
+            raise
+        self.breaker.record_success()
+        return result
 
     async def synthesize_speech(self, text: str, speed: float = 1.0) -> Tuple[str, str]:
         """
         Synthesize Somali speech from text
         Returns: (base64_audio_content, cache_key)
         """
-        try:
-            import requests
-            import json
-            
-            cache_key = self.generate_cache_key(text, speed)
-            
-            # Prepare the request payload
-            payload = {
-                "input": {"text": text},
-                "voice": {
-                    "languageCode": "so-SO",
-                    "name": "so-SO-Standard-B",
-                    "ssmlGender": "MALE"
-                },
-                "audioConfig": {
-                    "audioEncoding": "MP3",
-                    "speakingRate": speed,
-                    "sampleRateHertz": 24000,
-                    "effectsProfileId": ["telephony-class-application"]
-                }
-            }
-            
-            # Make the API request
-            url = f"{self.base_url}?key={self.api_key}"
-            headers = {"Content-Type": "application/json"}
-            
-            response = requests.post(url, headers=headers, data=json.dumps(payload))
-            response.raise_for_status()
-            
-            result = response.json()
-            audio_content = result.get("audioContent", "")
-            
-            logger.info(f"Successfully synthesized audio for text: {text[:50]}...")
-            return audio_content, cache_key
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"HTTP error during TTS synthesis: {e}")
-            raise Exception(f"Failed to synthesize speech: {str(e)}")
-        except Exception as e:
-            logger.error(f"Unexpected error during TTS synthesis: {e}")
-            raise Exception(f"TTS service error: {str(e)}")
+        cache_key = self.generate_cache_key(text, speed)
+        text, speed = canonical_audio_request(text, speed)
+
+        audio_content = await self._call(lambda: self.provider.synthesize(text, speed))
+        if not audio_content:
+            raise TTSError("TTS provider returned no audio content")
 
-    def get_supported_voices(self) -> list:
-        """Get list of supported Somali voices"""
+        logger.info(f"Successfully synthesized audio for text: {text[:50]}...")
+        return audio_content, cache_key
+
+    async def get_supported_voices(self) -> List[Dict[str, Any]]:
+        """Get list of supported Somali voices (cached, stale on provider errors)"""
+        if self._voices is not None and time.monotonic() - self._voices_fetched_at < self.voices_ttl_seconds:
+            return self._voices
         try:
-            import requests
-            
-            url = f"https://texttospeech.googleapis.com/v1/voices?key={self.api_key}"
-            response = requests.get(url)
-            response.raise_for_status()
-            
-            data = response.json()
-            somali_voices = [
-                voice for voice in data.get("voices", [])
-                if voice.get("languageCodes", [{}])[0].startswith("so")
+            voices = await self._call(self.provider.list_voices)
+            self._voices = [
+                voice for voice in voices
+                if voice.get("languageCodes", [""])[0].startswith("so")
             ]
-            
-            return somali_voices
+            self._voices_fetched_at = time.monotonic()
+            return self._voices
         except Exception as e:
             logger.error(f"Error fetching supported voices: {e}")
-            return []
+            return self._voices or []
 
     def estimate_audio_duration(self, text: str, speed: float) -> float:
         """Estimate audio duration in seconds"""
-        # Average speaking rate: ~150 words per minute for normal speech
-        words = len(text.split())
-        base_duration = (words / 150) * 60  # Convert to seconds
-        adjusted_duration = base_duration / speed
-        return max(0.5, adjusted_duration)  # Minimum 0.5 seconds
+        return estimate_speech_seconds(text, speed)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "requests_sent": self.requests_sent,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "failures": self.failures,
+            "deadline_exceeded": self.deadline_exceeded,
+            "short_circuited": self.short_circuited
+        }
 
 # Global TTS service instance - initialized lazily
 tts_service = None
 
-def get_tts_service():
+def get_tts_service() -> TTSService:
     """Get TTS service instance with lazy initialization"""
     global tts_service
     if tts_service is None:
-        tts_service = TTSService()
-    return tts_service
\ No newline at end of file
+        provider_name = os.getenv("TTS_PROVIDER", "google")
+        if provider_name == "fake":
+            provider: TTSProvider = FakeTTSProvider(
+                latency_seconds=float(os.getenv("TTS_FAKE_LATENCY_SECONDS", "0.05")),
+                latency_jitter_seconds=float(os.getenv("TTS_FAKE_LATENCY_JITTER_SECONDS", "0")),
+                failure_rate=float(os.getenv("TTS_FAKE_FAILURE_RATE", "0")),
+                seed=int(os.getenv("TTS_FAKE_SEED", "0"))
+            )
+        else:
+            provider = GoogleTTSProvider(
+                api_key=os.getenv("GOOGLE_TTS_API_KEY"),
+                base_url=os.getenv("TTS_BASE_URL", "https://texttospeech.googleapis.com/v1"),
+                connect_timeout=float(os.getenv("TTS_CONNECT_TIMEOUT_SECONDS", "3")),
+                read_timeout=float(os.getenv("TTS_READ_TIMEOUT_SECONDS", "10")),
+                max_connections=int(os.getenv("TTS_MAX_CONNECTIONS", "20"))
+            )
+        tts_service = TTSService(
+            provider,
+            max_concurrency=int(os.getenv("TTS_MAX_CONCURRENCY", "8")),
+            max_retries=int(os.getenv("TTS_MAX_RETRIES", "3")),
+            deadline_seconds=float(os.getenv("TTS_DEADLINE_SECONDS", "15")),
+            hedge_after_seconds=float(os.getenv("TTS_HEDGE_AFTER_SECONDS", "2")),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("TTS_BREAKER_FAILURES", "5")),
+                reset_seconds=float(os.getenv("TTS_BREAKER_RESET_SECONDS", "30"))
+            ),
+            voices_ttl_seconds=float(os.getenv("TTS_VOICES_TTL_SECONDS", "3600"))
+        )
+    return tts_service
+
+def tts_available() -> bool:
+    """Whether the provider is currently accepting calls (True before first use)"""
+    return tts_service is None or tts_service.available
+
+async def close_tts_service() -> None:
+    """Release the TTS connection pool on shutdown"""
+    if tts_service is not None:
+        await tts_service.aclose()
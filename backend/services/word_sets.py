@@ -0,0 +1,152 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+import logging
+
+from data.somali_vocabulary import SOMALI_VOCABULARY
+
+logger = logging.getLogger(__name__)
+
+# Seeded words get dense ids ("word_1", "word_2", ...) in SOMALI_VOCABULARY order,
+# so the numeric suffix doubles as a catalog ordinal / bit position.
+WORD_ID_PREFIX = "word_"
+# Highest ordinal a bitset may hold; word ids come from clients, so anything
+# past the catalog goes to the overflow set instead of growing the integer
+CATALOG_SIZE = len(SOMALI_VOCABULARY)
+
+
+def word_ordinal(word_id: str) -> Optional[int]:
+    """Return the catalog ordinal for a seeded word id, or None for other ids"""
+    if not word_id.startswith(WORD_ID_PREFIX):
+        return None
+    suffix = word_id[len(WORD_ID_PREFIX):]
+    if not (suffix.isascii() and suffix.isdigit()) or suffix.startswith("0"):
+        return None
+    if len(suffix) > len(str(CATALOG_SIZE)):
+        return None
+    ordinal = int(suffix)
+    return ordinal if ordinal <= CATALOG_SIZE else None
+
+
+def word_id_for(ordinal: int) -> str:
+    """Return the seeded word id for a catalog ordinal"""
+    return f"{WORD_ID_PREFIX}{ordinal}"
+
+
+class WordSet:
+    """Set of word ids stored as a bitset over catalog ordinals.
+
+    Ids that are not part of the dense catalog are kept in a small overflow
+    set so nothing is ever dropped.
+    """
+
+    __slots__ = ("bits", "extras")
+
+    def __init__(self, bits: int = 0, extras: Optional[Iterable[str]] = None):
+        self.bits = bits
+        self.extras = set(extras or ())
+
+    @classmethod
+    def from_ids(cls, word_ids: Iterable[str]) -> "WordSet":
+        word_set = cls()
+        for word_id in word_ids:
+            word_set.add(word_id)
+        return word_set
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes], extras: Optional[Iterable[str]] = None) -> "WordSet":
+        bits = int.from_bytes(data, "little") if data else 0
+        return cls(bits, extras)
+
+    def to_bytes(self) -> bytes:
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+
+    def copy(self) -> "WordSet":
+        return WordSet(self.bits, self.extras)
+
+    def add(self, word_id: str) -> bool:
+        """Add a word id; returns True if it was not already present"""
+        if word_id in self:
+            return False
+        ordinal = word_ordinal(word_id)
+        if ordinal is None:
+            self.extras.add(word_id)
+        else:
+            self.bits |= 1 << ordinal
+        return True
+
+    def discard(self, word_id: str) -> bool:
+        """Remove a word id; returns True if it was present"""
+        if word_id not in self:
+            return False
+        ordinal = word_ordinal(word_id)
+        if ordinal is None:
+            self.extras.discard(word_id)
+        else:
+            self.bits &= ~(1 << ordinal)
+        return True
+
+    def ordinals(self) -> Iterator[int]:
+        bits = self.bits
+        while bits:
+            low_bit = bits & -bits
+            yield low_bit.bit_length() - 1
+            bits ^= low_bit
+
+    def ids(self) -> List[str]:
+        """Word ids in catalog order, followed by any non-catalog ids"""
+        return [word_id_for(ordinal) for ordinal in self.ordinals()] + sorted(self.extras)
+
+    def __contains__(self, word_id: str) -> bool:
+        ordinal = word_ordinal(word_id)
+        if ordinal is None:
+            return word_id in self.extras
+        return bool(self.bits >> ordinal & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.ids())
+
+    def __len__(self) -> int:
+        return self.bits.bit_count() + len(self.extras)
+
+    def __bool__(self) -> bool:
+        return bool(self.bits) or bool(self.extras)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, WordSet):
+            return NotImplemented
+        return self.bits == other.bits and self.extras == other.extras
+
+    def __or__(self, other: "WordSet") -> "WordSet":
+        return WordSet(self.bits | other.bits, self.extras | other.extras)
+
+    def __and__(self, other: "WordSet") -> "WordSet":
+        return WordSet(self.bits & other.bits, self.extras & other.extras)
+
+    def __sub__(self, other: "WordSet") -> "WordSet":
+        return WordSet(self.bits & ~other.bits, self.extras - other.extras)
+
+    def __repr__(self) -> str:
+        return f"WordSet({self.ids()!r})"
+
+
+def _build_catalog_sets(field: str) -> Dict[object, WordSet]:
+    """Group the seeded catalog into one WordSet per value of a vocabulary field"""
+    sets: Dict[object, WordSet] = {}
+    for index, vocab_data in enumerate(SOMALI_VOCABULARY):
+        word_set = sets.setdefault(vocab_data[field], WordSet())
+        word_set.bits |= 1 << (index + 1)
+    return sets
+
+
+# Precomputed catalog masks, built once at import
+TIER_WORD_SETS: Dict[int, WordSet] = _build_catalog_sets("tier")
+CATEGORY_WORD_SETS: Dict[str, WordSet] = _build_catalog_sets("category")
+
+
+def tier_word_set(tier_id: int) -> WordSet:
+    """All seeded words in a tier"""
+    return TIER_WORD_SETS.get(tier_id, WordSet()).copy()
+
+
+def category_word_set(category: str) -> WordSet:
+    """All seeded words in a category"""
+    return CATEGORY_WORD_SETS.get(category, WordSet()).copy()
@@ -32,17 +32,8 @@ const AudioPlayer = ({ text, phonetic }) => {
         speed: currentSpeed
       });
 
-      const audioContent = response.data.audio_content;
-      
-      // Convert base64 to blob and create URL
-      const binaryString = atob(audioContent);
-      const bytes = new Uint8Array(binaryString.length);
-      for (let i = 0; i < binaryString.length; i++) {
-        bytes[i] = binaryString.charCodeAt(i);
-      }
-      
-      const blob = new Blob([bytes], { type: 'audio/mp3' });
-      const url = URL.createObjectURL(blob);
+      // Stream the clip by URL so the browser and service worker can cache it
+      const url = `${BACKEND_URL}${response.data.audio_url}`;
       setAudioUrl(url);
       
       // Play audio
@@ -54,12 +45,10 @@ const AudioPlayer = ({ text, phonetic }) => {
       // Handle audio end
       audio.onended = () => {
         setIsPlaying(false);
-        URL.revokeObjectURL(url);
       };
       
       audio.onerror = () => {
         setIsPlaying(false);
-        URL.revokeObjectURL(url);
         console.error('Audio playback failed');
       };
       
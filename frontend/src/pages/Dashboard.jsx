@@ -62,23 +62,13 @@ const Dashboard = () => {
       setLoading(true);
       console.log('Starting to load initial data...');
       
-      // Load user progress (creates user if not exists)
-      console.log('Loading user progress...');
-      const progressRes = await axios.get(`${BACKEND_URL}/api/progress/users/${userId}/progress`);
-      console.log('User progress loaded:', progressRes.data);
-      setUserProgress(progressRes.data);
-      
-      // Load tiers
-      console.log('Loading tiers...');
-      const tiersRes = await axios.get(`${BACKEND_URL}/api/tiers/tiers`);
-      console.log('Tiers loaded:', tiersRes.data);
-      setTiers(tiersRes.data.tiers);
-      
-      // Load categories
-      console.log('Loading categories...');
-      const categoriesRes = await axios.get(`${BACKEND_URL}/api/somali/categories`);
-      console.log('Categories loaded:', categoriesRes.data);
-      setCategories(categoriesRes.data.categories);
+      // Load user progress (creates user if not exists), tiers and categories in one request
+      console.log('Loading dashboard data...');
+      const bootstrapRes = await axios.get(`${BACKEND_URL}/api/dashboard/users/${userId}/bootstrap`);
+      console.log('Dashboard data loaded:', bootstrapRes.data);
+      setUserProgress(bootstrapRes.data.progress);
+      setTiers(bootstrapRes.data.tiers);
+      setCategories(bootstrapRes.data.categories);
       
       // Load words for initial tier
       console.log('Loading words for tier 1...');
@@ -127,12 +117,10 @@ const Dashboard = () => {
 
   const handleFavorite = async (wordId) => {
     try {
-      await axios.put(`${BACKEND_URL}/api/progress/users/${userId}/progress`, {
+      // The update returns the new progress, so no refresh is needed
+      const progressRes = await axios.put(`${BACKEND_URL}/api/progress/users/${userId}/progress`, {
         favorite_toggled: wordId
       });
-      
-      // Refresh user progress
-      const progressRes = await axios.get(`${BACKEND_URL}/api/progress/users/${userId}/progress`);
       setUserProgress(progressRes.data);
       
     } catch (error) {
@@ -142,13 +130,11 @@ const Dashboard = () => {
 
   const handleWordComplete = async (wordId, points) => {
     try {
-      await axios.put(`${BACKEND_URL}/api/progress/users/${userId}/progress`, {
+      // The update returns the new progress, so no refresh is needed
+      const progressRes = await axios.put(`${BACKEND_URL}/api/progress/users/${userId}/progress`, {
         word_completed: wordId,
         points_earned: points
       });
-      
-      // Refresh user progress
-      const progressRes = await axios.get(`${BACKEND_URL}/api/progress/users/${userId}/progress`);
       setUserProgress(progressRes.data);
       
     } catch (error) {
@@ -170,11 +156,12 @@ const Dashboard = () => {
 
   const handleTierSelect = async (tierId) => {
     try {
-      // Check if tier can be unlocked
-      const unlockCheck = await axios.get(`${BACKEND_URL}/api/tiers/tiers/check-unlock/${tierId}?user_id=${userId}`);
+      // Check if tier can be unlocked (unlock state comes with the progress)
+      const unlockCheck = (userProgress?.tier_status || []).find(status => status.tier_id === tierId)
+        || (await axios.get(`${BACKEND_URL}/api/tiers/tiers/check-unlock/${tierId}?user_id=${userId}`)).data;
       
-      if (!unlockCheck.data.can_unlock && !unlockCheck.data.already_unlocked) {
-        const missingReqs = unlockCheck.data.missing_requirements;
+      if (!unlockCheck.can_unlock && !unlockCheck.already_unlocked) {
+        const missingReqs = unlockCheck.missing_requirements;
         const culturalReq = missingReqs.find(req => req.type === 'cultural_acknowledgment');
         
         if (culturalReq) {
@@ -197,11 +184,8 @@ const Dashboard = () => {
 
   const handleCulturalAcceptance = async () => {
     try {
-      await axios.post(`${BACKEND_URL}/api/tiers/tiers/${pendingTier}/cultural-acknowledge?user_id=${userId}`);
-      
-      // Refresh user progress
-      const progressRes = await axios.get(`${BACKEND_URL}/api/progress/users/${userId}/progress`);
-      setUserProgress(progressRes.data);
+      const ackRes = await axios.post(`${BACKEND_URL}/api/tiers/tiers/${pendingTier}/cultural-acknowledge?user_id=${userId}`);
+      setUserProgress(ackRes.data.progress);
       
       setShowCulturalPopup(false);
       setSelectedTier(pendingTier);
@@ -0,0 +1,49 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# The backend is run from its own directory (imports are "services.x", "models.x")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+
+# Lazily configured module globals that must not leak between tests
+SERVICE_SINGLETONS = [
+    ("services.progress_cache", "progress_cache"),
+    ("services.progress_buffer", "progress_buffer"),
+    ("services.catalog_cache", "catalog_cache"),
+    ("services.leaderboard", "leaderboard"),
+    ("services.tts_service", "tts_service"),
+    ("services.audio_cache", "audio_memory_cache"),
+    ("services.audio_cache", "audio_flight"),
+    ("services.audio_cache", "audio_cache_accounting"),
+    ("services.audio_prewarmer", "audio_prewarmer"),
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_services(monkeypatch):
+    """Each test gets new service singletons and the local fake TTS provider"""
+    monkeypatch.setenv("TTS_PROVIDER", "fake")
+    monkeypatch.setenv("TTS_FAKE_LATENCY_SECONDS", "0")
+    for module, name in SERVICE_SINGLETONS:
+        monkeypatch.setattr(importlib.import_module(module), name, None)
+
+
+@pytest.fixture
+def db():
+    """In-memory stand-in for the Motor database"""
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()["somali_learning_test"]
+
+
+@pytest.fixture
+def client(db):
+    """API client wired to the in-memory database"""
+    from fastapi.testclient import TestClient
+    import server
+    from database import get_database
+
+    server.app.dependency_overrides[get_database] = lambda: db
+    yield TestClient(server.app)
+    server.app.dependency_overrides.clear()
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import routers.audio
+from models.somali_models import AudioBatchRequest
+from routers.audio import synthesize_audio_batch
+from services.tts_service import audio_cache_key
+
+BATCH_URL = "/api/tts/audio/synthesize/batch"
+ITEMS = [{"text": "haa"}, {"text": "maya"}, {"text": "nabad"}]
+
+
+def cache_clip(db, text):
+    asyncio.run(db.audio_cache.insert_one({
+        "cache_key": audio_cache_key(text, 1.0), "text": text, "speed": 1.0, "audio": b"mp3", "size_bytes": 3
+    }))
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batch_reports_hits_and_syntheses_in_order(client, db):
+    cache_clip(db, "maya")
+    body = client.post(BATCH_URL, json={"items": ITEMS}).json()
+    assert [item["index"] for item in body["results"]] == [0, 1, 2]
+    assert (body["cache_hits"], body["synthesized"]) == (1, 2)
+
+
+def test_stream_sends_cached_clips_first(client, db):
+    cache_clip(db, "maya")
+    lines = ndjson(client.post(BATCH_URL, params={"stream": "true"}, json={"items": ITEMS}))
+    assert lines[0]["index"] == 1
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert all("audio_url" in line for line in lines)
+
+
+def test_stream_failure_ends_with_an_error_line(client, db, monkeypatch):
+    cache_clip(db, "maya")
+    real_audio_response = routers.audio.audio_response
+
+    def failing_audio_response(http_request, cache_key, document, *args):
+        if cache_key != audio_cache_key("maya", 1.0):
+            raise RuntimeError("boom")
+        return real_audio_response(http_request, cache_key, document, *args)
+
+    monkeypatch.setattr(routers.audio, "audio_response", failing_audio_response)
+    response = client.post(BATCH_URL, params={"stream": "true"}, json={"items": ITEMS})
+    assert response.status_code == 200
+    lines = ndjson(response)
+    assert lines[0]["index"] == 1
+    assert lines[-1] == {"error": "Failed to generate audio: boom"}
+
+
+def test_closing_the_stream_cancels_pending_syntheses(db, monkeypatch):
+    import server
+
+    cache_clip(db, "maya")
+    started, cancelled = [], []
+
+    async def never_finishes(db, tts_service, text, speed, cache_key):
+        started.append(text)
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(text)
+            raise
+
+    monkeypatch.setattr(routers.audio, "synthesize_or_fallback", never_finishes)
+
+    async def scenario():
+        response = await synthesize_audio_batch(
+            AudioBatchRequest(items=ITEMS), SimpleNamespace(app=server.app), stream=True, db=db
+        )
+        # Nothing is synthesized before the body is read
+        await asyncio.sleep(0)
+        assert started == []
+        body = response.body_iterator
+        first = await body.__anext__()
+        await asyncio.sleep(0)
+        await body.aclose()
+        await asyncio.sleep(0)
+        return json.loads(first)
+
+    assert asyncio.run(scenario())["index"] == 1
+    assert sorted(started) == ["haa", "nabad"]
+    assert sorted(cancelled) == ["haa", "nabad"]
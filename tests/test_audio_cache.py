@@ -0,0 +1,264 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.audio_cache import (
+    AudioCacheAccounting,
+    AudioMemoryCache,
+    SingleFlight,
+    fold_audio_cache_duplicates,
+    get_audio_memory_cache,
+)
+from services.tts_service import audio_cache_key, canonical_audio_request
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def synthesize():
+            calls.append(1)
+            await release.wait()
+            return b"clip"
+
+        waiters = [asyncio.ensure_future(flight.do("key", synthesize)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(scenario())
+    assert calls == [1]
+    assert results == [b"clip"] * 5
+    assert flight.get_stats()["executions"] == 1
+    assert flight.get_stats()["coalesced"] == 4
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def scenario():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def synthesize():
+            await release.wait()
+            return b"clip"
+
+        leader = asyncio.ensure_future(flight.do("key", synthesize))
+        follower = asyncio.ensure_future(flight.do("key", synthesize))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return leader, await follower
+
+    leader, result = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result == b"clip"
+
+
+def test_failure_reaches_every_waiter_and_is_not_cached():
+    async def scenario():
+        flight = SingleFlight()
+        attempts = []
+
+        async def synthesize():
+            attempts.append(1)
+            await asyncio.sleep(0)
+            if len(attempts) == 1:
+                raise RuntimeError("provider down")
+            return b"clip"
+
+        results = await asyncio.gather(
+            flight.do("key", synthesize), flight.do("key", synthesize), return_exceptions=True
+        )
+        return results, await flight.do("key", synthesize)
+
+    results, retried = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == b"clip"
+
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def synthesize():
+            await asyncio.sleep(0)
+            return object()
+
+        first, second = await asyncio.gather(flight.do("a", synthesize), flight.do("b", synthesize))
+        return flight, first is second
+
+    flight, same = asyncio.run(scenario())
+    assert not same
+    assert flight.executions == 2
+
+
+def test_equivalent_requests_share_a_canonical_form():
+    assert canonical_audio_request("Iska warran?", 0.7) == ("iska warran", 0.7)
+    assert canonical_audio_request(" iska  warran", 0.70000001) == ("iska warran", 0.7)
+    # Composed and decomposed spellings of the same letter
+    assert canonical_audio_request("cafe\u0301", 1.0) == canonical_audio_request("caf\u00e9", 1.0)
+    assert canonical_audio_request("haa", 0.01) == ("haa", 0.25)
+    assert canonical_audio_request("haa", 9.0) == ("haa", 4.0)
+    assert audio_cache_key("Iska warran?", 0.7) == audio_cache_key("iska warran", 0.70000001)
+
+
+def test_fold_merges_entries_that_canonicalize_together(db):
+    canonical_key = audio_cache_key("iska warran", 0.7)
+    asyncio.run(db.audio_cache.insert_many([
+        {"cache_key": "old1", "text": "Iska warran?", "speed": 0.7, "audio": b"a", "access_count": 5},
+        {"cache_key": "old2", "text": " iska  warran", "speed": 0.70000001, "audio": b"b", "access_count": 2},
+        {"cache_key": "old3", "text": "Nabad", "speed": 1.0, "audio": b"c", "access_count": 1},
+    ]))
+
+    dry_run = asyncio.run(fold_audio_cache_duplicates(db, dry_run=True))
+    assert dry_run == {"scanned": 3, "rekeyed": 2, "folded": 1, "dry_run": True}
+    assert asyncio.run(db.audio_cache.count_documents({})) == 3
+
+    result = asyncio.run(fold_audio_cache_duplicates(db))
+    assert result == {"scanned": 3, "rekeyed": 2, "folded": 1, "dry_run": False}
+    kept = asyncio.run(db.audio_cache.find_one({"cache_key": canonical_key}))
+    # The most played entry is kept and gets the others' plays
+    assert kept["audio"] == b"a"
+    assert kept["access_count"] == 7
+    assert (kept["text"], kept["speed"]) == ("iska warran", 0.7)
+    assert asyncio.run(db.audio_cache.count_documents({})) == 2
+    assert asyncio.run(db.audio_cache.find_one({"cache_key": audio_cache_key("nabad", 1.0)})) is not None
+
+    # Already canonical: nothing left to do
+    assert asyncio.run(fold_audio_cache_duplicates(db))["rekeyed"] == 0
+
+
+def clip(size, **fields):
+    return {"audio": bytes(size), "duration_seconds": 1.0, **fields}
+
+
+def test_memory_cache_evicts_least_recently_used_within_its_bytes():
+    memory = AudioMemoryCache(max_bytes=100, max_entry_bytes=50)
+    memory.put("a", clip(40))
+    memory.put("b", clip(40))
+    assert memory.get("a") is not None
+    memory.put("c", clip(40))
+    # "b" was least recently used; "a" was just read
+    assert memory.get("b") is None
+    assert memory.get("a") is not None and memory.get("c") is not None
+    assert (memory.size_bytes, memory.evictions) == (80, 1)
+
+    memory.put("d", clip(30))
+    memory.put("e", clip(30))
+    assert memory.size_bytes <= 100
+    assert memory.get("e") is not None
+
+
+def test_memory_cache_skips_oversized_clips_and_counts_replacements_once():
+    memory = AudioMemoryCache(max_bytes=100, max_entry_bytes=50)
+    assert memory.put("long", clip(60))["audio"] == bytes(60)
+    assert memory.get("long") is None
+    memory.put("a", clip(20))
+    memory.put("a", clip(20))
+    assert memory.size_bytes == 20
+    assert AudioMemoryCache(max_bytes=0).put("a", clip(1)) and AudioMemoryCache(max_bytes=0).size_bytes == 0
+
+
+def seed_clips(db, *documents):
+    asyncio.run(db.audio_cache.insert_many([
+        {"text": document["cache_key"], "speed": 1.0, "audio": b"", "access_count": 0, **document}
+        for document in documents
+    ]))
+
+
+class Database:
+    """db whose audio_cache records bulk writes and whose other collections can be made to fail"""
+
+    def __init__(self, db, fail_audio_cache=False, fail_stats=False):
+        self._db = db
+        self.fail_audio_cache = fail_audio_cache
+        self.fail_stats = fail_stats
+        self.bulk_writes = []
+
+    @property
+    def audio_cache(self):
+        database = self
+
+        class AudioCache:
+            async def bulk_write(self, operations, **options):
+                if database.fail_audio_cache:
+                    raise ConnectionError("mongo down")
+                database.bulk_writes.append(len(operations))
+                return await database._db.audio_cache.bulk_write(operations, **options)
+
+        return AudioCache()
+
+    def __getitem__(self, name):
+        if self.fail_stats:
+            raise ConnectionError("mongo down")
+        return self._db[name]
+
+
+def test_accounting_merges_hits_into_one_inc_per_clip(db):
+    seed_clips(db, {"cache_key": "a", "access_count": 5}, {"cache_key": "b"})
+    accounting = AudioCacheAccounting()
+    for cache_key in ("a", "a", "b", "a"):
+        accounting.record_hit(cache_key)
+    accounting.record_miss()
+
+    database = Database(db)
+    asyncio.run(accounting.flush(database))
+    assert database.bulk_writes == [2]
+    counts = {
+        document["cache_key"]: document["access_count"]
+        for document in asyncio.run(db.audio_cache.find({}).to_list(length=None))
+    }
+    assert counts == {"a": 8, "b": 1}
+    stats = asyncio.run(accounting.get_stats(db))
+    assert (stats["hits"], stats["misses"]) == (4, 1)
+
+    # Nothing pending: no writes
+    asyncio.run(accounting.flush(database))
+    assert database.bulk_writes == [2]
+
+
+def test_failed_accounting_flush_keeps_only_unwritten_counts(db):
+    seed_clips(db, {"cache_key": "a"})
+    accounting = AudioCacheAccounting()
+    accounting.record_hit("a")
+    with pytest.raises(ConnectionError):
+        asyncio.run(accounting.flush(Database(db, fail_audio_cache=True)))
+
+    # The access counts land, then the stats write fails
+    accounting.record_hit("a")
+    with pytest.raises(ConnectionError):
+        asyncio.run(accounting.flush(Database(db, fail_stats=True)))
+    assert asyncio.run(db.audio_cache.find_one({"cache_key": "a"}))["access_count"] == 2
+
+    asyncio.run(accounting.flush(db))
+    assert asyncio.run(db.audio_cache.find_one({"cache_key": "a"}))["access_count"] == 2
+    assert asyncio.run(accounting.get_stats(db))["hits"] == 2
+
+
+def test_eviction_removes_the_least_played_and_least_recent_clips(db):
+    now = datetime.utcnow()
+    seed_clips(
+        db,
+        {"cache_key": "hot", "size_bytes": 40, "access_count": 50, "last_accessed": now},
+        {"cache_key": "recent", "size_bytes": 40, "access_count": 1, "last_accessed": now},
+        {"cache_key": "stale", "size_bytes": 40, "access_count": 1, "last_accessed": now - timedelta(days=60)},
+        {"cache_key": "old_favorite", "size_bytes": 40, "access_count": 30,
+         "last_accessed": now - timedelta(days=10)},
+    )
+    memory = get_audio_memory_cache()
+    memory.put("stale", clip(4))
+
+    accounting = AudioCacheAccounting(max_bytes=100)
+    assert asyncio.run(accounting.evict(db)) == 2
+    kept = {document["cache_key"] for document in asyncio.run(db.audio_cache.find({}).to_list(length=None))}
+    assert kept == {"hot", "old_favorite"}
+    assert memory.get("stale") is None
+
+    # Within budget now
+    assert asyncio.run(accounting.evict(db)) == 0
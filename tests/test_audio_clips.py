@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from routers.audio import parse_byte_range
+
+CLIP = bytes(range(100))
+
+
+def test_parse_byte_range():
+    assert parse_byte_range("bytes=0-9", 100) == (0, 9)
+    assert parse_byte_range("bytes=90-", 100) == (90, 99)
+    assert parse_byte_range("bytes=50-500", 100) == (50, 99)
+    # Suffix ranges count from the end, and may ask for more than there is
+    assert parse_byte_range("bytes=-10", 100) == (90, 99)
+    assert parse_byte_range("bytes=-500", 100) == (0, 99)
+
+
+def test_parse_byte_range_ignores_what_it_does_not_serve():
+    for header in ("bytes=0-9,20-29", "items=0-9", "bytes=9-0", "bytes=-", "bytes=a-b"):
+        assert parse_byte_range(header, 100) is None
+
+
+def test_parse_byte_range_unsatisfiable():
+    for header in ("bytes=100-", "bytes=100-200", "bytes=-0"):
+        with pytest.raises(ValueError):
+            parse_byte_range(header, 100)
+
+
+@pytest.fixture
+def clip_url(db):
+    asyncio.run(db.audio_cache.insert_one({
+        "cache_key": "clip1", "text": "salaan", "speed": 1.0, "audio": CLIP, "size_bytes": len(CLIP)
+    }))
+    return "/api/tts/audio/clips/clip1"
+
+
+def test_suffix_range_is_partial_content(client, clip_url):
+    response = client.get(clip_url, headers={"Range": "bytes=-10"})
+    assert response.status_code == 206
+    assert response.headers["Content-Range"] == "bytes 90-99/100"
+    assert response.content == CLIP[90:]
+
+
+def test_unsatisfiable_range_is_416(client, clip_url):
+    response = client.get(clip_url, headers={"Range": "bytes=100-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */100"
+
+
+def test_multiple_ranges_get_the_whole_clip(client, clip_url):
+    response = client.get(clip_url, headers={"Range": "bytes=0-9,20-29"})
+    assert response.status_code == 200
+    assert response.content == CLIP
+
+
+def test_matching_etag_is_not_modified(client, clip_url):
+    etag = client.get(clip_url).headers["ETag"]
+    assert client.get(clip_url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_unknown_clip_is_404(client, clip_url):
+    assert client.get("/api/tts/audio/clips/missing").status_code == 404
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from services.audio_pregeneration import (
+    PREGENERATION_JOB_ID,
+    PregenerationRunning,
+    load_pregeneration_status,
+    run_audio_pregeneration,
+    start_audio_pregeneration,
+)
+from services.job_checkpoints import CHECKPOINTS_COLLECTION
+from services.progress_store import mongo_now
+
+WORDS = [{"id": f"w{n}", "somali": f"eray {n}", "tier": 1} for n in range(1, 4)]
+
+
+@pytest.fixture
+def words(db):
+    asyncio.run(db.somali_words.insert_many([dict(word) for word in WORDS]))
+    return db
+
+
+def hold_lease(db, running_until):
+    asyncio.run(db[CHECKPOINTS_COLLECTION].insert_one({
+        "_id": PREGENERATION_JOB_ID, "lease_owner": "other-worker", "running_until": running_until
+    }))
+
+
+def test_run_holds_and_releases_the_lease(words):
+    result = asyncio.run(run_audio_pregeneration(words, tiers=[1], speeds=[1.0], batch_size=2))
+    assert (result["generated"], result["failed"]) == (3, 0)
+    status = asyncio.run(load_pregeneration_status(words))
+    assert status["running_until"] is None
+    assert not status["running"]
+    # Released, so the next run may start
+    assert asyncio.run(run_audio_pregeneration(words, tiers=[1], speeds=[1.0]))["already_cached"] == 3
+
+
+def test_lease_held_by_another_worker_refuses_to_run(words):
+    hold_lease(words, mongo_now() + timedelta(minutes=5))
+    with pytest.raises(PregenerationRunning):
+        asyncio.run(run_audio_pregeneration(words, tiers=[1], speeds=[1.0]))
+    assert not asyncio.run(start_audio_pregeneration(words, tiers=[1], speeds=[1.0]))
+    assert asyncio.run(words.audio_cache.count_documents({})) == 0
+
+
+def test_expired_lease_is_taken_over(words):
+    hold_lease(words, mongo_now() - timedelta(minutes=5))
+    result = asyncio.run(run_audio_pregeneration(words, tiers=[1], speeds=[1.0]))
+    assert result["generated"] == 3
+
+
+def test_pregenerate_endpoint_reports_a_run_in_another_worker(client, words):
+    hold_lease(words, mongo_now() + timedelta(minutes=5))
+    assert client.post("/api/tts/audio/pregenerate").status_code == 409
+    assert client.get("/api/tts/audio/pregenerate").json()["running"]
+
+
+class PartlyFailingAudioCache:
+    """audio_cache whose insert_many rejects the first document as a duplicate and the second otherwise"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def insert_many(self, documents, ordered=True):
+        await self._collection.insert_many(documents[2:], ordered=ordered)
+        raise BulkWriteError({
+            "nInserted": len(documents) - 2,
+            "writeErrors": [
+                {"index": 0, "code": 11000, "errmsg": "duplicate key"},
+                {"index": 1, "code": 121, "errmsg": "Document failed validation"},
+            ]
+        })
+
+
+class Database:
+    def __init__(self, db):
+        self._db = db
+        self.audio_cache = PartlyFailingAudioCache(db.audio_cache)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        return self._db[name]
+
+
+def test_only_duplicate_inserts_are_ignored(words):
+    result = asyncio.run(run_audio_pregeneration(Database(words), tiers=[1], speeds=[1.0]))
+    assert (result["generated"], result["failed"]) == (1, 1)
+    assert result["failed_sample"][0]["error"] == "Document failed validation"
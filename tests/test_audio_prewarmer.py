@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from services.audio_prewarmer import AudioPrewarmer
+from services.tts_service import audio_cache_key, get_tts_service
+
+TIER_1 = ["haa", "maya", "nabad", "mahadsanid", "subax wanaagsan"]
+
+
+@pytest.fixture
+def words(db):
+    asyncio.run(db.somali_words.insert_many(
+        [{"id": f"w{n}", "somali": text, "tier": 1} for n, text in enumerate(TIER_1)]
+        + [{"id": "w9", "somali": "jacayl", "tier": 4}]
+    ))
+    return db
+
+
+def cached_texts(db):
+    return {document["text"] for document in asyncio.run(db.audio_cache.find({}).to_list(length=None))}
+
+
+def test_budget_caps_syntheses_per_window(words):
+    prewarmer = AudioPrewarmer(calls_per_hour=3)
+    prewarmer.record_tier_unlocks([1])
+    assert asyncio.run(prewarmer.run_once(words)) == 3
+    # Budget spent: the tier stays queued for later
+    assert asyncio.run(prewarmer.run_once(words)) == 0
+    assert prewarmer.get_stats()["queued_tiers"] == [1]
+    assert get_tts_service().provider.calls == 3
+
+    # An hour later the bucket is full again
+    prewarmer._refilled_at -= 3600
+    assert asyncio.run(prewarmer.run_once(words)) == 2
+    assert cached_texts(words) == set(TIER_1)
+    assert prewarmer.get_stats()["queued_tiers"] == []
+
+
+def test_nothing_is_synthesized_while_live_requests_are_in_flight(words):
+    prewarmer = AudioPrewarmer(calls_per_hour=100)
+    prewarmer.record_tier_unlocks([1])
+    tts_service = get_tts_service()
+
+    async def scenario():
+        tts_service.provider.latency_seconds = 0.05
+        live = asyncio.ensure_future(tts_service.synthesize_speech("jacayl"))
+        await asyncio.sleep(0.01)
+        busy = await prewarmer.run_once(words)
+        await live
+        tts_service.provider.latency_seconds = 0
+        return busy, await prewarmer.run_once(words)
+
+    assert asyncio.run(scenario()) == (0, len(TIER_1))
+    assert prewarmer.skipped_busy == 1
+
+
+def test_cached_clips_are_skipped_without_spending_budget(words):
+    asyncio.run(words.audio_cache.insert_many([
+        {"cache_key": audio_cache_key(text, 1.0), "text": text, "speed": 1.0, "audio": b"mp3"}
+        for text in TIER_1[:2]
+    ]))
+    prewarmer = AudioPrewarmer(calls_per_hour=3)
+    prewarmer.record_tier_unlocks([1])
+    assert asyncio.run(prewarmer.run_once(words)) == 3
+    assert get_tts_service().provider.calls == 3
+    assert cached_texts(words) == set(TIER_1)
+    assert prewarmer.get_stats()["queued_tiers"] == []
+
+
+def test_misses_are_warmed_at_the_popular_speeds(words):
+    prewarmer = AudioPrewarmer(calls_per_hour=100)
+    for _ in range(17):
+        prewarmer.record_request("haa", 1.0, hit=True)
+    prewarmer.record_request("maya", 0.7, hit=False)
+    prewarmer.record_request("maya", 0.7, hit=False)
+    # Under a tenth of requests: not worth warming
+    prewarmer.record_request("nabad", 0.4, hit=True)
+    assert prewarmer.popular_speeds() == [1.0, 0.7]
+    assert asyncio.run(prewarmer.run_once(words)) == 2
+    speeds = {document["speed"] for document in asyncio.run(words.audio_cache.find({}).to_list(length=None))}
+    assert speeds == {1.0, 0.7}
+
+
+def test_disabled_prewarmer_queues_nothing(words):
+    prewarmer = AudioPrewarmer(calls_per_hour=0)
+    prewarmer.record_tier_unlocks([1])
+    prewarmer.record_request("haa", 1.0, hit=False)
+    assert asyncio.run(prewarmer.run_once(words)) == 0
+    assert get_tts_service().provider.calls == 0
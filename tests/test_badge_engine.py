@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from models.somali_models import UserProgress, UserProgressUpdate
+from services.badge_engine import (
+    ACTIVITY,
+    FAVORITE_ADDED,
+    LEVEL_CHANGED,
+    QUIZ_COMPLETED,
+    RULES_BY_EVENT,
+    TIER_UNLOCKED,
+    WORD_COMPLETED,
+    backfill_badges,
+    evaluate_all_badges,
+    evaluate_badges,
+)
+from services.progress_rules import apply_progress_update
+from services.progress_store import progress_to_document
+from services.word_sets import CATALOG_SIZE, WordSet, category_word_set, word_id_for
+
+
+def qualifies_for_everything():
+    progress = UserProgress(
+        user_id="u", level=5, unlocked_tiers=[1, 2], quiz_scores=[{"score": 1}] * 10, longest_streak=7
+    )
+    return progress, category_word_set("compliments").copy(), WordSet.from_ids(["word_1"])
+
+
+@pytest.mark.parametrize("event, badges", [
+    (ACTIVITY, {"newcomer", "week_warrior"}),
+    (WORD_COMPLETED, {"compliment_king"}),
+    (FAVORITE_ADDED, {"first_favorite"}),
+    (QUIZ_COMPLETED, {"first_quiz", "quiz_master"}),
+    (LEVEL_CHANGED, {"level_2", "level_3", "level_5"}),
+    (TIER_UNLOCKED, {"tier_master"}),
+])
+def test_each_event_awards_exactly_its_rules(event, badges):
+    progress, completed, favorites = qualifies_for_everything()
+    assert {rule.id for rule in RULES_BY_EVENT[event]} == badges
+    assert set(evaluate_badges(progress, completed, favorites, [event])) == badges
+    assert set(progress.badges_earned) == badges
+
+
+def test_levels_are_awarded_as_they_are_reached():
+    progress = UserProgress(user_id="u", level=3)
+    assert evaluate_badges(progress, WordSet(), WordSet(), [LEVEL_CHANGED]) == ["level_2", "level_3"]
+    progress.level = 5
+    assert evaluate_badges(progress, WordSet(), WordSet(), [LEVEL_CHANGED]) == ["level_5"]
+
+
+def learner(user_id: str, words: int) -> tuple:
+    """Progress built one update at a time, as the write paths do"""
+    progress, completed, favorites = UserProgress(user_id=user_id), WordSet(), WordSet()
+    updates = [UserProgressUpdate(word_completed=word_id_for(n), points_earned=10) for n in range(1, words + 1)]
+    updates += [UserProgressUpdate(favorite_toggled="word_1")] * 3
+    updates += [UserProgressUpdate(quiz_completed={"score": 8})] * 2
+    # Repeats change nothing
+    updates += [UserProgressUpdate(word_completed="word_1", points_earned=10)]
+    for update in updates:
+        apply_progress_update(progress, completed, favorites, update)
+    return progress, completed, favorites
+
+
+def test_badges_are_never_awarded_twice():
+    progress, completed, favorites = learner("u", CATALOG_SIZE)
+    assert len(progress.badges_earned) == len(set(progress.badges_earned))
+    assert {"newcomer", "first_favorite", "first_quiz", "level_2", "level_3"} <= set(progress.badges_earned)
+    assert evaluate_all_badges(progress, completed, favorites) == []
+    for event in RULES_BY_EVENT:
+        assert evaluate_badges(progress, completed, favorites, [event]) == []
+
+
+def test_backfill_awards_what_incremental_evaluation_did(db):
+    learners = [learner("stripped", CATALOG_SIZE), learner("current", 12)]
+    expected = {progress.user_id: sorted(progress.badges_earned) for progress, _, _ in learners}
+    documents = [progress_to_document(*learned) for learned in learners]
+    documents[0]["badges_earned"] = []
+    asyncio.run(db.user_progress.insert_many(documents))
+
+    result = asyncio.run(backfill_badges(db, batch_size=1))
+    assert (result["users_scanned"], result["users_updated"]) == (2, 1)
+    assert sum(result["badges_awarded"].values()) == len(expected["stripped"])
+    for user_id, badges in expected.items():
+        document = asyncio.run(db.user_progress.find_one({"user_id": user_id}))
+        assert sorted(document["badges_earned"]) == badges
+
+    # A second run has nothing left to award
+    assert asyncio.run(backfill_badges(db))["users_updated"] == 0
+
+
+def test_backfill_of_selected_badges(db):
+    progress, completed, favorites = learner("u", CATALOG_SIZE)
+    document = progress_to_document(progress, completed, favorites)
+    document["badges_earned"] = []
+    asyncio.run(db.user_progress.insert_one(document))
+    assert asyncio.run(backfill_badges(db, ["newcomer"]))["badges_awarded"] == {"newcomer": 1}
+    stored = asyncio.run(db.user_progress.find_one({"user_id": "u"}))
+    assert stored["badges_earned"] == ["newcomer"]
@@ -0,0 +1,67 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+import services.catalog_cache
+from data.somali_vocabulary import SOMALI_VOCABULARY
+from services.catalog_cache import CATALOG_META_COLLECTION, CATALOG_META_ID, get_catalog_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(services.catalog_cache.time, "monotonic", clock)
+    return clock
+
+
+def tier_counts(client):
+    return {tier["id"]: tier["actual_word_count"] for tier in client.get("/api/tiers/tiers").json()["tiers"]}
+
+
+def add_word_directly(db, tier):
+    # A write that skips bump_catalog_version, e.g. from another worker
+    asyncio.run(db.somali_words.insert_one({"id": f"extra_{tier}", "tier": tier, "category": "basics"}))
+
+
+def test_tier_counts_are_loaded_once_per_catalog_version(client, db, clock):
+    assert all(count == 0 for count in tier_counts(client).values())
+    add_word_directly(db, 1)
+    assert tier_counts(client)[1] == 0
+
+    cache = get_catalog_cache()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_seeding_words_refreshes_tier_counts(client, clock):
+    tier_counts(client)
+    assert client.post("/api/somali/words/seed").json()["seeded"]
+
+    expected = Counter(word["tier"] for word in SOMALI_VOCABULARY)
+    counts = tier_counts(client)
+    assert {tier: count for tier, count in counts.items() if count} == dict(expected)
+    assert get_catalog_cache().get_stats()["version"] == 1
+    assert get_catalog_cache().misses == 2
+
+
+def test_another_workers_bump_is_seen_after_the_version_ttl(client, db, clock, monkeypatch):
+    monkeypatch.setenv("CATALOG_VERSION_TTL_SECONDS", "30")
+    tier_counts(client)
+    add_word_directly(db, 2)
+    asyncio.run(db[CATALOG_META_COLLECTION].update_one(
+        {"_id": CATALOG_META_ID}, {"$inc": {"version": 1}}, upsert=True
+    ))
+
+    clock.now += 30
+    assert tier_counts(client)[2] == 0
+    clock.now += 1
+    assert tier_counts(client)[2] == 1
+
@@ -0,0 +1,75 @@
+import asyncio
+
+import routers.dashboard
+from data.somali_vocabulary import SOMALI_VOCABULARY, TIER_DEFINITIONS
+from models.somali_models import UserProgress
+from services.progress_store import progress_to_document
+from services.word_sets import WordSet
+
+
+def bootstrap_url(user_id="u1"):
+    return f"/api/dashboard/users/{user_id}/bootstrap"
+
+
+def test_bootstrap_returns_progress_tiers_and_categories(client, db):
+    assert client.post("/api/somali/words/seed").json()["seeded"]
+    asyncio.run(db.user_progress.insert_one(progress_to_document(
+        UserProgress(user_id="u1", total_points=120, level=2, unlocked_tiers=[1, 2]), WordSet(), WordSet()
+    )))
+
+    response = client.get(bootstrap_url())
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert set(body) == {"user_id", "progress", "tiers", "total_tiers", "categories"}
+    assert body["user_id"] == "u1"
+
+    progress = body["progress"]
+    assert (progress["total_points"], progress["unlocked_tiers"]) == (120, [1, 2])
+    assert len(progress["tier_status"]) == len(TIER_DEFINITIONS)
+
+    # The same payloads the individual endpoints serve
+    assert body["tiers"] == client.get("/api/tiers/tiers").json()["tiers"]
+    assert body["total_tiers"] == len(TIER_DEFINITIONS)
+    assert sum(tier["actual_word_count"] for tier in body["tiers"]) == len(SOMALI_VOCABULARY)
+    assert body["categories"] == client.get("/api/somali/categories").json()["categories"]
+    assert sum(category["word_count"] for category in body["categories"]) == len(SOMALI_VOCABULARY)
+
+
+def test_bootstrap_creates_progress_on_first_access(client, db):
+    # Like GET /users/{id}/progress, a user seen for the first time starts
+    # fresh rather than getting a 404 the dashboard would have to retry
+    body = client.get(bootstrap_url("newcomer")).json()
+    assert body["progress"]["user_id"] == "newcomer"
+    assert body["progress"]["unlocked_tiers"] == [1]
+    assert body["categories"] == []
+    assert all(tier["actual_word_count"] == 0 for tier in body["tiers"])
+    assert asyncio.run(db.user_progress.count_documents({"user_id": "newcomer"})) == 1
+
+
+def test_bootstrap_reads_run_concurrently(client, monkeypatch):
+    started = []
+
+    def tracked(name, loader):
+        async def load(*args):
+            started.append(name)
+            # Every read must have started before any of them finishes
+            while len(started) < 3:
+                await asyncio.sleep(0)
+            return await loader(*args)
+        return load
+
+    for name in ["load_user_progress", "load_tiers_with_counts", "load_categories"]:
+        monkeypatch.setattr(routers.dashboard, name, tracked(name, getattr(routers.dashboard, name)))
+
+    assert client.get(bootstrap_url()).status_code == 200
+    assert sorted(started) == ["load_categories", "load_tiers_with_counts", "load_user_progress"]
+
+
+def test_bootstrap_failing_read_is_500(client, monkeypatch):
+    async def failing(db):
+        raise RuntimeError("mongo down")
+
+    monkeypatch.setattr(routers.dashboard, "load_categories", failing)
+    response = client.get(bootstrap_url())
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Failed to load dashboard"
@@ -0,0 +1,38 @@
+import asyncio
+
+import database
+
+
+def test_services_register_their_collection_setup():
+    import server  # noqa: F401  (imports every router and service)
+
+    names = {setup.__name__ for setup in database.index_setups}
+    assert {"create_favorites_indexes", "create_activity_collections", "create_audio_cache_indexes"} <= names
+
+
+def test_a_failing_service_setup_does_not_skip_the_others(db, monkeypatch):
+    ran = []
+
+    async def broken(db):
+        raise RuntimeError("boom")
+
+    async def working(db):
+        ran.append(True)
+
+    monkeypatch.setattr(database.database, "database", db)
+    monkeypatch.setattr(database, "index_setups", [broken, working])
+    asyncio.run(database.create_indexes())
+    assert ran == [True]
+
+
+def test_duplicate_word_ids_do_not_skip_the_remaining_indexes(db, monkeypatch):
+    async def scenario():
+        await db.somali_words.insert_many([{"id": "word_1"}, {"id": "word_1"}])
+        await database.create_indexes()
+        return await db.user_progress.index_information(), await db.somali_words.index_information()
+
+    monkeypatch.setattr(database.database, "database", db)
+    monkeypatch.setattr(database, "index_setups", [])
+    progress_indexes, word_indexes = asyncio.run(scenario())
+    assert "user_id_1" in progress_indexes
+    assert "tier_1" in word_indexes and "id_1" not in word_indexes
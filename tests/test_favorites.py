@@ -0,0 +1,59 @@
+import asyncio
+from datetime import datetime
+
+from models.somali_models import UserProgress
+from services.favorites import FAVORITES_COLLECTION, reconcile_all_favorites, reconcile_favorites
+from services.progress_store import progress_to_document
+from services.word_sets import WordSet
+
+
+def store_favorites(db, user_id, *word_ids):
+    asyncio.run(db[FAVORITES_COLLECTION].insert_many([
+        {"user_id": user_id, "word_id": word_id, "favorited_at": datetime(2024, 1, day)}
+        for day, word_id in enumerate(word_ids, start=1)
+    ]))
+
+
+def stored_favorites(db, user_id):
+    documents = asyncio.run(db[FAVORITES_COLLECTION].find({"user_id": user_id}).to_list(length=None))
+    return sorted(document["word_id"] for document in documents)
+
+
+def test_read_path_reconciles_when_the_count_differs(db):
+    store_favorites(db, "u", "word_1", "word_2")
+    favorites = WordSet.from_ids(["word_1", "word_3", "word_4"])
+    assert asyncio.run(reconcile_favorites(db, "u", favorites, datetime(2024, 2, 1)))
+    assert stored_favorites(db, "u") == ["word_1", "word_3", "word_4"]
+    # Kept entries keep their original favorited_at
+    kept = asyncio.run(db[FAVORITES_COLLECTION].find_one({"user_id": "u", "word_id": "word_1"}))
+    assert kept["favorited_at"] == datetime(2024, 1, 1)
+
+
+def test_read_path_only_counts_when_the_sizes_match(db):
+    store_favorites(db, "u", "word_1", "word_2")
+    favorites = WordSet.from_ids(["word_1", "word_3"])
+    assert not asyncio.run(reconcile_favorites(db, "u", favorites, datetime(2024, 2, 1)))
+    assert stored_favorites(db, "u") == ["word_1", "word_2"]
+
+
+def test_comparing_ids_fixes_sets_of_the_same_size(db):
+    store_favorites(db, "u", "word_1", "word_2")
+    favorites = WordSet.from_ids(["word_1", "word_3"])
+    assert asyncio.run(reconcile_favorites(db, "u", favorites, datetime(2024, 2, 1), compare_ids=True))
+    assert stored_favorites(db, "u") == ["word_1", "word_3"]
+
+
+def test_reconcile_all_compares_every_user(db):
+    for user_id, favorite_ids in (("same", ["word_1"]), ("swapped", ["word_1", "word_3"]), ("new", ["word_5"])):
+        progress = UserProgress(user_id=user_id, created_at=datetime(2023, 12, 1))
+        document = progress_to_document(progress, WordSet(), WordSet.from_ids(favorite_ids))
+        asyncio.run(db.user_progress.insert_one(document))
+    store_favorites(db, "same", "word_1")
+    store_favorites(db, "swapped", "word_1", "word_2")
+
+    assert asyncio.run(reconcile_all_favorites(db, batch_size=1)) == {"users_scanned": 3, "users_reconciled": 2}
+    assert stored_favorites(db, "swapped") == ["word_1", "word_3"]
+    assert stored_favorites(db, "new") == ["word_5"]
+    added = asyncio.run(db[FAVORITES_COLLECTION].find_one({"user_id": "new"}))
+    assert added["favorited_at"] == datetime(2023, 12, 1)
+    assert asyncio.run(reconcile_all_favorites(db))["users_reconciled"] == 0
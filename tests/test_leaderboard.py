@@ -0,0 +1,79 @@
+import random
+import tracemalloc
+
+from services.leaderboard import FenwickTree, RankedBoard
+
+
+def test_fenwick_matches_plain_counts():
+    rng = random.Random(3)
+    counts = {rng.randrange(1, 500): rng.randint(1, 5) for _ in range(50)}
+    fenwick = FenwickTree.from_counts(counts)
+    for _ in range(500):
+        # Includes points past the initial size, which grows the tree
+        points = rng.randrange(1, 5000)
+        delta = rng.choice([1, 1, -1]) if counts.get(points) else 1
+        counts[points] = counts.get(points, 0) + delta
+        fenwick.add(points, delta)
+
+        probe = rng.randrange(0, 6000)
+        assert fenwick.count_at_most(probe) == sum(n for p, n in counts.items() if p <= probe)
+        assert fenwick.count_above(probe) == sum(n for p, n in counts.items() if p > probe)
+    assert fenwick.total == sum(counts.values())
+
+
+def test_huge_point_totals_keep_the_tree_small():
+    tracemalloc.start()
+    fenwick = FenwickTree.from_counts({10: 3, 10 ** 9: 1})
+    for points in (5_000_000, 10 ** 12, 10 ** 15):
+        fenwick.add(points, 1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 64 * 1024
+    assert fenwick.count_above(10) == 4
+    assert fenwick.count_at_most(10 ** 12) == 6
+
+
+def test_rejects_a_huge_points_earned(client):
+    client.post("/api/progress/users/u1/progress")
+    response = client.put(
+        "/api/progress/users/u1/progress", json={"word_completed": "word_1", "points_earned": 3_000_000}
+    )
+    assert response.status_code == 422
+    board = client.get("/api/leaderboard/all-time").json()
+    assert (board["entries"], board["ranked_users"]) == ([], 0)
+
+
+def test_ties_share_a_rank():
+    board = RankedBoard({50: 2, 30: 1}, [(50, "a"), (50, "b"), (30, "c")], size=10)
+    assert [(entry["user_id"], entry["rank"]) for entry in board.top(10)] == [("a", 1), ("b", 1), ("c", 3)]
+    assert board.rank(30) == 3
+    # Users without points share the last rank
+    assert board.rank(0) == 4
+
+
+def test_updates_move_users_through_the_top():
+    board = RankedBoard({50: 1, 30: 1}, [(50, "a"), (30, "b")], size=10)
+    board.update("b", 30, 70)
+    board.update("c", 0, 40)
+    assert [(entry["user_id"], entry["points"], entry["rank"]) for entry in board.top(10)] == [
+        ("b", 70, 1), ("a", 50, 2), ("c", 40, 3)
+    ]
+    assert board.ranked_users == 3
+    assert not board.stale
+
+
+def test_dropping_out_of_a_full_top_marks_the_board_stale():
+    board = RankedBoard({50: 1, 40: 1, 30: 1}, [(50, "a"), (40, "b")], size=2)
+    board.update("b", 40, 10)
+    # "c" (30 points) now belongs in the top, but only a reload knows that
+    assert board.stale
+    assert [entry["user_id"] for entry in board.top(10)] == ["a"]
+    assert board.rank(30) == 2
+
+
+def test_moving_within_a_full_top_keeps_it_fresh():
+    board = RankedBoard({50: 1, 40: 1, 30: 1}, [(50, "a"), (40, "b")], size=2)
+    board.update("b", 40, 60)
+    board.update("d", 0, 45)
+    assert [(entry["user_id"], entry["rank"]) for entry in board.top(10)] == [("b", 1), ("a", 2)]
+    assert not board.stale
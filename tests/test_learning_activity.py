@@ -0,0 +1,18 @@
+def test_activity_reports_the_progress_day_streak(client):
+    client.post("/api/progress/users/u1/progress")
+    events = [
+        {"idempotency_key": "a", "word_completed": "word_1", "points_earned": 10},
+        {"idempotency_key": "b", "word_completed": "word_2", "points_earned": 10},
+    ]
+    progress = client.post("/api/progress/users/u1/progress/events", json={"events": events}).json()["progress"]
+
+    activity = client.get("/api/progress/users/u1/activity?days=7").json()
+    assert activity["current_streak"] == progress["current_streak"] == 1
+    assert activity["longest_streak"] == progress["longest_streak"] == 1
+    assert activity["days"][-1]["words_completed"] == 2
+
+
+def test_activity_for_unknown_user_has_no_streak(client):
+    activity = client.get("/api/progress/users/nobody/activity?days=3").json()
+    assert activity["current_streak"] == activity["longest_streak"] == 0
+    assert len(activity["days"]) == 3
@@ -0,0 +1,193 @@
+import asyncio
+
+import pytest
+
+from models.somali_models import UserProgress, UserProgressUpdate
+from services.progress_buffer import ProgressWriteBuffer
+from services.progress_store import MAX_PROCESSED_EVENT_KEYS, PROCESSED_EVENT_KEYS_FIELD, insert_progress
+
+
+def complete(word_id: str) -> UserProgressUpdate:
+    return UserProgressUpdate(word_completed=word_id, points_earned=10)
+
+
+class GatedBuffer(ProgressWriteBuffer):
+    """Holds every write until the test opens the gate"""
+
+    def __init__(self):
+        super().__init__(flush_interval=60)
+        self.gate = asyncio.Event()
+        self.fail_next = False
+
+    async def _write(self, db, pending):
+        await self.gate.wait()
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("write failed")
+        return await super()._write(db, pending)
+
+
+async def seeded(db, *user_ids):
+    for user_id in user_ids:
+        await insert_progress(db, UserProgress(user_id=user_id))
+
+
+def test_records_and_reads_do_not_wait_for_an_in_flight_flush(db):
+    async def scenario():
+        await seeded(db, "a", "b")
+        buffer = GatedBuffer()
+        await buffer.record(db, "a", complete("word_1"))
+        flush = asyncio.create_task(buffer.flush(db))
+        await asyncio.sleep(0)
+
+        # a's delta is in flight: still readable, and new updates stack on it
+        assert buffer.read_document("a")["total_points"] == 10
+        progress = await asyncio.wait_for(buffer.record(db, "a", complete("word_2")), 1)
+        assert progress.total_points == 20 and progress.revision == 2
+        # Other users are not held up either
+        assert (await asyncio.wait_for(buffer.record(db, "b", complete("word_1")), 1)).total_points == 10
+
+        buffer.gate.set()
+        assert await flush == 1
+        assert (await db.user_progress.find_one({"user_id": "a"}))["total_points"] == 10
+        await buffer.flush(db)
+        stored = await db.user_progress.find_one({"user_id": "a"})
+        assert stored["total_points"] == 20 and stored["revision"] == 2
+        assert buffer.read_document("a") is None
+
+    asyncio.run(scenario())
+
+
+def test_failed_flush_requeues_ahead_of_newer_updates(db):
+    async def scenario():
+        await seeded(db, "a")
+        buffer = GatedBuffer()
+        buffer.fail_next = True
+        await buffer.record(db, "a", complete("word_1"))
+        flush = asyncio.create_task(buffer.flush(db))
+        await asyncio.sleep(0)
+        await buffer.record(db, "a", complete("word_2"))
+        buffer.gate.set()
+        with pytest.raises(RuntimeError):
+            await flush
+
+        assert buffer.read_document("a")["total_points"] == 20
+        assert await buffer.flush(db) == 1
+        stored = await db.user_progress.find_one({"user_id": "a"})
+        assert stored["total_points"] == 20 and stored["revision"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_flush_user_waits_for_the_in_flight_write(db):
+    async def scenario():
+        await seeded(db, "a")
+        buffer = GatedBuffer()
+        await buffer.record(db, "a", complete("word_1"))
+        asyncio.create_task(buffer.flush(db))
+        await asyncio.sleep(0)
+        flush_user = asyncio.create_task(buffer.flush_user(db, "a"))
+        await asyncio.sleep(0.01)
+        assert not flush_user.done()
+        buffer.gate.set()
+        await asyncio.wait_for(flush_user, 1)
+        assert (await db.user_progress.find_one({"user_id": "a"}))["total_points"] == 10
+
+    asyncio.run(scenario())
+
+
+def test_overflow_flush_is_tracked_and_failures_are_logged(db, caplog):
+    async def scenario():
+        await seeded(db, "a")
+        buffer = GatedBuffer()
+        buffer.max_pending_users = 1
+        buffer.fail_next = True
+        buffer.gate.set()
+        await buffer.record(db, "a", complete("word_1"))
+        assert buffer._flush_task is not None
+        await asyncio.gather(buffer._flush_task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert "write failed" in caplog.text
+
+
+class RacingCollection:
+    """Lets another writer update user "a" between the flush's re-read and its write"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.raced = False
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    async def bulk_write(self, operations, **kwargs):
+        if not self.raced:
+            self.raced = True
+            await self._collection.update_one({"user_id": "a"}, {"$inc": {"revision": 1, "total_points": 5}})
+        return await self._collection.bulk_write(operations, **kwargs)
+
+
+class RacingDb:
+    def __init__(self, db):
+        self._db = db
+        self.user_progress = RacingCollection(db.user_progress)
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+
+def test_conflicted_flush_is_requeued_onto_the_newer_document(db):
+    async def scenario():
+        await seeded(db, "a", "b")
+        buffer = ProgressWriteBuffer(flush_interval=60)
+        await buffer.record(db, "a", complete("word_1"))
+        await buffer.record(db, "b", complete("word_1"))
+
+        assert await buffer.flush(RacingDb(db)) == 1
+        assert (await db.user_progress.find_one({"user_id": "a"}))["total_points"] == 5
+        assert buffer.get_stats()["pending_users"] == 1
+        assert buffer.read_document("a")["revision"] == 2
+
+        assert await buffer.flush(db) == 1
+        stored = await db.user_progress.find_one({"user_id": "a"})
+        assert stored["total_points"] == 15 and stored["revision"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_flush_keeps_client_idempotency_keys(db):
+    async def scenario():
+        await seeded(db, "a")
+        keys = [f"key-{i}" for i in range(MAX_PROCESSED_EVENT_KEYS)]
+        await db.user_progress.update_one({"user_id": "a"}, {"$set": {PROCESSED_EVENT_KEYS_FIELD: keys}})
+        buffer = ProgressWriteBuffer(flush_interval=60)
+        await buffer.record(db, "a", complete("word_1"))
+        await buffer.flush(db)
+        stored = await db.user_progress.find_one({"user_id": "a"})
+        assert stored[PROCESSED_EVENT_KEYS_FIELD] == keys
+
+    asyncio.run(scenario())
+
+
+def test_buffered_events_update_the_delta_incrementally(db, monkeypatch):
+    import services.progress_buffer as progress_buffer
+
+    replays = []
+    original = progress_buffer.apply_delta
+    monkeypatch.setattr(progress_buffer, "apply_delta", lambda *args: replays.append(1) or original(*args))
+
+    async def scenario():
+        await seeded(db, "a")
+        buffer = ProgressWriteBuffer(flush_interval=60)
+        for ordinal in range(1, 21):
+            progress = await buffer.record(db, "a", complete(f"word_{ordinal}"))
+            buffer.read_document("a")
+        assert progress.total_points == 200 and progress.revision == 20
+        # One replay when the delta was started, none per event or read
+        assert len(replays) == 1
+        await buffer.flush(db)
+        assert (await db.user_progress.find_one({"user_id": "a"}))["total_points"] == 200
+
+    asyncio.run(scenario())
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+import routers.tiers
+import services.progress_cache
+from models.somali_models import UserProgress
+from services.progress_cache import ProgressCache, get_progress_cache
+from services.progress_recompute import run_progress_recompute
+from services.progress_store import progress_to_document
+from services.word_sets import WordSet
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(services.progress_cache.time, "monotonic", clock)
+    return clock
+
+
+class IdlePrewarmer:
+    def record_tier_unlocks(self, tiers):
+        pass
+
+
+def seed_learner(db, **fields):
+    fields = {"user_id": "u1", **fields}
+    asyncio.run(db.user_progress.insert_one(progress_to_document(UserProgress(**fields), WordSet(), WordSet())))
+
+
+def progress_url(user_id="u1"):
+    return f"/api/progress/users/{user_id}/progress"
+
+
+def read_cache_stats(client):
+    return client.get("/api/progress/cache-stats").json()["read_cache"]
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ProgressCache(ttl_seconds=5)
+    cache.put("u1", {"level": 1})
+    clock.now += 4.9
+    assert cache.get("u1") == {"level": 1}
+    clock.now += 0.1
+    assert cache.get("u1") is None
+    assert (cache.hits, cache.misses, cache.expirations) == (1, 1, 1)
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_write_through_renews_the_ttl(clock):
+    cache = ProgressCache(ttl_seconds=5)
+    cache.put("u1", {"level": 1, "stale": True})
+    clock.now += 4
+    cache.update("u1", {"level": 2}, ["stale"])
+    clock.now += 4
+    assert cache.get("u1") == {"level": 2}
+    # Updates never create entries, only full documents do
+    cache.update("u2", {"level": 2})
+    assert cache.get("u2") is None
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = ProgressCache(max_entries=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1} and cache.get("c") == {"n": 3}
+    assert cache.evictions == 1
+
+
+def test_callers_get_private_copies(clock):
+    cache = ProgressCache()
+    document = {"badges_earned": ["newcomer"]}
+    cache.put("u1", document)
+    document["badges_earned"].append("mutated")
+    cache.get("u1")["badges_earned"].append("mutated")
+    assert cache.get("u1") == {"badges_earned": ["newcomer"]}
+
+
+def test_disabled_cache_stores_nothing():
+    cache = ProgressCache(ttl_seconds=0)
+    cache.put("u1", {"level": 1})
+    assert cache.get("u1") is None
+    assert not cache.get_stats()["enabled"]
+
+
+def test_repeated_reads_are_served_from_the_cache(client, db):
+    seed_learner(db, total_points=50)
+    assert client.get(progress_url()).json()["total_points"] == 50
+    # Another worker's write stays invisible until the TTL runs out
+    asyncio.run(db.user_progress.update_one({"user_id": "u1"}, {"$set": {"total_points": 70}}))
+    assert client.get(progress_url()).json()["total_points"] == 50
+
+    stats = read_cache_stats(client)
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_acknowledgment_is_written_through(client, db, monkeypatch):
+    monkeypatch.setattr(routers.tiers, "get_audio_prewarmer", lambda: IdlePrewarmer())
+    seed_learner(db, total_points=240, level=3, unlocked_tiers=[1, 2, 3])
+    before = client.get(progress_url()).json()
+    acknowledged = client.post("/api/tiers/tiers/4/cultural-acknowledge?user_id=u1").json()["progress"]
+
+    after = client.get(progress_url()).json()
+    assert after["revision"] == acknowledged["revision"] > before["revision"]
+    assert after["unlocked_tiers"] == [1, 2, 3, 4]
+    assert read_cache_stats(client)["misses"] == 1
+
+
+def test_recompute_invalidates_changed_users(client, db):
+    seed_learner(db, total_points=240, level=1)
+    seed_learner(db, user_id="u2", badges_earned=["newcomer"])
+    client.get(progress_url())
+    client.get(progress_url("u2"))
+
+    asyncio.run(run_progress_recompute(db))
+    cache = get_progress_cache()
+    assert cache.get("u1") is None
+    # Unchanged users keep their entry
+    assert cache.get("u2") is not None
+    assert client.get(progress_url()).json()["level"] == 3
+
+
+def test_badge_backfill_invalidates_awarded_users(client, db):
+    seed_learner(db, level=3)
+    assert client.get(progress_url()).json()["badges_earned"] == []
+
+    backfill = client.post("/api/progress/badges/backfill").json()
+    assert backfill["users_updated"] == 1
+    assert get_progress_cache().get("u1") is None
+    assert set(client.get(progress_url()).json()["badges_earned"]) == {"newcomer", "level_2", "level_3"}
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta, timezone
+
+from services.progress_store import client_time, mongo_now
+
+
+def test_client_time_converts_offsets_to_naive_utc():
+    aware = datetime(2024, 3, 1, 12, 0, tzinfo=timezone(timedelta(hours=3)))
+    assert client_time(aware) == datetime(2024, 3, 1, 9, 0)
+    assert client_time(datetime(2024, 3, 1, 9, 0, 0, 123456)).microsecond == 123000
+
+
+def test_client_time_clamps_future_and_missing_times():
+    before = mongo_now()
+    assert before <= client_time(datetime.utcnow() + timedelta(days=30)) <= mongo_now()
+    assert before <= client_time(None) <= mongo_now()
+
+
+def test_event_batch_accepts_timestamps_with_offsets(client):
+    events = [
+        {"idempotency_key": "a", "word_completed": "word_1", "points_earned": 10,
+         "occurred_at": "2024-03-01T09:00:00Z"},
+        {"idempotency_key": "b", "word_completed": "word_2", "points_earned": 10,
+         "occurred_at": "2024-03-01T12:00:00+03:00"},
+        {"idempotency_key": "c", "word_completed": "word_3", "points_earned": 10,
+         "occurred_at": "2999-01-01T00:00:00Z"},
+    ]
+    client.post("/api/progress/users/u1/progress")
+    response = client.post("/api/progress/users/u1/progress/events", json={"events": events})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["applied"] == 3
+    assert datetime.fromisoformat(body["progress"]["last_activity"]) <= mongo_now()
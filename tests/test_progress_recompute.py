@@ -0,0 +1,99 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+import services.progress_recompute
+from models.somali_models import UserProgress
+from services.job_checkpoints import CHECKPOINTS_COLLECTION, job_lease_held
+from services.progress_recompute import (
+    RECOMPUTE_JOB_ID,
+    RecomputeRunning,
+    load_recompute_checkpoint,
+    run_progress_recompute,
+    start_progress_recompute,
+)
+from services.progress_store import insert_progress, mongo_now
+
+
+async def interrupted_run(db, revoke_tiers: bool) -> None:
+    for user_id in ["a", "b", "c"]:
+        await insert_progress(db, UserProgress(user_id=user_id))
+    await db[CHECKPOINTS_COLLECTION].insert_one({
+        "_id": RECOMPUTE_JOB_ID, "dry_run": False, "revoke_tiers": revoke_tiers,
+        "last_user_id": "b", "users_scanned": 10, "users_changed": 0, "users_updated": 0,
+        "conflicts": 0, "field_changes": {}, "diff_sample": [],
+        "started_at": mongo_now(), "completed_at": None
+    })
+
+
+def test_resume_continues_a_run_with_the_same_options(db):
+    async def scenario():
+        await interrupted_run(db, revoke_tiers=False)
+        return await run_progress_recompute(db, revoke_tiers=False)
+
+    checkpoint = asyncio.run(scenario())
+    assert checkpoint["users_scanned"] == 11
+
+
+def test_resume_starts_over_when_revoke_tiers_differs(db):
+    async def scenario():
+        await interrupted_run(db, revoke_tiers=False)
+        return await run_progress_recompute(db, revoke_tiers=True)
+
+    checkpoint = asyncio.run(scenario())
+    assert checkpoint["users_scanned"] == 3
+    assert checkpoint["revoke_tiers"] is True
+
+
+def hold_lease(db, running_until, job_id=RECOMPUTE_JOB_ID):
+    asyncio.run(db[CHECKPOINTS_COLLECTION].insert_one({
+        "_id": job_id, "lease_owner": "other-worker", "running_until": running_until
+    }))
+
+
+def test_run_holds_and_releases_the_lease(db):
+    asyncio.run(insert_progress(db, UserProgress(user_id="a")))
+    checkpoint = asyncio.run(run_progress_recompute(db, batch_size=1))
+    assert checkpoint["users_scanned"] == 1
+    assert checkpoint["running_until"] is None
+    assert not job_lease_held(asyncio.run(load_recompute_checkpoint(db)))
+
+
+def test_lease_held_by_another_worker_refuses_to_run(db):
+    hold_lease(db, mongo_now() + timedelta(minutes=5))
+    with pytest.raises(RecomputeRunning):
+        asyncio.run(run_progress_recompute(db))
+    assert not asyncio.run(start_progress_recompute(db))
+    # Dry runs check against their own checkpoint
+    assert asyncio.run(run_progress_recompute(db, dry_run=True))["completed_at"] is not None
+
+
+def test_expired_lease_is_taken_over_and_starts_over(db):
+    asyncio.run(insert_progress(db, UserProgress(user_id="a")))
+    hold_lease(db, mongo_now() - timedelta(minutes=5))
+    checkpoint = asyncio.run(run_progress_recompute(db))
+    assert checkpoint["users_scanned"] == 1
+    assert checkpoint["lease_owner"] != "other-worker"
+
+
+def test_run_stops_when_its_lease_is_taken_over(db, monkeypatch):
+    for user_id in ["a", "b"]:
+        asyncio.run(insert_progress(db, UserProgress(user_id=user_id)))
+
+    async def taken_over(db, checkpoint, owner, lease_seconds):
+        await db[CHECKPOINTS_COLLECTION].update_one({"_id": RECOMPUTE_JOB_ID}, {"$set": {"lease_owner": "thief"}})
+        return False
+
+    monkeypatch.setattr(services.progress_recompute, "save_job_checkpoint", taken_over)
+    with pytest.raises(RecomputeRunning):
+        asyncio.run(run_progress_recompute(db, batch_size=1))
+    # The new owner's lease is left alone
+    assert asyncio.run(load_recompute_checkpoint(db))["lease_owner"] == "thief"
+
+
+def test_recompute_endpoint_reports_a_run_in_another_worker(client, db):
+    hold_lease(db, mongo_now() + timedelta(minutes=5))
+    assert client.post("/api/progress/recompute").status_code == 409
+    assert client.get("/api/progress/recompute").json()["running"]
+    assert not client.get("/api/progress/recompute?dry_run=true").json()["running"]
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+from models.somali_models import UserProgress
+from services.progress_rules import current_day_streak, update_day_streak
+
+DAY = timedelta(days=1)
+START = datetime(2024, 3, 1, 18, 0)
+
+
+def learned_on(*days: int) -> UserProgress:
+    progress = UserProgress(user_id="u", last_activity=START)
+    for day in days:
+        update_day_streak(progress, START + day * DAY)
+    return progress
+
+
+def test_consecutive_days_extend_the_streak():
+    progress = learned_on(0, 0, 1, 2)
+    assert (progress.current_streak, progress.longest_streak) == (3, 3)
+
+
+def test_a_missed_day_restarts_the_streak_but_keeps_the_longest():
+    progress = learned_on(0, 1, 2, 4)
+    assert (progress.current_streak, progress.longest_streak) == (1, 3)
+
+
+def test_older_offline_events_do_not_move_the_streak_day():
+    progress = learned_on(0, 1)
+    update_day_streak(progress, START - DAY)
+    assert progress.last_streak_day == START + DAY
+    assert progress.current_streak == 2
+
+
+def test_current_day_streak_lapses_after_a_day_without_learning():
+    progress = learned_on(0, 1)
+    last_day = (START + DAY).date()
+    assert current_day_streak(progress, last_day) == 2
+    assert current_day_streak(progress, last_day + DAY) == 2
+    assert current_day_streak(progress, last_day + 2 * DAY) == 0
+    assert current_day_streak(UserProgress(user_id="new"), last_day) == 0
@@ -0,0 +1,49 @@
+import random
+
+from models.somali_models import UserProgress
+from services.recommendations import TIER_WORD_ORDERINGS, recommend_words
+from services.word_sets import CATALOG_SIZE, CATEGORY_WORD_SETS, WordSet, word_id_for
+
+
+def reference_recommendations(progress, completed, favorites, limit, include_locked):
+    """The straightforward per-word walk the masks replace"""
+    category_completed = {category: len(completed & words) for category, words in CATEGORY_WORD_SETS.items()}
+    unlocked = set(progress.unlocked_tiers)
+    tiers = sorted(tier for tier in TIER_WORD_ORDERINGS if tier in unlocked)
+    if include_locked:
+        tiers += sorted(tier for tier in TIER_WORD_ORDERINGS if tier not in unlocked)
+    picks = []
+    for tier in tiers:
+        queues = {}
+        for category, ordinals in TIER_WORD_ORDERINGS[tier].items():
+            remaining = [word_id_for(o) for o in ordinals if word_id_for(o) not in completed]
+            if remaining:
+                queues[category] = sorted(remaining, key=lambda word_id: word_id in favorites)
+        while queues and len(picks) < limit:
+            category = min(queues, key=lambda name: (category_completed.get(name, 0), name))
+            word_id = queues[category].pop(0)
+            if not queues[category]:
+                del queues[category]
+            category_completed[category] = category_completed.get(category, 0) + 1
+            picks.append({"word_id": word_id, "tier": tier, "category": category,
+                          "locked": tier not in unlocked, "seen": word_id in favorites})
+    return picks
+
+
+def test_matches_the_per_word_walk():
+    rng = random.Random(7)
+    all_ids = [word_id_for(ordinal) for ordinal in range(1, CATALOG_SIZE + 1)]
+    for _ in range(200):
+        completed = WordSet.from_ids(rng.sample(all_ids, rng.randint(0, len(all_ids))))
+        favorites = WordSet.from_ids(rng.sample(all_ids, rng.randint(0, 5)))
+        progress = UserProgress(user_id="u", unlocked_tiers=sorted(rng.sample(list(TIER_WORD_ORDERINGS), 2)))
+        for include_locked in (False, True):
+            limit = rng.randint(1, 12)
+            assert recommend_words(progress, completed, favorites, limit, include_locked) == \
+                reference_recommendations(progress, completed, favorites, limit, include_locked)
+
+
+def test_finished_catalog_recommends_nothing():
+    everything = WordSet.from_ids(word_id_for(ordinal) for ordinal in range(1, CATALOG_SIZE + 1))
+    progress = UserProgress(user_id="u", unlocked_tiers=list(TIER_WORD_ORDERINGS))
+    assert recommend_words(progress, everything, WordSet(), 10, include_locked=True) == []
@@ -0,0 +1,122 @@
+import asyncio
+from collections import Counter
+
+import pytest
+
+import routers.tiers
+from data.somali_vocabulary import SOMALI_VOCABULARY, TIER_DEFINITIONS
+from models.somali_models import UserProgress
+from services.catalog_cache import get_catalog_cache
+from services.progress_cache import get_progress_cache
+from services.progress_store import progress_to_document
+from services.word_sets import WordSet
+
+
+def ack_url(tier_id, user_id="u1"):
+    return f"/api/tiers/tiers/{tier_id}/cultural-acknowledge?user_id={user_id}"
+
+
+class RecordingPrewarmer:
+    def __init__(self):
+        self.unlocks = []
+
+    def record_tier_unlocks(self, tiers):
+        self.unlocks.append(list(tiers))
+
+
+@pytest.fixture
+def prewarmer(monkeypatch):
+    recorder = RecordingPrewarmer()
+    monkeypatch.setattr(routers.tiers, "get_audio_prewarmer", lambda: recorder)
+    return recorder
+
+
+def seed_learner(db, **fields):
+    fields = {"user_id": "u1", "total_points": 240, "level": 3, "unlocked_tiers": [1, 2, 3], **fields}
+    asyncio.run(db.user_progress.insert_one(progress_to_document(UserProgress(**fields), WordSet(), WordSet())))
+
+
+def test_acknowledging_twice_changes_nothing_the_second_time(client, db, prewarmer):
+    seed_learner(db)
+    first = client.post(ack_url(4))
+    assert first.status_code == 200, first.text
+    assert first.json()["unlocked"]
+    progress = first.json()["progress"]
+    assert progress["unlocked_tiers"] == [1, 2, 3, 4]
+    assert progress["badges_earned"] == ["tier_master"]
+    assert "tiers_before_acknowledgment" not in progress
+
+    second = client.post(ack_url(4)).json()["progress"]
+    assert second["revision"] == progress["revision"]
+    assert second["cultural_acknowledgments"] == [4]
+    assert (second["unlocked_tiers"], second["badges_earned"]) == ([1, 2, 3, 4], ["tier_master"])
+    assert second["total_points"] == 240
+    # Only the write that unlocked tier 4 queues it for prewarming
+    assert prewarmer.unlocks == [[4]]
+
+
+def test_acknowledging_before_qualifying_unlocks_later_nothing_now(client, db, prewarmer):
+    seed_learner(db, total_points=100, unlocked_tiers=[1, 2])
+    body = client.post(ack_url(4)).json()
+    assert not body["unlocked"]
+    assert body["progress"]["cultural_acknowledgments"] == [4]
+    assert prewarmer.unlocks == []
+
+
+def test_tiers_unlocked_earlier_are_not_prewarmed_again(client, db, prewarmer):
+    seed_learner(db, total_points=400, unlocked_tiers=[1, 2, 3, 4], cultural_acknowledgments=[4])
+    assert client.post(ack_url(4)).json()["unlocked"]
+    assert client.post(ack_url(5)).json()["progress"]["unlocked_tiers"] == [1, 2, 3, 4, 5]
+    assert prewarmer.unlocks == [[5]]
+
+
+def test_unknown_user_is_404(client, prewarmer):
+    assert client.post(ack_url(4, user_id="nobody")).status_code == 404
+
+
+def test_tier_without_guidelines_is_400(client, db, prewarmer):
+    seed_learner(db)
+    assert client.post(ack_url(2)).status_code == 400
+
+
+def test_acknowledgment_replaces_the_cached_progress(client, db, prewarmer):
+    seed_learner(db)
+    assert client.get("/api/progress/users/u1/progress").json()["cultural_acknowledgments"] == []
+    assert get_progress_cache().get("u1") is not None
+    client.post(ack_url(4))
+    assert client.get("/api/progress/users/u1/progress").json()["cultural_acknowledgments"] == [4]
+
+
+def test_stale_if_match_is_rejected(client, db, prewarmer):
+    seed_learner(db)
+    response = client.post(ack_url(4), headers={"If-Match": '"999"'})
+    assert response.status_code == 412
+    assert asyncio.run(db.user_progress.find_one({"user_id": "u1"}))["cultural_acknowledgments"] == []
+
+
+@pytest.mark.parametrize("tier_id", [tier["id"] for tier in TIER_DEFINITIONS])
+def test_tier_summary_matches_the_vocabulary(client, tier_id):
+    client.post("/api/somali/words/seed")
+    words = [word for word in SOMALI_VOCABULARY if word["tier"] == tier_id]
+
+    body = client.get(f"/api/tiers/tiers/{tier_id}").json()
+    assert body["word_count"] == len(words)
+    assert body["category_breakdown"] == dict(Counter(word["category"] for word in words))
+    assert body["difficulty_breakdown"] == dict(Counter(word["difficulty"] for word in words))
+    assert sum(body["category_breakdown"].values()) == sum(body["difficulty_breakdown"].values()) == len(words)
+    assert len(body["sample_words"]) == min(len(words), routers.tiers.TIER_SAMPLE_SIZE)
+    assert all(word["tier"] == tier_id and "_id" not in word for word in body["sample_words"])
+
+
+def test_tier_summary_is_cached_per_tier(client):
+    client.post("/api/somali/words/seed")
+    first = client.get("/api/tiers/tiers/1").json()
+    assert client.get("/api/tiers/tiers/1").json() == first
+    client.get("/api/tiers/tiers/2")
+    assert (get_catalog_cache().hits, get_catalog_cache().misses) == (1, 2)
+
+
+def test_empty_and_unknown_tiers(client):
+    body = client.get("/api/tiers/tiers/1").json()
+    assert (body["word_count"], body["category_breakdown"], body["sample_words"]) == (0, {}, [])
+    assert client.get("/api/tiers/tiers/99").status_code == 404
@@ -0,0 +1,114 @@
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+from services.tts_providers import GoogleTTSProvider, TTSError
+from services.tts_service import CircuitBreaker, TTSService, TTSUnavailable
+
+MP3 = b"\xff\xf3\x44\xc0" + bytes(92)
+
+
+class FakeGoogleTTS:
+    """Local stand-in for the Google TTS REST API, answering from a script of responses"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.responses.pop(0) if self.responses else "ok"
+        if isinstance(response, Exception):
+            raise response
+        if response == "ok":
+            if request.url.path.endswith("/voices"):
+                return httpx.Response(200, json={"voices": [
+                    {"languageCodes": ["so-SO"], "name": "so-SO-Standard-B"},
+                    {"languageCodes": ["en-US"], "name": "en-US-Standard-A"},
+                ]})
+            return httpx.Response(200, json={"audioContent": base64.b64encode(MP3).decode()})
+        return response
+
+
+def tts(server: FakeGoogleTTS, **options) -> TTSService:
+    provider = GoogleTTSProvider("test-key", transport=httpx.MockTransport(server))
+    options.setdefault("backoff_base", 0)
+    return TTSService(provider, **options)
+
+
+def test_synthesizes_over_the_pooled_client():
+    server = FakeGoogleTTS()
+    service = tts(server)
+
+    async def scenario():
+        first = await service.synthesize_speech("Iska warran?", 0.7)
+        client = service.provider.client
+        await service.synthesize_speech("haa")
+        reused = service.provider.client is client
+        await service.aclose()
+        return first, reused, client.is_closed
+
+    (audio_content, _), reused, closed = asyncio.run(scenario())
+    assert base64.b64decode(audio_content) == MP3
+    assert reused and closed
+
+    request = server.requests[0]
+    assert (request.method, request.url.path) == ("POST", "/v1/text:synthesize")
+    assert request.url.params["key"] == "test-key"
+    payload = json.loads(request.content)
+    # The provider gets the canonical request
+    assert payload["input"] == {"text": "iska warran"}
+    assert payload["voice"]["languageCode"] == "so-SO"
+    assert payload["audioConfig"]["speakingRate"] == 0.7
+
+
+def test_server_error_is_retried():
+    server = FakeGoogleTTS(httpx.Response(503, headers={"Retry-After": "0"}))
+    service = tts(server, max_retries=1)
+    audio_content, _ = asyncio.run(service.synthesize_speech("haa"))
+    assert base64.b64decode(audio_content) == MP3
+    assert (len(server.requests), service.retries) == (2, 1)
+    assert service.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_rejected_request_is_not_retried():
+    server = FakeGoogleTTS(httpx.Response(400, json={"error": "bad voice"}))
+    service = tts(server, max_retries=3, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(TTSError, match="rejected") as raised:
+        asyncio.run(service.synthesize_speech("haa"))
+    assert not raised.value.retryable
+    assert len(server.requests) == 1
+    assert service.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_timeouts_open_the_circuit_breaker():
+    server = FakeGoogleTTS(*[httpx.ReadTimeout("read timed out")] * 2)
+    service = tts(server, max_retries=1, breaker=CircuitBreaker(failure_threshold=1, reset_seconds=60))
+    with pytest.raises(TTSError) as raised:
+        asyncio.run(service.synthesize_speech("haa"))
+    assert raised.value.retryable
+    assert service.breaker.state == CircuitBreaker.OPEN
+
+    # Open: fails fast without reaching the server
+    with pytest.raises(TTSUnavailable):
+        asyncio.run(service.synthesize_speech("haa"))
+    assert len(server.requests) == 2
+
+
+def test_empty_audio_is_an_error():
+    server = FakeGoogleTTS(httpx.Response(200, json={}))
+    with pytest.raises(TTSError, match="no audio"):
+        asyncio.run(tts(server).synthesize_speech("haa"))
+
+
+def test_voices_are_filtered_to_somali():
+    voices = asyncio.run(tts(FakeGoogleTTS()).get_supported_voices())
+    assert [voice["name"] for voice in voices] == ["so-SO-Standard-B"]
+
+
+def test_requires_an_api_key():
+    with pytest.raises(ValueError):
+        GoogleTTSProvider("")
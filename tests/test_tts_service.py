@@ -0,0 +1,190 @@
+import asyncio
+import base64
+
+import pytest
+
+import services.tts_service
+from services.audio_cache import load_fallback_clip
+from services.tts_providers import (
+    MP3_FRAME_BYTES,
+    MP3_FRAME_SECONDS,
+    FakeTTSProvider,
+    TTSError,
+    TTSProvider,
+    estimate_speech_seconds,
+)
+from services.tts_service import CircuitBreaker, TTSService, TTSUnavailable, audio_cache_key
+
+# MPEG-2 Layer III tables (ISO/IEC 13818-3)
+MPEG2_LAYER3_KBPS = [None, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, None]
+MPEG2_SAMPLE_RATES = [22050, 24000, 16000, None]
+
+
+def failing_provider() -> FakeTTSProvider:
+    return FakeTTSProvider(latency_seconds=0, failure_rate=1.0)
+
+
+def service(provider: TTSProvider, **options) -> TTSService:
+    options.setdefault("max_retries", 0)
+    options.setdefault("backoff_base", 0)
+    return TTSService(provider, **options)
+
+
+def test_providers_must_implement_the_interface():
+    with pytest.raises(TypeError):
+        TTSProvider()
+
+    class VoicesOnly(TTSProvider):
+        async def list_voices(self):
+            return []
+
+    with pytest.raises(TypeError):
+        VoicesOnly()
+
+
+def test_fake_audio_is_a_sequence_of_valid_mp3_frames():
+    text = "Subax wanaagsan, sidee tahay maanta"
+    audio_content, _ = asyncio.run(service(FakeTTSProvider(latency_seconds=0)).synthesize_speech(text, 0.7))
+    audio = base64.b64decode(audio_content)
+
+    assert audio and len(audio) % MP3_FRAME_BYTES == 0
+    for offset in range(0, len(audio), MP3_FRAME_BYTES):
+        header = int.from_bytes(audio[offset:offset + 4], "big")
+        assert header >> 21 == 0x7FF  # frame sync
+        assert (header >> 19) & 0b11 == 0b10  # MPEG-2
+        assert (header >> 17) & 0b11 == 0b01  # Layer III
+        bitrate = MPEG2_LAYER3_KBPS[(header >> 12) & 0xF] * 1000
+        sample_rate = MPEG2_SAMPLE_RATES[(header >> 10) & 0b11]
+        padding = (header >> 9) & 1
+        assert 72 * bitrate // sample_rate + padding == MP3_FRAME_BYTES
+    frames = len(audio) // MP3_FRAME_BYTES
+    assert frames * MP3_FRAME_SECONDS == pytest.approx(estimate_speech_seconds(text, 0.7), abs=MP3_FRAME_SECONDS)
+
+
+def test_breaker_opens_then_lets_one_trial_through():
+    async def scenario():
+        provider = failing_provider()
+        tts = service(provider, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=0.05))
+        for _ in range(2):
+            with pytest.raises(TTSError):
+                await tts.synthesize_speech("haa")
+        assert tts.breaker.state == CircuitBreaker.OPEN
+        assert not tts.available
+
+        # Open: refused without calling the provider
+        with pytest.raises(TTSUnavailable):
+            await tts.synthesize_speech("haa")
+        assert (provider.calls, tts.short_circuited) == (2, 1)
+
+        await asyncio.sleep(0.06)
+        # Half open: a failed trial opens the breaker again at once
+        with pytest.raises(TTSError):
+            await tts.synthesize_speech("haa")
+        assert tts.breaker.state == CircuitBreaker.OPEN
+        assert tts.breaker.times_opened == 2
+
+        await asyncio.sleep(0.06)
+        provider.failure_rate = 0
+        assert (await tts.synthesize_speech("haa"))[0]
+        assert tts.breaker.state == CircuitBreaker.CLOSED
+        return provider.calls
+
+    assert asyncio.run(scenario()) == 4
+
+
+def test_half_open_breaker_allows_a_single_trial():
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.02)
+        breaker.record_failure()
+        assert not breaker.allow()
+        await asyncio.sleep(0.03)
+        return breaker.allow(), breaker.allow(), breaker.state
+
+    assert asyncio.run(scenario()) == (True, False, CircuitBreaker.HALF_OPEN)
+
+
+def test_rejected_request_does_not_count_against_the_provider():
+    class Rejecting(FakeTTSProvider):
+        async def synthesize(self, text, speed):
+            raise TTSError("TTS API rejected the request: 400")
+
+    tts = service(Rejecting(), breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(TTSError):
+        asyncio.run(tts.synthesize_speech("haa"))
+    assert tts.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_provider_hits_the_deadline():
+    tts = service(
+        FakeTTSProvider(latency_seconds=5), max_retries=2, deadline_seconds=0.05, hedge_after_seconds=10,
+        breaker=CircuitBreaker(failure_threshold=1)
+    )
+    with pytest.raises(TTSError, match="deadline"):
+        asyncio.run(tts.synthesize_speech("haa"))
+    assert tts.deadline_exceeded == 1
+    assert tts.breaker.state == CircuitBreaker.OPEN
+
+
+def test_slow_attempt_is_hedged_and_the_first_answer_wins():
+    async def scenario():
+        provider = FakeTTSProvider(latency_seconds=5)
+        tts = service(provider, max_retries=1, hedge_after_seconds=0.02, deadline_seconds=1)
+        call = asyncio.ensure_future(tts.synthesize_speech("haa"))
+        await asyncio.sleep(0.005)
+        # Only the hedge sees the fast provider
+        provider.latency_seconds = 0
+        audio_content, _ = await call
+        await asyncio.sleep(0)
+        return tts, provider, audio_content
+
+    tts, provider, audio_content = asyncio.run(scenario())
+    assert audio_content
+    assert (provider.calls, tts.hedges, tts.retries) == (2, 1, 0)
+    # The slow attempt was cancelled
+    assert tts.in_flight == 0
+
+
+def test_retryable_failures_are_retried():
+    class FailsOnce(FakeTTSProvider):
+        async def _respond(self):
+            await super()._respond()
+            if self.calls == 1:
+                raise TTSError("TTS API returned 503", retryable=True)
+
+    tts = service(FailsOnce(latency_seconds=0), max_retries=2)
+    assert asyncio.run(tts.synthesize_speech("haa"))[0]
+    assert tts.retries == 1
+
+
+def test_voices_are_served_stale_while_the_provider_fails():
+    provider = FakeTTSProvider(latency_seconds=0)
+    tts = service(provider, voices_ttl_seconds=0)
+    voices = asyncio.run(tts.get_supported_voices())
+    provider.failure_rate = 1.0
+    assert voices and asyncio.run(tts.get_supported_voices()) == voices
+
+
+def cache_clip(db, text, speed):
+    asyncio.run(db.audio_cache.insert_one({
+        "cache_key": audio_cache_key(text, speed), "text": text, "speed": speed, "audio": b"mp3", "size_bytes": 3
+    }))
+
+
+def test_fallback_is_the_nearest_cached_speed(db):
+    cache_clip(db, "haa", 0.4)
+    cache_clip(db, "haa", 0.7)
+    cache_key, clip, speed = asyncio.run(load_fallback_clip(db, "haa", 1.0))
+    assert (cache_key, speed) == (audio_cache_key("haa", 0.7), 0.7)
+    assert asyncio.run(load_fallback_clip(db, "maya", 1.0)) is None
+
+
+def test_synthesis_failure_serves_another_speed(client, db, monkeypatch):
+    cache_clip(db, "haa", 0.7)
+    monkeypatch.setattr(services.tts_service, "tts_service", service(failing_provider()))
+
+    response = client.post("/api/tts/audio/synthesize", json={"text": "Haa", "speed": 1.0})
+    assert response.status_code == 200
+    assert response.json()["fallback_speed"] == 0.7
+    assert response.json()["cache_key"] == audio_cache_key("haa", 0.7)
+
+    assert client.post("/api/tts/audio/synthesize", json={"text": "maya"}).status_code == 500
@@ -0,0 +1,27 @@
+from services.word_sets import CATALOG_SIZE, WordSet, word_id_for, word_ordinal
+
+
+def test_catalog_ids_map_to_ordinals():
+    assert word_ordinal("word_1") == 1
+    assert word_ordinal(word_id_for(CATALOG_SIZE)) == CATALOG_SIZE
+
+
+def test_ids_outside_the_catalog_have_no_ordinal():
+    for word_id in ["word_0", "word_01", f"word_{CATALOG_SIZE + 1}", "word_99999999999", "word_²", "word_", "custom"]:
+        assert word_ordinal(word_id) is None
+
+
+def test_oversized_ordinals_go_to_extras():
+    word_set = WordSet.from_ids(["word_2", "word_99999999999"])
+    assert word_set.bits == 1 << 2
+    assert word_set.extras == {"word_99999999999"}
+    assert "word_99999999999" in word_set
+    assert len(word_set.to_bytes()) == 1
+
+
+def test_round_trip_and_set_operations():
+    word_set = WordSet.from_ids(["word_3", "word_1", "custom"])
+    assert word_set.ids() == ["word_1", "word_3", "custom"]
+    assert WordSet.from_bytes(word_set.to_bytes(), word_set.extras) == word_set
+    assert (word_set - WordSet.from_ids(["word_1"])).ids() == ["word_3", "custom"]
+    assert word_set.discard("word_3") and not word_set.discard("word_3")